@@ -0,0 +1,30 @@
+"""
+    Runs every benchmark.
+
+    Usage: python -m benchmarks [--number N] [--json PATH]
+
+    --number scales the calls per measurement of each benchmark (1 keeps their defaults).
+"""
+import argparse
+
+from . import numeric, operators, scaling
+from .results import report
+
+BENCHMARKS = (('numeric', numeric, 20000), ('operators', operators, 20000), ('scaling', scaling, 3))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--number', type=float, default=1, help='factor applied to the calls per measurement')
+    parser.add_argument('--json', metavar='PATH', help='also write the results to PATH')
+    args = parser.parse_args(argv)
+
+    results = {}
+    for name, module, number in BENCHMARKS:
+        for measurement, microseconds in module.run(max(1, int(number * args.number))).items():
+            results['{0}: {1}'.format(name, measurement)] = microseconds
+    report('all', results, args.json)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,38 @@
+"""
+    Compares two benchmark results files, e.g. written on two commits.
+
+    Usage: python -m benchmarks.compare OLD.json NEW.json [--threshold 0.1]
+
+    Exits with status 1 if any measurement got slower by more than the threshold.
+"""
+import argparse
+import sys
+
+from .results import compare, load
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('old')
+    parser.add_argument('new')
+    parser.add_argument('--threshold', type=float, default=0.1,
+                        help='relative change under which two times are considered the same (default: 0.1)')
+    args = parser.parse_args(argv)
+
+    old, new = load(args.old), load(args.new)
+    print('old: {0} ({1})'.format(old.get('commit'), old.get('python')))
+    print('new: {0} ({1})'.format(new.get('commit'), new.get('python')))
+    rows = compare(old, new, args.threshold)
+    width = max([len(row[0]) for row in rows] + [10])
+    for name, old_time, new_time, ratio, status in rows:
+        print('{0:<{width}} {1:>12} {2:>12} {3:>8} {4}'.format(
+            name,
+            '-' if old_time is None else '{0:.2f}'.format(old_time),
+            '-' if new_time is None else '{0:.2f}'.format(new_time),
+            '-' if ratio is None else '{0:.2f}x'.format(ratio),
+            status, width=width))
+    return 1 if any(row[4] == 'slower' for row in rows) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,135 @@
+"""
+    Synthetic variables, rules and objects for the benchmarks.
+
+    Every generator takes a seed so that two runs (e.g. on two commits) measure the same rule sets.
+"""
+import random
+import time
+from datetime import date, timedelta
+
+from business_rules.actions import BaseActions, rule_action
+from business_rules.fields import FIELD_NO_INPUT
+from business_rules.operators import (BooleanType,
+                                      DateType,
+                                      NumericType,
+                                      SelectMultipleType,
+                                      SelectType,
+                                      StringType)
+from business_rules.variables import BaseVariables, rule_variable
+
+FIELD_TYPES = (NumericType, StringType, BooleanType, SelectType, SelectMultipleType, DateType)
+
+WORDS = ('alpha', 'bravo', 'charlie', 'delta', 'echo', 'foxtrot', 'golf', 'hotel', 'india', 'juliet')
+
+FIRST_DAY = date(2020, 1, 1)
+
+
+def random_value(field_type, rng):
+    """ Returns a random value a variable of the given field_type could return, or a rule could compare against. """
+    if field_type is NumericType:
+        return rng.randint(0, 100)
+    if field_type is StringType:
+        return rng.choice(WORDS)
+    if field_type is BooleanType:
+        return rng.random() < 0.5
+    if field_type is SelectType:
+        return rng.sample(WORDS, 3)
+    if field_type is SelectMultipleType:
+        return rng.sample(WORDS, 3)
+    if field_type is DateType:
+        return (FIRST_DAY + timedelta(days=rng.randint(0, 365))).isoformat()
+    raise ValueError("No generator for {0}".format(field_type.__name__))
+
+
+def random_constant(field_type, operator, rng):
+    """ Returns a random value for a condition using the given operator. """
+    if getattr(field_type, operator).input_type == FIELD_NO_INPUT:
+        return ''
+    if field_type is StringType and operator == 'matches_regex':
+        return '^{0}'.format(rng.choice(WORDS)[0])
+    if field_type is SelectType:
+        return rng.choice(WORDS)
+    if field_type is SelectMultipleType:
+        return rng.sample(WORDS, 2)
+    return random_value(field_type, rng)
+
+
+def variable_names(field_type, per_type):
+    return ['{0}_{1}'.format(field_type.name, i) for i in range(per_type)]
+
+
+def make_variables_cls(per_type=4, cost=0.0):
+    """
+        Returns a BaseVariables subclass with per_type variables of every field type, named e.g. numeric_0. An
+        instance wraps one record (a dict, see generate_objects) and each variable busy-waits cost seconds before
+        returning its value, to simulate e.g. a database lookup.
+    """
+
+    def make_variable(field_type, name):
+        def variable(self):
+            if cost:
+                end = time.perf_counter() + cost
+                while time.perf_counter() < end:
+                    pass
+            return self.record[name]
+
+        variable.__name__ = name
+        return rule_variable(field_type)(variable)
+
+    attributes = {'__init__': lambda self, record: setattr(self, 'record', record)}
+    for field_type in FIELD_TYPES:
+        for name in variable_names(field_type, per_type):
+            attributes[name] = make_variable(field_type, name)
+    return type('SyntheticVariables', (BaseVariables,), attributes)
+
+
+class SyntheticActions(BaseActions):
+    """ Counts the triggered rules. """
+
+    def __init__(self, record=None):
+        self.calls = 0
+
+    @rule_action()
+    def record_match(self):
+        self.calls += 1
+
+
+def generate_rules(count, depth=2, fanout=3, any_ratio=0.5, type_weights=None, per_type=4, seed=0):
+    """
+        Returns count rules over the variables of make_variables_cls(per_type).
+
+        - depth - levels of all / any nodes above the leaf conditions, 0 for single condition rules.
+        - fanout - number of children of every all / any node.
+        - any_ratio - probability for a node to be an any node rather than an all node.
+        - type_weights - relative weight of each field type name (e.g. {'numeric': 3, 'string': 1}) in the leaf
+          conditions, uniform by default. Operators are picked uniformly among the ones of the field type.
+    """
+    rng = random.Random(seed)
+    type_weights = type_weights or dict((field_type.name, 1) for field_type in FIELD_TYPES)
+    field_types = [field_type for field_type in FIELD_TYPES if type_weights.get(field_type.name)]
+    weights = [type_weights[field_type.name] for field_type in field_types]
+    operators = dict((field_type, sorted(operator['name'] for operator in field_type.get_all_operators()))
+                     for field_type in field_types)
+
+    def leaf():
+        field_type = rng.choices(field_types, weights)[0]
+        operator = rng.choice(operators[field_type])
+        return {'name': rng.choice(variable_names(field_type, per_type)),
+                'operator': operator,
+                'value': random_constant(field_type, operator, rng)}
+
+    def node(level):
+        if level == 0:
+            return leaf()
+        kind = 'any' if rng.random() < any_ratio else 'all'
+        return {kind: [node(level - 1) for _ in range(fanout)]}
+
+    return [{'conditions': node(depth), 'actions': [{'name': 'record_match'}]} for _ in range(count)]
+
+
+def generate_objects(count, per_type=4, seed=1):
+    """ Returns count records mapping every variable of make_variables_cls(per_type) to a random value. """
+    rng = random.Random(seed)
+    return [dict((name, random_value(field_type, rng))
+                 for field_type in FIELD_TYPES for name in variable_names(field_type, per_type))
+            for _ in range(count)]
@@ -0,0 +1,63 @@
+"""
+    Compares NumericType (Decimal based) with NativeNumericType (native ints and floats).
+
+    Usage: python -m benchmarks.numeric [--number N] [--json PATH]
+"""
+import argparse
+
+from business_rules import compile_rules
+from business_rules.actions import BaseActions
+from business_rules.operators import NativeNumericType, NumericType
+from business_rules.variables import BaseVariables, numeric_rule_variable
+
+from .results import add_arguments, report, time_call
+
+
+class OrderVariables(BaseVariables):
+
+    def __init__(self, total, quantity):
+        self.total = total
+        self.quantity = quantity
+
+    @numeric_rule_variable
+    def order_total(self):
+        return self.total
+
+    @numeric_rule_variable
+    def order_quantity(self):
+        return self.quantity
+
+
+RULES = [
+    {'conditions': {'all': [{'name': 'order_total', 'operator': 'greater_than_or_equal_to', 'value': 99.95},
+                            {'name': 'order_quantity', 'operator': 'less_than', 'value': 10}]},
+     'actions': []},
+    {'conditions': {'any': [{'name': 'order_total', 'operator': 'equal_to', 'value': 12.5},
+                            {'name': 'order_quantity', 'operator': 'greater_than', 'value': 3}]},
+     'actions': []},
+]
+
+
+def run(number=20000):
+    results = {}
+    for field_type in (NumericType, NativeNumericType):
+        results['{0}.greater_than_or_equal_to'.format(field_type.__name__)] = time_call(
+            lambda: field_type(123.456).greater_than_or_equal_to(99.95), number)
+
+    variables, actions = OrderVariables(123.456, 4), BaseActions()
+    for native_numbers in (False, True):
+        compiled = compile_rules(RULES, OrderVariables, BaseActions, native_numbers=native_numbers)
+        results['compiled run_all native_numbers={0}'.format(native_numbers)] = time_call(
+            lambda: compiled.run_all(variables, actions), number)
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    add_arguments(parser, number=20000)
+    args = parser.parse_args(argv)
+    report('numeric', run(args.number), args.json)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,48 @@
+"""
+    Times the cast and every operator of each type exported with @export_type.
+
+    Usage: python -m benchmarks.operators [--number N] [--json PATH]
+"""
+import argparse
+import random
+
+from business_rules.fields import FIELD_NO_INPUT
+from business_rules.operators import EXPORTED_TYPES
+
+from .generators import random_constant, random_value
+from .results import add_arguments, report, time_call
+
+
+def run(number=20000, seed=0):
+    rng = random.Random(seed)
+    results = {}
+    for class_name in sorted(EXPORTED_TYPES):
+        field_type = EXPORTED_TYPES[class_name]
+        value = random_value(field_type, rng)
+        results['{0}(value)'.format(class_name)] = time_call(lambda: field_type(value), number)
+
+        instance = field_type(value)
+        for operator in field_type.get_all_operators():
+            method = getattr(instance, operator['name'])
+            if operator['input_type'] == FIELD_NO_INPUT:
+                call = method
+            else:
+                constant = random_constant(field_type, operator['name'], rng)
+                call = _bind(method, constant)
+            results['{0}.{1}'.format(class_name, operator['name'])] = time_call(call, number)
+    return results
+
+
+def _bind(method, constant):
+    return lambda: method(constant)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    add_arguments(parser, number=20000)
+    args = parser.parse_args(argv)
+    report('operators', run(args.number), args.json)
+
+
+if __name__ == '__main__':
+    main()
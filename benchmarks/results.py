@@ -0,0 +1,88 @@
+"""
+    Timing helpers and the JSON results format shared by the benchmarks.
+
+    A results file looks like:
+
+        {"benchmark": "scaling", "commit": "<git sha or null>", "version": "1.0.1", "python": "3.11.4",
+         "results": {"<measurement name>": <microseconds per call>, ...}}
+"""
+import json
+import platform
+import subprocess
+import timeit
+
+from business_rules import __version__
+
+
+def time_call(func, number, repeat=3):
+    """ Returns the best time per call of func in microseconds over repeat runs of number calls. """
+    return min(timeit.repeat(func, number=number, repeat=repeat)) / number * 1e6
+
+
+def current_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', 'HEAD'], stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def make_document(benchmark, results):
+    return {'benchmark': benchmark,
+            'commit': current_commit(),
+            'version': __version__,
+            'python': platform.python_version(),
+            'results': results}
+
+
+def save(path, document):
+    with open(path, 'w') as results_file:
+        json.dump(document, results_file, indent=2, sort_keys=True)
+
+
+def load(path):
+    with open(path) as results_file:
+        return json.load(results_file)
+
+
+def compare(old, new, threshold=0.1):
+    """
+        Compares the results of two documents and returns a list of (name, old microseconds, new microseconds, ratio,
+        status) for every measurement in either, where status is 'slower' / 'faster' if the new time differs by more
+        than threshold (a fraction of the old time), 'same' otherwise, or 'added' / 'removed'.
+    """
+    old_results, new_results = old['results'], new['results']
+    rows = []
+    for name in sorted(set(old_results) | set(new_results)):
+        if name not in new_results:
+            rows.append((name, old_results[name], None, None, 'removed'))
+            continue
+        if name not in old_results:
+            rows.append((name, None, new_results[name], None, 'added'))
+            continue
+        old_time, new_time = old_results[name], new_results[name]
+        ratio = new_time / old_time if old_time else float('inf')
+        if ratio > 1 + threshold:
+            status = 'slower'
+        elif ratio < 1 - threshold:
+            status = 'faster'
+        else:
+            status = 'same'
+        rows.append((name, old_time, new_time, ratio, status))
+    return rows
+
+
+def print_results(results):
+    width = max([len(name) for name in results] + [10])
+    for name, microseconds in results.items():
+        print('{0:<{width}} {1:12.2f} us'.format(name, microseconds, width=width))
+
+
+def add_arguments(parser, number):
+    parser.add_argument('--number', type=int, default=number, help='calls per measurement')
+    parser.add_argument('--json', metavar='PATH', help='also write the results to PATH')
+
+
+def report(benchmark, results, json_path=None):
+    print_results(results)
+    if json_path:
+        save(json_path, make_document(benchmark, results))
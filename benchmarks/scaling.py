@@ -0,0 +1,82 @@
+"""
+    Times run_all over synthetic rule sets while scaling the number of rules, the number of objects and the cost of
+    fetching a variable, for the interpreted engine and for compiled rule sets.
+
+    Usage: python -m benchmarks.scaling [--number N] [--json PATH] [--depth D] [--fanout F] [--any-ratio R]
+"""
+import argparse
+
+from business_rules import compile_rules, run_all
+
+from .generators import SyntheticActions, generate_objects, generate_rules, make_variables_cls
+from .results import add_arguments, report, time_call
+
+RULE_COUNTS = (10, 100, 1000)
+OBJECT_COUNTS = (1, 10, 100)
+# seconds spent fetching each variable
+VARIABLE_COSTS = (0, 1e-5, 1e-4)
+
+
+def _run_objects(rules, variables_cls, objects, cache_variables):
+    def run_objects():
+        for record in objects:
+            run_all(rules, variables_cls(record), SyntheticActions(), cache_variables=cache_variables)
+
+    return run_objects
+
+
+def _run_objects_compiled(compiled, variables_cls, objects, cache_variables):
+    def run_objects():
+        for record in objects:
+            compiled.run_all(variables_cls(record), SyntheticActions(), cache_variables=cache_variables)
+
+    return run_objects
+
+
+def _measure(results, label, rules, variables_cls, objects, number):
+    if 'run_all {0}'.format(label) in results:
+        return
+    compiled = compile_rules(rules, variables_cls, SyntheticActions)
+    for cache_variables in (False, True):
+        suffix = ' cache_variables' if cache_variables else ''
+        results['run_all {0}{1}'.format(label, suffix)] = time_call(
+            _run_objects(rules, variables_cls, objects, cache_variables), number)
+        results['compiled run_all {0}{1}'.format(label, suffix)] = time_call(
+            _run_objects_compiled(compiled, variables_cls, objects, cache_variables), number)
+
+
+def run(number=3, depth=2, fanout=3, any_ratio=0.5, rule_counts=RULE_COUNTS, object_counts=OBJECT_COUNTS,
+        variable_costs=VARIABLE_COSTS):
+    """ Returns the time in microseconds to run each rule set against all its objects. """
+    results = {}
+    variables_cls = make_variables_cls()
+    objects = generate_objects(max(object_counts))
+    rules = generate_rules(max(rule_counts), depth=depth, fanout=fanout, any_ratio=any_ratio)
+
+    for rule_count in rule_counts:
+        _measure(results, 'rules={0} objects=1'.format(rule_count), rules[:rule_count], variables_cls, objects[:1],
+                 number)
+
+    median_rules = rules[:sorted(rule_counts)[len(rule_counts) // 2]]
+    for object_count in object_counts:
+        _measure(results, 'rules={0} objects={1}'.format(len(median_rules), object_count), median_rules,
+                 variables_cls, objects[:object_count], number)
+
+    for cost in variable_costs:
+        _measure(results, 'rules={0} objects=1 variable_cost={1:g}us'.format(len(median_rules), cost * 1e6),
+                 median_rules, make_variables_cls(cost=cost), objects[:1], number)
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    add_arguments(parser, number=3)
+    parser.add_argument('--depth', type=int, default=2, help='levels of all / any nodes in every rule')
+    parser.add_argument('--fanout', type=int, default=3, help='children of every all / any node')
+    parser.add_argument('--any-ratio', type=float, default=0.5, help='share of any nodes among all / any nodes')
+    args = parser.parse_args(argv)
+    report('scaling', run(args.number, depth=args.depth, fanout=args.fanout, any_ratio=args.any_ratio), args.json)
+
+
+if __name__ == '__main__':
+    main()
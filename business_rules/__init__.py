@@ -1,8 +1,11 @@
 __version__ = '1.0.1'
 
+from .compiler import compile_rules
 from .engine import run, run_all
-from .utils import export_rule_data
+from .utils import export_rule_data, rule_data_etag
 
 # Appease pyflakes by "using" these exports
 assert run_all
+assert compile_rules
 assert export_rule_data
+assert rule_data_etag
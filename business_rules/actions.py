@@ -6,25 +6,38 @@ from .utils import fn_name_to_pretty_label, validate_parameters, docstring_to_to
 class BaseActions(object):
     """ Classes that hold a collection of actions to use with the rules engine should inherit from this. """
 
+    def __init_subclass__(cls, **kwargs):
+        super(BaseActions, cls).__init_subclass__(**kwargs)
+        cls._register_actions()
+
     @classmethod
-    def get_all_actions(cls):
+    def _register_actions(cls):
+        """
+            Collects the rule actions of the class once, when the class is created. Actions added to the class
+            afterwards aren't registered.
+        """
         methods = inspect.getmembers(cls)
-        return [{'name': m[0],
-                 'label': m[1].label,
-                 'params': m[1].params,
-                 'tooltip': docstring_to_tooltip(m[1].__doc__)
-                 } for m in methods if getattr(m[1], 'is_rule_action', False)]
+        cls._rule_actions = dict(m for m in methods if getattr(m[1], 'is_rule_action', False))
+        cls._actions_data = [{'name': m[0],
+                              'label': m[1].label,
+                              'params': m[1].params,
+                              'tooltip': docstring_to_tooltip(m[1].__doc__)
+                              } for m in methods if getattr(m[1], 'is_rule_action', False)]
+
+    @classmethod
+    def get_all_actions(cls):
+        """ Returns the data of every action sorted by name. The list is shared, don't modify it. """
+        return cls._actions_data
+
+
+BaseActions._register_actions()
 
 
 def rule_action(label=None, params=None):
     """ Decorator to make a function into a rule action. """
 
     def wrapper(func):
-        params_ = params
-        if isinstance(params, dict):
-            params_ = [dict(label=fn_name_to_pretty_label(name),
-                            name=name,
-                            fieldType=field_type) for name, field_type in params.items()]
+        params_ = _params_list(params)
         validate_parameters(func, params_, 'action')
         func.is_rule_action = True
         func.label = label or fn_name_to_pretty_label(func.__name__)
@@ -32,3 +45,32 @@ def rule_action(label=None, params=None):
         return func
 
     return wrapper
+
+
+def bulk_rule_action(label=None, params=None):
+    """
+        Decorator to make a function into a rule action run once for many objects, e.g. to insert rows with a single
+        query. The function becomes a classmethod taking a list of (defined_actions, params) pairs, one per object the
+        action was triggered for, and may return a list holding the value returned for each pair, which is chained
+        into the params of the next action of that object like do_actions does.
+
+        params describes the params of every pair, as for rule_action. run_all calls the action with a single pair,
+        bulk.run_all_bulk with every pair queued during the run.
+    """
+
+    def wrapper(func):
+        func.is_rule_action = True
+        func.is_bulk_action = True
+        func.label = label or fn_name_to_pretty_label(func.__name__)
+        func.params = _params_list(params)
+        return classmethod(func)
+
+    return wrapper
+
+
+def _params_list(params):
+    if isinstance(params, dict):
+        return [dict(label=fn_name_to_pretty_label(name),
+                     name=name,
+                     fieldType=field_type) for name, field_type in params.items()]
+    return params
@@ -0,0 +1,129 @@
+import asyncio
+import inspect
+
+from .engine import EvaluationContext, _call_action, _do_operator_comparison, _prepare_action
+from .utils import make_hashable
+
+
+async def run_all_async(rule_list,
+                        defined_variables,
+                        defined_actions,
+                        stop_on_first_trigger=False,
+                        cache_variables=False,
+                        prefetch=False,
+                        concurrency=None):
+    """
+        Same as engine.run_all, for variables and actions that may be coroutine functions (async def). Variables are
+        awaited lazily, so all / any conditions keep short-circuiting.
+
+        - prefetch - if True, the variables of all the leaf conditions of an all / any node are fetched concurrently
+          before the node is evaluated. This trades the short-circuit for latency and implies cache_variables.
+        - concurrency - the maximum number of variables fetched concurrently when prefetching, unlimited if None.
+    """
+    if cache_variables or prefetch:
+        defined_variables = EvaluationContext(defined_variables)
+    semaphore = asyncio.Semaphore(concurrency) if prefetch and concurrency else None
+    rule_was_triggered = False
+    for rule in rule_list:
+        result = await run_async(rule, defined_variables, defined_actions, prefetch=prefetch, semaphore=semaphore)
+        if result:
+            rule_was_triggered = True
+            if stop_on_first_trigger:
+                return True
+    return rule_was_triggered
+
+
+async def run_async(rule, defined_variables, defined_actions, prefetch=False, semaphore=None):
+    conditions, actions = rule['conditions'], rule['actions']
+    rule_triggered = await check_conditions_recursively_async(conditions, defined_variables,
+                                                              prefetch=prefetch, semaphore=semaphore)
+    if rule_triggered:
+        await do_actions_async(actions, defined_actions)
+        return True
+    return False
+
+
+async def check_conditions_recursively_async(conditions, defined_variables, prefetch=False, semaphore=None):
+    keys = list(conditions.keys())
+    if keys == ['all'] or keys == ['any']:
+        kind = keys[0]
+        assert len(conditions[kind]) >= 1
+        if prefetch and isinstance(defined_variables, EvaluationContext):
+            await _prefetch_variables(conditions[kind], defined_variables, semaphore)
+        for condition in conditions[kind]:
+            result = await check_conditions_recursively_async(condition, defined_variables,
+                                                              prefetch=prefetch, semaphore=semaphore)
+            if kind == 'all' and not result:
+                return False
+            if kind == 'any' and result:
+                return True
+        return kind == 'all'
+
+    # help prevent errors - any and all can only be in the condition dict if they're the only item
+    assert not ('any' in keys or 'all' in keys)
+    return await check_condition_async(conditions, defined_variables)
+
+
+async def check_condition_async(condition, defined_variables):
+    """ Same as engine.check_condition, awaiting the variable if it is a coroutine function. """
+    name, op, value, params = condition['name'], condition['operator'], condition['value'], condition.get('params', {})
+    operator_type = await _get_variable_value_async(defined_variables, name, params)
+    return _do_operator_comparison(operator_type, op, value)
+
+
+async def _get_variable_value_async(defined_variables, name, params):
+    if isinstance(defined_variables, EvaluationContext):
+        key = (name, make_hashable(params))
+        if key in defined_variables.values:
+            return defined_variables.values[key]
+        value = await _fetch_variable_value(defined_variables.defined_variables, name, params)
+        if getattr(getattr(defined_variables.defined_variables, name, None), 'cache', True):
+            defined_variables.values[key] = value
+        return value
+    return await _fetch_variable_value(defined_variables, name, params)
+
+
+async def _fetch_variable_value(defined_variables, name, params):
+    method = getattr(defined_variables, name, None)
+    if method is None:
+        raise AssertionError("Variable {0} is not defined in class {1}".format(
+            name, defined_variables.__class__.__name__))
+    try:
+        val = method(**params)
+        if inspect.isawaitable(val):
+            val = await val
+    except TypeError as ex:
+        raise TypeError("Variable params object has to be of dict type! - {}".format(str(ex)))
+    except KeyError as ex:
+        raise KeyError("Expected params ({}) were not provided!".format(str(ex)))
+    return method.field_type(val)
+
+
+async def _prefetch_variables(conditions, context, semaphore):
+    """ Concurrently fetches the not yet cached variables of the leaf conditions in the given list. """
+    to_fetch = {}
+    for condition in conditions:
+        if 'all' in condition or 'any' in condition:
+            continue
+        name, params = condition['name'], condition.get('params', {})
+        key = (name, make_hashable(params))
+        if key not in context.values and getattr(getattr(context.defined_variables, name, None), 'cache', True):
+            to_fetch[key] = (name, params)
+
+    async def fetch(name, params):
+        if semaphore is None:
+            return await _get_variable_value_async(context, name, params)
+        async with semaphore:
+            return await _get_variable_value_async(context, name, params)
+
+    await asyncio.gather(*[fetch(name, params) for name, params in to_fetch.values()])
+
+
+async def do_actions_async(actions, defined_actions):
+    """ Same as engine.do_actions, awaiting the actions that are coroutine functions. """
+    returned_values = None
+    for action in actions:
+        method, params = _prepare_action(action, defined_actions, returned_values)
+        returned_values = _call_action(method, defined_actions, params)
+        if inspect.isawaitable(returned_values):
+            returned_values = await returned_values
@@ -0,0 +1,378 @@
+import math
+from datetime import timezone
+from decimal import Decimal
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover
+    np = None
+
+from .compiler import ConditionLeaf, leaf_key, prepare_conditions
+from .fields import FIELD_NO_INPUT
+from .operators import (BooleanType,
+                        DateType,
+                        NativeNumericType,
+                        NumericType,
+                        SelectMultipleType,
+                        SelectType,
+                        StringType,
+                        fold_select_value)
+from .six import string_types
+from .variables import BaseVariables, rule_variable
+
+
+def run_all_batch(rule_list, columns, variables_cls=None):
+    """
+        Evaluates the conditions of every rule in rule_list over a batch of records at once. No action is run.
+
+        - columns - a dict mapping each variable name to a NumPy array (or sequence) holding the value of that variable
+          for every record. Integer columns are compared exactly, like NumericType does, but float columns are
+          compared at float64 precision. Dates are expected as datetime64 arrays. The values of select and select
+          multiple variables are sequences themselves, e.g. a list of tag lists of any lengths.
+        - variables_cls - the BaseVariables subclass giving the field type of every variable. If it isn't given the
+          field types are inferred from the dtype of the columns.
+
+        Returns a boolean array of shape (len(rule_list), number of records), where result[i, j] is True if the
+        conditions of rule i are met for record j.
+    """
+    if np is None:
+        raise ImportError("run_all_batch requires numpy to be installed")
+
+    columns = dict((name, _as_column(column)) for name, column in columns.items())
+    lengths = set(len(column) for column in columns.values())
+    if len(lengths) > 1:
+        raise AssertionError("All columns must have the same length, got lengths {0}".format(sorted(lengths)))
+    size = lengths.pop() if lengths else 0
+
+    if variables_cls is None:
+        variables_cls = _infer_variables_cls(rule_list, columns)
+
+    evaluator = _BatchEvaluator(columns, variables_cls, size)
+    result = np.zeros((len(rule_list), size), dtype=bool)
+    for rule_index, rule in enumerate(rule_list):
+        result[rule_index] = evaluator.evaluate(prepare_conditions(rule['conditions'], variables_cls))
+    return result
+
+
+def _as_column(values):
+    """
+        Returns the values of a column as a 1-D array. Values that are sequences themselves (select values) are kept
+        as the items of an object array, instead of becoming a 2-D array or failing when they have different lengths.
+    """
+    if isinstance(values, np.ndarray) and values.ndim == 1:
+        return values
+    values = list(values)
+    if any(isinstance(value, np.ndarray) or (hasattr(value, '__iter__') and not isinstance(value, string_types))
+           for value in values):
+        column = np.empty(len(values), dtype=object)
+        for index, value in enumerate(values):
+            column[index] = value.tolist() if isinstance(value, np.ndarray) else value
+        return column
+    return np.asarray(values)
+
+
+def _condition_operators(conditions, operators):
+    """ Collects the operator names used for each variable in a raw condition dict. """
+    if 'all' in conditions or 'any' in conditions:
+        for condition in conditions.get('all', conditions.get('any')):
+            _condition_operators(condition, operators)
+    else:
+        operators.setdefault(conditions['name'], set()).add(conditions['operator'])
+    return operators
+
+
+def _infer_field_type(column, operators):
+    kind = column.dtype.kind
+    if kind == 'b':
+        return BooleanType
+    if kind in 'iuf':
+        return NumericType
+    if kind == 'M':
+        return DateType
+    if kind in 'US':
+        return StringType
+
+    sample = next((value for value in column if value is not None), None)
+    if isinstance(sample, bool):
+        return BooleanType
+    if isinstance(sample, string_types) or sample is None:
+        return StringType
+    if hasattr(sample, '__iter__'):
+        if operators - set(operator['name'] for operator in SelectType.get_all_operators()):
+            return SelectMultipleType
+        return SelectType
+    return NumericType
+
+
+def _infer_variables_cls(rule_list, columns):
+    operators = {}
+    for rule in rule_list:
+        _condition_operators(rule['conditions'], operators)
+
+    def column_variable(field_type):
+        return rule_variable(field_type)(lambda self: None)
+
+    attributes = dict((name, column_variable(_infer_field_type(column, operators.get(name, set()))))
+                      for name, column in columns.items())
+    return type('BatchVariables', (BaseVariables,), attributes)
+
+
+def _integer_mask(values, operator_name, other):
+    """ Same as _numeric_mask for an integer column and a Decimal, comparing the values to exact integer bounds. """
+    epsilon = NumericType.EPSILON
+    # the values v such that abs(v - other) <= epsilon are the integers in [low, high]
+    low, high = math.ceil(other - epsilon), math.floor(other + epsilon)
+    if operator_name == 'equal_to':
+        return _at_least(values, low) & _at_most(values, high)
+    if operator_name == 'not_equal_to':
+        return ~(_at_least(values, low) & _at_most(values, high))
+    if operator_name == 'greater_than':
+        return _at_least(values, high + 1)
+    if operator_name == 'greater_than_or_equal_to':
+        return _at_least(values, low)
+    if operator_name == 'less_than':
+        return _at_most(values, low - 1)
+    if operator_name == 'less_than_or_equal_to':
+        return _at_most(values, high)
+    return None
+
+
+def _at_least(values, bound):
+    """ values >= bound, for a Python int bound that may not fit the dtype of the values. """
+    limits = np.iinfo(values.dtype)
+    if bound <= limits.min:
+        return np.ones(len(values), dtype=bool)
+    if bound > limits.max:
+        return np.zeros(len(values), dtype=bool)
+    return values >= values.dtype.type(bound)
+
+
+def _at_most(values, bound):
+    limits = np.iinfo(values.dtype)
+    if bound >= limits.max:
+        return np.ones(len(values), dtype=bool)
+    if bound < limits.min:
+        return np.zeros(len(values), dtype=bool)
+    return values <= values.dtype.type(bound)
+
+
+def _numeric_mask(values, operator_name, other):
+    if values.dtype.kind in 'iu' and isinstance(other, Decimal):
+        return _integer_mask(values, operator_name, other)
+    epsilon = float(NumericType.EPSILON)
+    other = float(other)
+    if operator_name == 'equal_to':
+        return np.abs(values - other) <= epsilon
+    if operator_name == 'not_equal_to':
+        return np.abs(values - other) > epsilon
+    if operator_name == 'greater_than':
+        return (values - other) > epsilon
+    if operator_name == 'greater_than_or_equal_to':
+        return (values - other) >= -epsilon
+    if operator_name == 'less_than':
+        return (other - values) > epsilon
+    if operator_name == 'less_than_or_equal_to':
+        return (other - values) >= -epsilon
+    return None
+
+
+def _date_mask(values, operator_name, other):
+    if other.tzinfo is not None:
+        other = other.astimezone(timezone.utc).replace(tzinfo=None)
+    other = np.datetime64(other)
+    if operator_name == 'equal_to':
+        return values == other
+    if operator_name == 'not_equal_to':
+        return values != other
+    if operator_name == 'greater_than':
+        return values > other
+    if operator_name == 'greater_than_or_equal_to':
+        return values >= other
+    if operator_name == 'less_than':
+        return values < other
+    if operator_name == 'less_than_or_equal_to':
+        return values <= other
+    return None
+
+
+def _string_mask(values, operator_name, other):
+    if operator_name == 'equal_to':
+        return values == other
+    if operator_name == 'not_equal_to':
+        return values != other
+    if operator_name == 'equal_to_case_insensitive':
+        return np.char.lower(values) == other.lower()
+    if operator_name == 'starts_with':
+        return np.char.startswith(values, other)
+    if operator_name == 'ends_with':
+        return np.char.endswith(values, other)
+    if operator_name == 'contains':
+        return np.char.find(values, other) >= 0
+    if operator_name == 'non_empty':
+        return np.char.str_len(values) > 0
+    return None
+
+
+def _select_mask(membership, operator_name, other):
+    """
+        Evaluates a SelectType / SelectMultipleType operator from a _Membership of the column. Returns None if other
+        holds unhashable items.
+    """
+    try:
+        if operator_name == 'contains':
+            return membership.any_of([fold_select_value(other)])
+        if operator_name == 'does_not_contain':
+            return ~membership.any_of([fold_select_value(other)])
+        if operator_name == 'contains_all':
+            return membership.all_of(other)
+        if operator_name == 'is_contained_by':
+            return membership.only_items_in(other)
+        if operator_name == 'shares_at_least_one_element_with':
+            return membership.any_of(other)
+        if operator_name == 'shares_exactly_one_element_with':
+            return membership.count_of(other) == 1
+        if operator_name == 'shares_no_elements_with':
+            return ~membership.any_of(other)
+    except TypeError:
+        return None
+    return None
+
+
+def _boolean_mask(values, operator_name, other):
+    if operator_name == 'is_true':
+        return values.copy()
+    if operator_name == 'is_false':
+        return ~values
+    return None
+
+
+class _BatchEvaluator(object):
+    """ Evaluates prepared condition trees over columns, sharing the mask of identical leaves between rules. """
+
+    def __init__(self, columns, variables_cls, size):
+        self.columns = columns
+        self.variables_cls = variables_cls
+        self.size = size
+        self._prepared_columns = {}
+        self._memberships = {}
+        self._leaf_masks = {}
+
+    def evaluate(self, conditions):
+        if isinstance(conditions, ConditionLeaf):
+            key = leaf_key(conditions)
+            if key not in self._leaf_masks:
+                self._leaf_masks[key] = self._evaluate_leaf(conditions)
+            return self._leaf_masks[key]
+
+        children = iter(conditions.children)
+        mask = self.evaluate(next(children)).copy()
+        for condition in children:
+            if conditions.kind == 'all':
+                if not mask.any():
+                    break
+                mask &= self.evaluate(condition)
+            else:
+                if mask.all():
+                    break
+                mask |= self.evaluate(condition)
+        return mask
+
+    def _get_column(self, name, field_type):
+        """ Returns the column cast to the dtype the vectorized operators of field_type expect. """
+        if name not in self._prepared_columns:
+            if name not in self.columns:
+                raise AssertionError("No column was given for variable {0}".format(name))
+            column = self.columns[name]
+            if issubclass(field_type, NumericType):
+                # NumericType compares ints exactly, NativeNumericType converts them to floats
+                if field_type is NativeNumericType or column.dtype.kind not in 'iu':
+                    column = column.astype(float)
+            elif field_type is BooleanType:
+                column = column.astype(bool)
+            elif field_type is StringType and column.dtype.kind == 'O':
+                # StringType casts None to an empty string
+                column = np.array([value or '' for value in column], dtype=str)
+            self._prepared_columns[name] = column
+        return self._prepared_columns[name]
+
+    def _get_membership(self, name, field_type, values):
+        """ Returns the _Membership of a select column, or None if some of its items are unhashable. """
+        if name not in self._memberships:
+            try:
+                self._memberships[name] = _Membership([field_type(value).value for value in values])
+            except TypeError:
+                self._memberships[name] = None
+        return self._memberships[name]
+
+    def _evaluate_leaf(self, leaf):
+        if leaf.params:
+            raise AssertionError("Variable {0} takes params, which are not supported by run_all_batch".format(
+                leaf.name))
+        field_type = leaf.field_type
+        values = self._get_column(leaf.name, field_type)
+
+        mask = None
+        if issubclass(field_type, NumericType):
+            mask = _numeric_mask(values, leaf.operator, leaf.value)
+        elif field_type is DateType and values.dtype.kind == 'M':
+            mask = _date_mask(values, leaf.operator, leaf.value)
+        elif field_type is StringType:
+            mask = _string_mask(values, leaf.operator, leaf.value)
+        elif field_type is BooleanType:
+            mask = _boolean_mask(values, leaf.operator, leaf.value)
+        elif issubclass(field_type, (SelectType, SelectMultipleType)):
+            membership = self._get_membership(leaf.name, field_type, values)
+            if membership is not None:
+                mask = _select_mask(membership, leaf.operator, leaf.value)
+        if mask is not None:
+            return np.asarray(mask, dtype=bool)
+
+        # no vectorized implementation, e.g. regexes or unhashable select items: fall back to the operator, one record
+        # at a time
+        operator = getattr(field_type, leaf.operator)
+        if operator.input_type == FIELD_NO_INPUT:
+            return np.fromiter((bool(operator(field_type(value))) for value in values), dtype=bool, count=self.size)
+        operator = operator.__wrapped__
+        return np.fromiter((bool(operator(field_type(value), leaf.value)) for value in values),
+                           dtype=bool, count=self.size)
+
+
+class _Membership(object):
+    """
+        One-hot encoding of a select column: matrix[i, j] is True if record i holds the j-th item of the vocabulary,
+        the folded items (see operators.FoldedValues) found in the whole column. Raises TypeError if an item is
+        unhashable.
+    """
+
+    def __init__(self, values):
+        self.vocabulary = {}
+        rows, positions = [], []
+        for row, value in enumerate(values):
+            for item in value:
+                rows.append(row)
+                positions.append(self.vocabulary.setdefault(fold_select_value(item), len(self.vocabulary)))
+        self.matrix = np.zeros((len(values), len(self.vocabulary)), dtype=bool)
+        self.matrix[rows, positions] = True
+
+    def _positions(self, items):
+        """ Returns the vocabulary positions of the given folded items, skipping the ones no record holds. """
+        vocabulary = self.vocabulary
+        return [vocabulary[item] for item in items if item in vocabulary]
+
+    def any_of(self, items):
+        return self.matrix[:, self._positions(items)].any(axis=1)
+
+    def count_of(self, items):
+        """ The number of the items each record holds, counting repeated items as many times as they're given. """
+        return self.matrix[:, self._positions(items)].sum(axis=1)
+
+    def all_of(self, items):
+        items = list(items)
+        positions = self._positions(items)
+        if len(positions) < len(items):
+            return np.zeros(len(self.matrix), dtype=bool)
+        return self.matrix[:, positions].all(axis=1)
+
+    def only_items_in(self, items):
+        outside = [position for item, position in self.vocabulary.items() if item not in items]
+        return ~self.matrix[:, outside].any(axis=1)
@@ -0,0 +1,91 @@
+from .engine import (EvaluationContext,
+                     _action_params,
+                     _call_action,
+                     _get_action_method,
+                     _is_bulk_action,
+                     check_conditions_recursively)
+
+
+def run_all_bulk(rule_list, objects, stop_on_first_trigger=False, cache_variables=False):
+    """
+        Same as engine.run_all for many objects, but the actions of the triggered rules are queued and run once all
+        the objects were evaluated, so that each action declared with bulk_rule_action is called with many objects at
+        once (see ActionQueue).
+
+        - objects - an iterable of (defined_variables, defined_actions) pairs, one per object.
+
+        Returns a list with the result of run_all for each object, in input order.
+    """
+    queue = ActionQueue()
+    results = []
+    for defined_variables, defined_actions in objects:
+        if cache_variables:
+            defined_variables = EvaluationContext(defined_variables)
+        rule_was_triggered = False
+        for rule in rule_list:
+            if check_conditions_recursively(rule['conditions'], defined_variables):
+                queue.add(rule['actions'], defined_actions)
+                rule_was_triggered = True
+                if stop_on_first_trigger:
+                    break
+        results.append(rule_was_triggered)
+    queue.flush()
+    return results
+
+
+class ActionQueue(object):
+    """
+        Queues the actions of triggered rules, per object (i.e. defined_actions instance), and runs them in waves on
+        flush: each wave runs the next queued action of every object. The calls of a wave to the same bulk action (see
+        bulk_rule_action) of the same actions class are grouped into a single call, the other actions are run one at
+        a time.
+
+        The actions of each object run in the order they were queued, and the values returned by an action are
+        chained into the params of the next action of the same rule, like do_actions does.
+    """
+
+    def __init__(self):
+        # one (defined_actions, [(method, action, starts_a_rule), ...]) entry per object, in the order first queued
+        self._objects = []
+        self._indices = {}
+
+    def __len__(self):
+        return sum(len(steps) for _, steps in self._objects)
+
+    def add(self, actions, defined_actions):
+        """ Queues the actions of one triggered rule for one object. """
+        steps = []
+        for position, action in enumerate(actions):
+            method = _get_action_method(defined_actions, action['name'])
+            steps.append((method, action, position == 0))
+
+        index = self._indices.get(id(defined_actions))
+        if index is None:
+            index = self._indices[id(defined_actions)] = len(self._objects)
+            self._objects.append((defined_actions, []))
+        self._objects[index][1].extend(steps)
+
+    def flush(self):
+        """ Runs every queued action and empties the queue. """
+        objects, self._objects, self._indices = self._objects, [], {}
+        returned_values = [None] * len(objects)
+        for wave in range(max([len(steps) for _, steps in objects] + [0])):
+            bulk_calls = {}
+            for index, (defined_actions, steps) in enumerate(objects):
+                if wave >= len(steps):
+                    continue
+                method, action, starts_a_rule = steps[wave]
+                params = _action_params(action, None if starts_a_rule else returned_values[index])
+
+                if _is_bulk_action(method):
+                    method, calls, indices = bulk_calls.setdefault((type(defined_actions), action['name']),
+                                                                   (method, [], []))
+                    calls.append((defined_actions, params))
+                    indices.append(index)
+                else:
+                    returned_values[index] = _call_action(method, defined_actions, params)
+
+            for method, calls, indices in bulk_calls.values():
+                results = method(calls) or [None] * len(calls)
+                for index, result in zip(indices, results):
+                    returned_values[index] = result
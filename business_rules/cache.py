@@ -0,0 +1,143 @@
+import hashlib
+import inspect
+import json
+import os
+import pickle
+import platform
+import tempfile
+from decimal import Decimal
+
+from . import __version__
+from .compiler import CompiledRule, CompiledRuleSet, build_condition, compile_rules, field_type_overrides
+
+# bumped whenever the layout of the cached files changes
+CACHE_FORMAT = 1
+
+
+def compile_rules_cached(rules, variables_cls, actions_cls, cache_dir, native_numbers=False, epoch_dates=False):
+    """
+        Same as compiler.compile_rules, but keeps the validated and pre-cast rules in cache_dir, like .pyc files, so
+        that the next process compiling the same rules only has to unpickle them.
+
+        - rules - the rule list, or the JSON document holding it (str or bytes). Passing the JSON saves parsing it
+          when the rules are found in the cache. The JSON is hashed as is, so the same rules passed as a list and as
+          JSON don't share their cache file.
+
+        The cache file is keyed by a hash of the rules, of the variables / actions exposed by the given classes (names,
+        field types, params, signatures), of the code and constants of every field type they use, of the
+        business_rules version and of the Python version. Changing any of them compiles the rules again. Files are
+        written atomically, so any number of processes can share cache_dir.
+    """
+    if isinstance(rules, (str, bytes)):
+        rules_json = rules.encode('utf-8') if isinstance(rules, str) else rules
+        rule_list = None
+    else:
+        rules_json = json.dumps(rules, sort_keys=True, separators=(',', ':'), default=str).encode('utf-8')
+        rule_list = rules
+
+    key = cache_key(rules_json, variables_cls, actions_cls, native_numbers=native_numbers, epoch_dates=epoch_dates)
+    path = os.path.join(cache_dir, '{0}.pickle'.format(key))
+    compiled_rules = _load(path, key, variables_cls, actions_cls)
+    if compiled_rules is not None:
+        return compiled_rules
+
+    if rule_list is None:
+        rule_list = json.loads(rules_json.decode('utf-8'))
+    compiled_rules = compile_rules(rule_list, variables_cls, actions_cls,
+                                   native_numbers=native_numbers, epoch_dates=epoch_dates)
+    _dump(path, key, compiled_rules)
+    return compiled_rules
+
+
+def cache_key(rules_json, variables_cls, actions_cls, native_numbers=False, epoch_dates=False):
+    """ Returns the hex sha256 naming the cache file of the given rules (as JSON bytes), classes and options. """
+    field_types = set(method.field_type for method in variables_cls._rule_variables.values())
+    field_types.update(field_type_overrides(native_numbers=native_numbers, epoch_dates=epoch_dates).values())
+
+    digest = hashlib.sha256()
+    for part in [CACHE_FORMAT, __version__, platform.python_implementation(), platform.python_version(),
+                 native_numbers, epoch_dates,
+                 _variables_signature(variables_cls),
+                 _actions_signature(actions_cls),
+                 sorted(_type_signature(field_type) for field_type in field_types)]:
+        digest.update(repr(part).encode('utf-8'))
+        digest.update(b'\0')
+    digest.update(hashlib.sha256(rules_json).digest())
+    return digest.hexdigest()
+
+
+def _load(path, key, variables_cls, actions_cls):
+    try:
+        with open(path, 'rb') as cache_file:
+            cached_key, rules = pickle.load(cache_file)
+    except Exception:
+        # missing, truncated or unreadable file (e.g. pickled classes that were since renamed): compile again
+        return None
+    if cached_key != key:
+        return None
+    return CompiledRuleSet([CompiledRule(conditions, actions, build_condition(conditions, variables_cls))
+                            for conditions, actions in rules], variables_cls, actions_cls)
+
+
+def _dump(path, key, compiled_rules):
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    rules = [(rule.conditions, rule.actions) for rule in compiled_rules.rules]
+    fd, temp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as temp_file:
+            pickle.dump((key, rules), temp_file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temp_path, path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+
+
+def _qualified_name(obj):
+    return '{0}.{1}'.format(obj.__module__, obj.__qualname__)
+
+
+def _signature(func):
+    try:
+        return str(inspect.signature(func))
+    except (TypeError, ValueError):
+        return None
+
+
+def _variables_signature(variables_cls):
+    return (_qualified_name(variables_cls),
+            [(name, _qualified_name(method.field_type), method.params, method.options, getattr(method, 'cache', True),
+              _signature(method))
+             for name, method in sorted(variables_cls._rule_variables.items())])
+
+
+def _actions_signature(actions_cls):
+    if actions_cls is None:
+        # the actions aren't validated, see compiler.prepare_actions
+        return None
+    return (_qualified_name(actions_cls),
+            [(name, method.params, _signature(method)) for name, method in sorted(actions_cls._rule_actions.items())])
+
+
+def _type_signature(field_type):
+    """ Fingerprints the code and constants of a field type and of its base classes. """
+    return [(_qualified_name(cls), sorted(_member_signature(name, member) for name, member in vars(cls).items()
+                                          if not (name.startswith('__') and name.endswith('__'))))
+            for cls in field_type.__mro__ if cls is not object]
+
+
+def _member_signature(name, member):
+    if isinstance(member, (staticmethod, classmethod)):
+        member = member.__func__
+    if inspect.isfunction(member):
+        attributes = sorted((key, repr(value)) for key, value in vars(member).items() if key != '__wrapped__')
+        member = inspect.unwrap(member)
+        return name, _code_signature(member.__code__), attributes
+    if isinstance(member, (str, bytes, int, float, bool, Decimal, tuple, type(None))):
+        return name, repr(member)
+    return name, type(member).__name__
+
+
+def _code_signature(code):
+    consts = tuple(_code_signature(const) if inspect.iscode(const) else repr(const) for const in code.co_consts)
+    return code.co_code, consts, code.co_names
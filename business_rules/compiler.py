@@ -0,0 +1,240 @@
+from collections import namedtuple
+
+from .engine import EvaluationContext, do_actions
+from .fields import FIELD_NO_INPUT
+from .operators import DateType, EpochDateType, NativeNumericType, NumericType
+from .utils import make_hashable
+
+ConditionLeaf = namedtuple('ConditionLeaf', ['name', 'operator', 'value', 'params', 'field_type'])
+ConditionGroup = namedtuple('ConditionGroup', ['kind', 'children'])
+
+
+def compile_rules(rule_list, variables_cls, actions_cls, native_numbers=False, epoch_dates=False, optimize=False,
+                  order_by_cost=False):
+    """
+        Validates rule_list once against the given BaseVariables and BaseActions subclasses and turns every rule into
+        precompiled Python callables. actions_cls may be None if the rule set is only used to evaluate conditions (e.g.
+        with plan.plan_all), in which case the actions aren't validated.
+
+        - native_numbers - if True, every NumericType variable is compared as a NativeNumericType (native ints and
+          floats instead of Decimals).
+        - epoch_dates - if True, every DateType variable is compared as an EpochDateType (POSIX timestamps).
+        - optimize - if True, the condition trees are simplified with optimizer.optimize_conditions first. The
+          conditions of the rules that can never fire are then False, see CompiledRuleSet.never_firing_rules.
+        - order_by_cost - if True, the children of every all / any node are evaluated cheapest first, given the cost
+          hints of the variables (see ordering.order_by_cost).
+
+        Returns a CompiledRuleSet whose run_all has the same semantics as engine.run_all.
+    """
+    field_types = field_type_overrides(native_numbers=native_numbers, epoch_dates=epoch_dates)
+    rules = [compile_rule(rule, variables_cls, actions_cls, field_types=field_types, optimize=optimize,
+                          order_by_cost=order_by_cost)
+             for rule in rule_list]
+    return CompiledRuleSet(rules, variables_cls, actions_cls)
+
+
+def compile_rule(rule, variables_cls, actions_cls, field_types=None, optimize=False, order_by_cost=False):
+    conditions = prepare_conditions(rule['conditions'], variables_cls, field_types=field_types)
+    if optimize:
+        from .optimizer import optimize_conditions
+        conditions = optimize_conditions(conditions)
+    if order_by_cost:
+        from .ordering import order_by_cost as order_conditions
+        conditions = order_conditions(conditions, variables_cls)
+    actions = prepare_actions(rule['actions'], actions_cls)
+    return CompiledRule(conditions, actions, build_condition(conditions, variables_cls))
+
+
+def field_type_overrides(native_numbers=False, epoch_dates=False):
+    """ Returns the mapping of declared field_type -> field_type to compare as, for prepare_conditions. """
+    field_types = {}
+    if native_numbers:
+        field_types[NumericType] = NativeNumericType
+    if epoch_dates:
+        field_types[DateType] = EpochDateType
+    return field_types
+
+
+def prepare_conditions(conditions, variables_cls, field_types=None):
+    """
+        Validates a condition dict the same way engine.check_conditions_recursively does and returns it as a tree of
+        ConditionGroup / ConditionLeaf tuples. Each leaf holds the field_type its variable is compared as (the one it
+        was declared with, unless it is overridden in field_types), and its value is already cast for its operator.
+    """
+    keys = list(conditions.keys())
+    if keys == ['all'] or keys == ['any']:
+        kind = keys[0]
+        assert len(conditions[kind]) >= 1
+        return ConditionGroup(kind, tuple(prepare_conditions(condition, variables_cls, field_types=field_types)
+                                          for condition in conditions[kind]))
+
+    # help prevent errors - any and all can only be in the condition dict if they're the only item
+    assert not ('any' in keys or 'all' in keys)
+    name, op, value, params = conditions['name'], conditions['operator'], conditions['value'], \
+        conditions.get('params', {})
+    field_type = _get_variable_method(variables_cls, name).field_type
+    if field_types:
+        field_type = field_types.get(field_type, field_type)
+    _get_operator_method(field_type, op)
+    return ConditionLeaf(name, op, field_type.cast_operator_value(op, value), params, field_type)
+
+
+def leaf_key(leaf):
+    """ Returns a hashable key identifying a ConditionLeaf by its variable, operator, value and params. """
+    return leaf.name, leaf.operator, make_hashable(leaf.value), make_hashable(leaf.params)
+
+
+def prepare_actions(actions, actions_cls):
+    """ Makes sure every action in the list is defined on actions_cls, unless actions_cls is None. """
+    if actions_cls is None:
+        return actions
+    for action in actions:
+        if not callable(getattr(actions_cls, action['name'], None)):
+            raise AssertionError("Action {0} is not defined in class {1}".format(
+                action['name'], actions_cls.__name__))
+    return actions
+
+
+def build_condition(conditions, variables_cls, profiler=None):
+    """
+        Turns a tree returned by prepare_conditions into a single callable taking the defined_variables instance and
+        returning a bool. The tree may also be True or False, as returned by optimizer.optimize_conditions.
+
+        - profiler - if given, the variables fetched by the callable are timed with it (see profiling.Profiler).
+    """
+    if isinstance(conditions, bool):
+        return lambda defined_variables: conditions
+    if isinstance(conditions, ConditionLeaf):
+        return _build_leaf(conditions, variables_cls, profiler)
+
+    checks = tuple(build_condition(condition, variables_cls, profiler) for condition in conditions.children)
+    if conditions.kind == 'all':
+        def check_all(defined_variables):
+            for check in checks:
+                if not check(defined_variables):
+                    return False
+            return True
+
+        return check_all
+
+    def check_any(defined_variables):
+        for check in checks:
+            if check(defined_variables):
+                return True
+        return False
+
+    return check_any
+
+
+def _build_leaf(leaf, variables_cls, profiler=None):
+    method = _get_variable_method(variables_cls, leaf.name)
+    field_type = leaf.field_type
+    operator = _get_operator_method(field_type, leaf.operator)
+    # leaf.value was cast by prepare_conditions, skip the casting done by the type_operator wrapper
+    operator = getattr(operator, '__wrapped__', operator)
+    value, params = leaf.value, leaf.params
+    key, cacheable = (leaf.name, make_hashable(params)), getattr(method, 'cache', True)
+
+    def fetch(defined_variables):
+        variables_method = method
+        if type(defined_variables) is not variables_cls:
+            # e.g. an instance of a subclass overriding the variable, which run_all would call
+            variables_method = getattr(type(defined_variables), leaf.name, method)
+        try:
+            val = variables_method(defined_variables, **params)
+        except TypeError as ex:
+            raise TypeError("Variable params object has to be of dict type! - {}".format(str(ex)))
+        except KeyError as ex:
+            raise KeyError("Expected params ({}) were not provided!".format(str(ex)))
+        return field_type(val)
+
+    if profiler is not None:
+        fetch = profiler.timed_variable(leaf.name, fetch)
+
+    def get_operator_type(defined_variables):
+        if isinstance(defined_variables, EvaluationContext):
+            values = defined_variables.values
+            if key in values:
+                operator_type = values[key]
+                # the value may have been cached by a leaf comparing the variable as another field_type
+                return operator_type if type(operator_type) is field_type else field_type(operator_type.value)
+            operator_type = fetch(defined_variables.defined_variables)
+            if cacheable:
+                values[key] = operator_type
+            return operator_type
+        return fetch(defined_variables)
+
+    if getattr(operator, 'input_type', '') == FIELD_NO_INPUT:
+        def check_leaf(defined_variables):
+            return bool(operator(get_operator_type(defined_variables)))
+    else:
+        def check_leaf(defined_variables):
+            return bool(operator(get_operator_type(defined_variables), value))
+
+    return check_leaf
+
+
+def _get_variable_method(variables_cls, name):
+    method = getattr(variables_cls, name, None)
+    if not getattr(method, 'is_rule_variable', False):
+        raise AssertionError("Variable {0} is not defined in class {1}".format(name, variables_cls.__name__))
+    return method
+
+
+def _get_operator_method(field_type, operator_name):
+    # the operators of a type are registered when the class is created, see BaseType._register_operators
+    method = field_type._operators.get(operator_name)
+    if method is None:
+        raise AssertionError("Operator {0} does not exist for type {1}".format(operator_name, field_type.__name__))
+    return method
+
+
+class CompiledRule(object):
+    """ A single validated rule: its condition tree, its actions and the compiled callable checking the conditions. """
+
+    def __init__(self, conditions, actions, check):
+        self.conditions = conditions
+        self.actions = actions
+        self.check = check
+
+    def run(self, defined_variables, defined_actions):
+        if self.check(defined_variables):
+            do_actions(self.actions, defined_actions)
+            return True
+        return False
+
+
+class CompiledRuleSet(object):
+    """ The result of compile_rules. Can be reused for any number of objects. """
+
+    def __init__(self, rules, variables_cls, actions_cls):
+        self.rules = rules
+        self.variables_cls = variables_cls
+        self.actions_cls = actions_cls
+
+    def __len__(self):
+        return len(self.rules)
+
+    def __iter__(self):
+        return iter(self.rules)
+
+    def never_firing_rules(self):
+        """
+            Returns the indices of the rules whose conditions were folded to False, see compile_rules(optimize=True).
+        """
+        return [rule_index for rule_index, rule in enumerate(self.rules) if rule.conditions is False]
+
+    def run_all(self, defined_variables, defined_actions, stop_on_first_trigger=False, cache_variables=False,
+                profiler=None):
+        if profiler is not None:
+            return profiler.run_compiled(self, defined_variables, defined_actions,
+                                         stop_on_first_trigger=stop_on_first_trigger, cache_variables=cache_variables)
+        if cache_variables:
+            defined_variables = EvaluationContext(defined_variables)
+        rule_was_triggered = False
+        for rule in self.rules:
+            if rule.run(defined_variables, defined_actions):
+                rule_was_triggered = True
+                if stop_on_first_trigger:
+                    return True
+        return rule_was_triggered
@@ -1,10 +1,27 @@
+import inspect
+
 from .fields import FIELD_NO_INPUT
+from .utils import make_hashable
 
 
 def run_all(rule_list,
             defined_variables,
             defined_actions,
-            stop_on_first_trigger=False):
+            stop_on_first_trigger=False,
+            cache_variables=False,
+            profiler=None):
+    """
+        Runs every rule in rule_list against the given variables and actions.
+
+        - cache_variables - if True, each variable is fetched at most once per params for the length of this call and
+          shared between all the rules and conditions naming it (see EvaluationContext).
+        - profiler - a profiling.Profiler recording the time spent in every rule, condition, variable and action.
+    """
+    if profiler is not None:
+        return profiler.run_all(rule_list, defined_variables, defined_actions,
+                                stop_on_first_trigger=stop_on_first_trigger, cache_variables=cache_variables)
+    if cache_variables:
+        defined_variables = EvaluationContext(defined_variables)
     rule_was_triggered = False
     for rule in rule_list:
         result = run(rule, defined_variables, defined_actions)
@@ -63,12 +80,13 @@ def _get_variable_value(defined_variables, name, params):
 
         Returns an instance of operators.BaseType
     """
+    if isinstance(defined_variables, EvaluationContext):
+        return defined_variables.get_variable_value(name, params)
 
-    def fallback(*args, **kwargs):
+    method = getattr(defined_variables, name, None)
+    if method is None:
         raise AssertionError("Variable {0} is not defined in class {1}".format(
             name, defined_variables.__class__.__name__))
-
-    method = getattr(defined_variables, name, fallback)
     try:
         val = method(**params)
     except TypeError as ex:
@@ -87,12 +105,10 @@ def _do_operator_comparison(operator_type, operator_name, comparison_value):
         - comparison_value is whatever python type to compare to
         - returns a bool
     """
-
-    def fallback(*args, **kwargs):
+    method = getattr(operator_type, operator_name, None)
+    if method is None:
         raise AssertionError("Operator {0} does not exist for type {1}".format(
             operator_name, operator_type.__class__.__name__))
-
-    method = getattr(operator_type, operator_name, fallback)
     if getattr(method, 'input_type', '') == FIELD_NO_INPUT:
         return method()
     return method(comparison_value)
@@ -101,14 +117,87 @@ def _do_operator_comparison(operator_type, operator_name, comparison_value):
 def do_actions(actions, defined_actions):
     returned_values = None
     for action in actions:
-        method_name = action['name']
+        method, params = _prepare_action(action, defined_actions, returned_values)
+        returned_values = _call_action(method, defined_actions, params)
+
+
+def _prepare_action(action, defined_actions, returned_values):
+    """
+        Returns the method of defined_actions to run for an action dict and its params, updated with returned_values
+        (what the previous action of the same rule returned) if that is a dict.
+    """
+    return _get_action_method(defined_actions, action['name']), _action_params(action, returned_values)
+
+
+def _get_action_method(defined_actions, method_name):
+    method = getattr(defined_actions, method_name, None)
+    if method is None:
+        raise AssertionError("Action {0} is not defined in class {1}"
+                             .format(method_name, defined_actions.__class__.__name__))
+    return method
+
 
-        def fallback(*args, **kwargs):
-            raise AssertionError("Action {0} is not defined in class {1}" \
-                                 .format(method_name, defined_actions.__class__.__name__))
+def _action_params(action, returned_values):
+    params = action.get('params') or {}
+    if returned_values and isinstance(returned_values, dict):
+        params = {**params, **returned_values}
+    return params
+
+
+def _call_action(method, defined_actions, params):
+    """
+        Calls an action for one object, as a batch of one if it was declared with bulk_rule_action. If the action is
+        a coroutine function, returns an awaitable of what it returns.
+    """
+    if _is_bulk_action(method):
+        returned_values = method([(defined_actions, params)])
+        if inspect.isawaitable(returned_values):
+            return _first_awaited_value(returned_values)
+        return returned_values[0] if returned_values else None
+    return method(**params)
+
+
+def _is_bulk_action(method):
+    # compared with True, so that mocked actions are called one at a time
+    return getattr(method, 'is_bulk_action', False) is True
+
+
+async def _first_awaited_value(awaitable):
+    returned_values = await awaitable
+    return returned_values[0] if returned_values else None
+
+
+class EvaluationContext(object):
+    """
+        Wraps a defined_variables instance for the length of one run_all call and memoizes the value of each variable,
+        already wrapped in its field_type, by variable name and params.
+
+        Variables declared with rule_variable(..., cache=False) are fetched again on every read. Any other attribute
+        lookup is forwarded to the wrapped instance.
+    """
 
-        params = action.get('params') or {}
-        if returned_values and isinstance(returned_values, dict):
-            params = {**params, **returned_values}
-        method = getattr(defined_actions, method_name, fallback)
-        returned_values = method(**params)
+    def __init__(self, defined_variables):
+        self.defined_variables = defined_variables
+        self.values = {}
+
+    def __getattr__(self, name):
+        return getattr(self.defined_variables, name)
+
+    def get_variable_value(self, name, params, field_type=None):
+        """
+            Returns the (memoized) value of a variable. If field_type is given and differs from the field_type the
+            variable was declared with (e.g. NativeNumericType instead of NumericType), the value is cast to it.
+        """
+        key = (name, make_hashable(params))
+        try:
+            value = self.values[key]
+        except KeyError:
+            value = self._fetch_variable_value(name, params)
+            if getattr(getattr(self.defined_variables, name, None), 'cache', True):
+                self.values[key] = value
+        if field_type is not None and type(value) is not field_type:
+            return field_type(value.value)
+        return value
+
+    def _fetch_variable_value(self, name, params):
+        return _get_variable_value(self.defined_variables, name, params)
@@ -0,0 +1,352 @@
+import bisect
+
+from .compiler import ConditionLeaf, compile_rules
+from .engine import EvaluationContext
+from .operators import (BooleanType,
+                        DateType,
+                        EpochDateType,
+                        NativeNumericType,
+                        NumericType,
+                        SelectType,
+                        StringType,
+                        fold_select_value)
+from .utils import make_hashable
+
+
+# (field_type, operator) -> key a rule gated on that operator is indexed under, given the rule's constant
+EQUALITY_OPERATORS = {
+    (StringType, 'equal_to'): lambda value: value,
+    (SelectType, 'contains'): fold_select_value,
+    (BooleanType, 'is_true'): lambda value: True,
+    (BooleanType, 'is_false'): lambda value: False,
+}
+
+# field_type -> keys to look up in the index, given the cast value of the variable
+EQUALITY_VALUE_KEYS = {
+    StringType: lambda value: (value,),
+    SelectType: lambda value: [fold_select_value(val) for val in value],
+    BooleanType: lambda value: (value,),
+}
+
+# (field_type, operator) -> True if the constants a variable value satisfies form a prefix of all the constants sorted
+# in ascending order, False if they form a suffix
+THRESHOLD_OPERATORS = {
+    (NumericType, 'greater_than'): True,
+    (NumericType, 'greater_than_or_equal_to'): True,
+    (NumericType, 'less_than'): False,
+    (NumericType, 'less_than_or_equal_to'): False,
+    (NativeNumericType, 'greater_than'): True,
+    (NativeNumericType, 'greater_than_or_equal_to'): True,
+    (NativeNumericType, 'less_than'): False,
+    (NativeNumericType, 'less_than_or_equal_to'): False,
+    (DateType, 'greater_than'): True,
+    (DateType, 'greater_than_or_equal_to'): True,
+    (DateType, 'less_than'): False,
+    (DateType, 'less_than_or_equal_to'): False,
+    (EpochDateType, 'greater_than'): True,
+    (EpochDateType, 'greater_than_or_equal_to'): True,
+    (EpochDateType, 'less_than'): False,
+    (EpochDateType, 'less_than_or_equal_to'): False,
+}
+
+
+def build_index(rule_list, variables_cls, actions_cls, native_numbers=False, epoch_dates=False, optimize=False):
+    """ Compiles rule_list and indexes it, see IndexedRuleSet. """
+    return IndexedRuleSet(compile_rules(rule_list, variables_cls, actions_cls,
+                                        native_numbers=native_numbers, epoch_dates=epoch_dates, optimize=optimize))
+
+
+def required_leaves(conditions):
+    """ Returns the leaves of a prepared condition tree that have to be true for the whole tree to be true. """
+    if isinstance(conditions, ConditionLeaf):
+        return [conditions]
+    if isinstance(conditions, bool):
+        return []
+    if conditions.kind == 'all' or len(conditions.children) == 1:
+        return [leaf for condition in conditions.children for leaf in required_leaves(condition)]
+    return []
+
+
+class IndexedRuleSet(object):
+    """
+        Wraps a CompiledRuleSet with an index over one leaf per rule that the rule requires to be true (its gate):
+
+        - equality-like leaves (StringType.equal_to, SelectType.contains, BooleanType.is_true / is_false) are looked up
+          in a dict keyed on their constant,
+        - NumericType and DateType greater_than / less_than (or equal to) leaves are found with one binary search over
+          their sorted constants, using the operator itself so EPSILON semantics are kept.
+
+        Each indexed variable is fetched once per object and only the rules whose gate matches its value, plus the
+        rules without any indexable gate, are evaluated. If fetching or casting a gate variable fails, every rule
+        behind that gate is evaluated instead, so the error is only raised where the rule's own conditions reach the
+        variable. Variables are memoized (see engine.EvaluationContext) until a rule fires, so a gate variable isn't
+        fetched again while evaluating the candidate rules.
+
+        The rules are identified by their position in compiled_rules. See updated to index another version of the rule
+        set without starting over.
+    """
+
+    def __init__(self, compiled_rules):
+        # rule index -> CompiledRule, a list or, for the indexes returned by updated, a dict
+        self.rules = compiled_rules.rules
+        self.gates = {}
+        # rule index -> (gate key, key or constant the rule is indexed under), for the gated rules
+        self.rule_gates = {}
+        self.ungated_rules = []
+        for rule_index, rule in enumerate(self.rules):
+            gate = self._find_gate(rule)
+            if gate is None:
+                self.ungated_rules.append(rule_index)
+                continue
+            gate_key, make_gate, key = gate
+            if gate_key not in self.gates:
+                self.gates[gate_key] = make_gate()
+            self.gates[gate_key].add(key, rule_index)
+            self.rule_gates[rule_index] = (gate_key, key)
+
+        for gate_key, gate in list(self.gates.items()):
+            if isinstance(gate, _ThresholdGate):
+                try:
+                    gate.sort()
+                except TypeError:
+                    # constants that can't be compared together, e.g. naive and aware datetimes
+                    self._ungate(gate_key)
+        self.ungated_rules.sort()
+
+    def __len__(self):
+        return len(self.rules)
+
+    def _find_gate(self, rule):
+        """
+            Returns (gate key, callable creating the gate, key or constant to add the rule under) for the leaf the rule
+            is indexed on, or None if no leaf it requires can be indexed. Equality-like leaves are preferred.
+        """
+        leaves = required_leaves(rule.conditions)
+        for leaf in leaves:
+            get_key = EQUALITY_OPERATORS.get((leaf.field_type, leaf.operator))
+            if get_key is None:
+                continue
+            key = get_key(leaf.value)
+            try:
+                hash(key)
+            except TypeError:
+                continue
+            return ((leaf.name, make_hashable(leaf.params)),
+                    lambda leaf=leaf: _EqualityGate(leaf.name, leaf.params, leaf.field_type), key)
+
+        for leaf in leaves:
+            satisfied_prefix = THRESHOLD_OPERATORS.get((leaf.field_type, leaf.operator))
+            if satisfied_prefix is None:
+                continue
+            return ((leaf.name, make_hashable(leaf.params), leaf.operator),
+                    lambda leaf=leaf: _ThresholdGate(leaf.name, leaf.params, leaf.field_type, leaf.operator,
+                                                     satisfied_prefix),
+                    leaf.value)
+        return None
+
+    def _ungate(self, gate_key):
+        """ Removes a gate, its rules are evaluated for every object. Leaves ungated_rules unsorted. """
+        for rule_index in self.gates.pop(gate_key).all_rules():
+            del self.rule_gates[rule_index]
+            self.ungated_rules.append(rule_index)
+
+    def updated(self, rules, removed=(), added=()):
+        """
+            Returns the index of another version of the rule set, leaving this one as it is. Only the gates of the
+            removed and added rules are copied and changed, the others are shared by both indexes.
+
+            - rules - the rules of the new version by rule index, e.g. a dict. Rule indices only have to be ordered
+              like the rules, so a rule that is kept, or changed in place, can keep its index across versions.
+            - removed - the indices of the rules of this index that aren't in the new version, or were changed.
+            - added - the indices of the rules of the new version that aren't in this index, or were changed.
+        """
+        index = IndexedRuleSet.__new__(IndexedRuleSet)
+        index.rules = rules
+        index.gates = dict(self.gates)
+        index.rule_gates = dict(self.rule_gates)
+        index.ungated_rules = list(self.ungated_rules)
+        copied = set()
+
+        def writable_gate(gate_key):
+            if gate_key not in copied:
+                index.gates[gate_key] = index.gates[gate_key].copy()
+                copied.add(gate_key)
+            return index.gates[gate_key]
+
+        for rule_index in removed:
+            if rule_index not in index.rule_gates:
+                index.ungated_rules.remove(rule_index)
+                continue
+            gate_key, key = index.rule_gates.pop(rule_index)
+            gate = writable_gate(gate_key)
+            gate.remove(key, rule_index)
+            if not gate.all_rules():
+                del index.gates[gate_key]
+
+        ungated = False
+        for rule_index in added:
+            gate = self._find_gate(rules[rule_index])
+            if gate is None:
+                bisect.insort(index.ungated_rules, rule_index)
+                continue
+            gate_key, make_gate, key = gate
+            if gate_key not in index.gates:
+                index.gates[gate_key] = make_gate()
+                copied.add(gate_key)
+            try:
+                writable_gate(gate_key).insert(key, rule_index)
+            except TypeError:
+                # see __init__
+                index._ungate(gate_key)
+                index.ungated_rules.append(rule_index)
+                ungated = True
+            else:
+                index.rule_gates[rule_index] = (gate_key, key)
+        if ungated:
+            index.ungated_rules.sort()
+        return index
+
+    def candidate_rules(self, defined_variables):
+        """ Returns the sorted indices of the rules that can be triggered for the given variables. """
+        if not isinstance(defined_variables, EvaluationContext):
+            defined_variables = EvaluationContext(defined_variables)
+        candidates = set(self.ungated_rules)
+        for gate in self.gates.values():
+            try:
+                operator_type = defined_variables.get_variable_value(gate.name, gate.params, gate.field_type)
+                candidates.update(gate.candidates(operator_type))
+            except Exception:
+                # e.g. a variable that is None unless an earlier condition of the rule holds: let the rules decide
+                candidates.update(gate.all_rules())
+        return sorted(candidates)
+
+    def run_all(self, defined_variables, defined_actions, stop_on_first_trigger=False):
+        """
+            Same semantics as engine.run_all over the indexed rules. The actions of a triggered rule may change what
+            the variables return, so the memoized values are dropped and the candidates of the remaining rules are
+            computed again after every rule that fires.
+        """
+        variables = EvaluationContext(defined_variables)
+        candidates = self.candidate_rules(variables)
+        rule_was_triggered = False
+        position = 0
+        while position < len(candidates):
+            rule_index = candidates[position]
+            position += 1
+            if self.rules[rule_index].run(variables, defined_actions):
+                rule_was_triggered = True
+                if stop_on_first_trigger:
+                    return True
+                variables = EvaluationContext(defined_variables)
+                candidates = [index for index in self.candidate_rules(variables) if index > rule_index]
+                position = 0
+        return rule_was_triggered
+
+
+class _EqualityGate(object):
+    """ Maps the indexed keys of one variable (and params) to the rules gated on them. """
+
+    def __init__(self, name, params, field_type):
+        self.name = name
+        self.params = params
+        self.field_type = field_type
+        self.rules = {}
+
+    def add(self, key, rule_index):
+        self.rules.setdefault(key, []).append(rule_index)
+
+    def copy(self):
+        """ Returns a copy sharing the rule lists, which insert and remove replace instead of modifying them. """
+        gate = _EqualityGate(self.name, self.params, self.field_type)
+        gate.rules = dict(self.rules)
+        return gate
+
+    def insert(self, key, rule_index):
+        rules = list(self.rules.get(key, ()))
+        bisect.insort(rules, rule_index)
+        self.rules[key] = rules
+
+    def remove(self, key, rule_index):
+        rules = [index for index in self.rules[key] if index != rule_index]
+        if rules:
+            self.rules[key] = rules
+        else:
+            del self.rules[key]
+
+    def all_rules(self):
+        return [rule_index for rules in self.rules.values() for rule_index in rules]
+
+    def candidates(self, operator_type):
+        candidates = []
+        try:
+            for key in EQUALITY_VALUE_KEYS[self.field_type](operator_type.value):
+                candidates.extend(self.rules.get(key, ()))
+        except TypeError:
+            # unhashable variable value, every rule gated on this variable has to be evaluated
+            return self.all_rules()
+        return candidates
+
+
+class _ThresholdGate(object):
+    """ The constants one variable (and params) is compared against with one operator, sorted in ascending order. """
+
+    def __init__(self, name, params, field_type, operator_name, satisfied_prefix):
+        self.name = name
+        self.params = params
+        self.field_type = field_type
+        self.operator = getattr(field_type, operator_name).__wrapped__
+        self.satisfied_prefix = satisfied_prefix
+        self.values = []
+        self.rule_indices = []
+
+    def add(self, value, rule_index):
+        self.values.append(value)
+        self.rule_indices.append(rule_index)
+
+    def copy(self):
+        gate = _ThresholdGate.__new__(_ThresholdGate)
+        gate.__dict__.update(self.__dict__)
+        gate.values = list(self.values)
+        gate.rule_indices = list(self.rule_indices)
+        return gate
+
+    def insert(self, value, rule_index):
+        """ Adds a rule keeping the constants sorted. Raises TypeError if value can't be compared with them. """
+        position = bisect.bisect_right(self.values, value)
+        self.values.insert(position, value)
+        self.rule_indices.insert(position, rule_index)
+
+    def remove(self, value, rule_index):
+        position = self.rule_indices.index(rule_index)
+        del self.values[position]
+        del self.rule_indices[position]
+
+    def all_rules(self):
+        return self.rule_indices
+
+    def sort(self):
+        order = sorted(range(len(self.values)), key=self.values.__getitem__)
+        self.values = [self.values[i] for i in order]
+        self.rule_indices = [self.rule_indices[i] for i in order]
+
+    def candidates(self, operator_type):
+        operator, values = self.operator, self.values
+        low, high = 0, len(values)
+        if self.satisfied_prefix:
+            # find the first constant the variable value doesn't satisfy
+            while low < high:
+                middle = (low + high) // 2
+                if operator(operator_type, values[middle]):
+                    low = middle + 1
+                else:
+                    high = middle
+            return self.rule_indices[:low]
+
+        # find the first constant the variable value satisfies
+        while low < high:
+            middle = (low + high) // 2
+            if operator(operator_type, values[middle]):
+                high = middle
+            else:
+                low = middle + 1
+        return self.rule_indices[low:]
@@ -0,0 +1,185 @@
+from .compiler import (ConditionLeaf,
+                       build_condition,
+                       field_type_overrides,
+                       leaf_key,
+                       prepare_actions,
+                       prepare_conditions)
+from .engine import EvaluationContext, do_actions
+
+
+def build_network(rule_list, variables_cls, actions_cls, native_numbers=False, epoch_dates=False):
+    """
+        Merges the conditions of every rule in rule_list into a ConditionNetwork, a DAG in which identical leaves and
+        identical all/any sub-trees are shared between rules, so that each of them is evaluated at most once per object.
+    """
+    field_types = field_type_overrides(native_numbers=native_numbers, epoch_dates=epoch_dates)
+    network = ConditionNetwork(variables_cls, actions_cls, field_types=field_types)
+    for rule in rule_list:
+        network.add_rule(rule)
+    return network
+
+
+class ConditionNetwork(object):
+    """
+        A deduplicated condition DAG over a list of rules. Node results are memoized for the length of one
+        run_all / triggered_rules call.
+
+        Since node results are shared between rules, an action changing the object being evaluated doesn't affect the
+        conditions of the following rules that were already evaluated for a previous rule.
+    """
+
+    def __init__(self, variables_cls, actions_cls, field_types=None):
+        self.variables_cls = variables_cls
+        self.actions_cls = actions_cls
+        self.field_types = field_types
+        self.nodes = []
+        self.rules = []
+        self._node_ids = {}
+        # dependency tracking, for IncrementalSession: node id -> ids of the all / any nodes it is a child of,
+        # variable name -> ids of the leaves comparing it, root node id -> indices of the rules it is the conditions of
+        self.parents = []
+        self.leaves_by_variable = {}
+        self.rules_by_root = {}
+
+    def __len__(self):
+        return len(self.rules)
+
+    def add_rule(self, rule):
+        conditions = prepare_conditions(rule['conditions'], self.variables_cls, field_types=self.field_types)
+        actions = prepare_actions(rule['actions'], self.actions_cls)
+        node_id = self._add_node(conditions)
+        self.rules_by_root.setdefault(node_id, []).append(len(self.rules))
+        self.rules.append((node_id, actions))
+
+    def _add_node(self, conditions):
+        if isinstance(conditions, ConditionLeaf):
+            key = ('leaf',) + leaf_key(conditions)
+        else:
+            key = (conditions.kind, tuple(self._add_node(condition) for condition in conditions.children))
+
+        node_id = self._node_ids.get(key)
+        if node_id is None:
+            if isinstance(conditions, ConditionLeaf):
+                node = self._build_leaf(conditions)
+            else:
+                node = self._build_group(*key)
+            node_id = self._node_ids[key] = len(self.nodes)
+            self.nodes.append(node)
+            self.parents.append([])
+            if isinstance(conditions, ConditionLeaf):
+                self.leaves_by_variable.setdefault(conditions.name, []).append(node_id)
+            else:
+                for child_id in set(key[1]):
+                    self.parents[child_id].append(node_id)
+        return node_id
+
+    def _build_leaf(self, leaf):
+        check = build_condition(leaf, self.variables_cls)
+
+        def check_leaf(defined_variables, results):
+            return check(defined_variables)
+
+        return check_leaf
+
+    def _build_group(self, kind, child_ids):
+        evaluate = self._evaluate
+        if kind == 'all':
+            def check_all(defined_variables, results):
+                for child_id in child_ids:
+                    if not evaluate(child_id, defined_variables, results):
+                        return False
+                return True
+
+            return check_all
+
+        def check_any(defined_variables, results):
+            for child_id in child_ids:
+                if evaluate(child_id, defined_variables, results):
+                    return True
+            return False
+
+        return check_any
+
+    def _evaluate(self, node_id, defined_variables, results):
+        result = results[node_id]
+        if result is None:
+            result = results[node_id] = self.nodes[node_id](defined_variables, results)
+        return result
+
+    def session(self, defined_variables):
+        """ Returns an IncrementalSession evaluating the rules for the given variables. Add every rule first. """
+        return IncrementalSession(self, defined_variables)
+
+    def triggered_rules(self, defined_variables, cache_variables=False):
+        """ Returns the indices of the rules whose conditions are met, without running any action. """
+        if cache_variables:
+            defined_variables = EvaluationContext(defined_variables)
+        results = [None] * len(self.nodes)
+        return [index for index, (node_id, _) in enumerate(self.rules)
+                if self._evaluate(node_id, defined_variables, results)]
+
+    def run_all(self, defined_variables, defined_actions, stop_on_first_trigger=False, cache_variables=False):
+        """ Drop-in replacement for engine.run_all over the rules the network was built from. """
+        if cache_variables:
+            defined_variables = EvaluationContext(defined_variables)
+        results = [None] * len(self.nodes)
+        rule_was_triggered = False
+        for node_id, actions in self.rules:
+            if self._evaluate(node_id, defined_variables, results):
+                do_actions(actions, defined_actions)
+                rule_was_triggered = True
+                if stop_on_first_trigger:
+                    return True
+        return rule_was_triggered
+
+
+class IncrementalSession(object):
+    """
+        Keeps the node results and variable values of one object between updates. update(changed_variables) only
+        evaluates again the leaves comparing the changed variables, the all / any nodes above them and the rules they
+        belong to, and reports the rules whose outcome flipped.
+
+        Evaluation keeps short-circuiting: nodes that were never needed stay unevaluated until they are.
+    """
+
+    def __init__(self, network, defined_variables):
+        self.network = network
+        self.defined_variables = EvaluationContext(defined_variables)
+        self.results = [None] * len(network.nodes)
+        self.outcomes = [bool(network._evaluate(node_id, self.defined_variables, self.results))
+                         for node_id, _ in network.rules]
+
+    @property
+    def triggered_rules(self):
+        """ The indices of the rules whose conditions are currently met. """
+        return [index for index, outcome in enumerate(self.outcomes) if outcome]
+
+    def update(self, changed_variables):
+        """
+            Evaluates again what depends on the given variable names, e.g. after some fields of the object changed.
+            Returns the sorted indices of the rules whose outcome flipped; self.outcomes holds the new outcomes.
+        """
+        network, results = self.network, self.results
+        changed_variables = set(changed_variables)
+        values = self.defined_variables.values
+        for key in [key for key in values if key[0] in changed_variables]:
+            del values[key]
+
+        stale = [node_id for name in changed_variables for node_id in network.leaves_by_variable.get(name, ())]
+        invalidated = set()
+        while stale:
+            node_id = stale.pop()
+            if node_id in invalidated:
+                continue
+            invalidated.add(node_id)
+            results[node_id] = None
+            stale.extend(network.parents[node_id])
+
+        flipped = []
+        rule_indices = sorted(index for node_id in invalidated for index in network.rules_by_root.get(node_id, ()))
+        for index in rule_indices:
+            outcome = bool(network._evaluate(network.rules[index][0], self.defined_variables, results))
+            if outcome != self.outcomes[index]:
+                self.outcomes[index] = outcome
+                flipped.append(index)
+        return flipped
@@ -1,34 +1,74 @@
 import inspect
 import re
+import threading
+import time
+from collections import OrderedDict
+from datetime import date, datetime, timezone
 from decimal import Decimal
-from functools import wraps
+from functools import lru_cache, wraps
 
 from dateutil import parser as dateutil_parser
 
 from .fields import (FIELD_TEXT, FIELD_NUMERIC, FIELD_NO_INPUT, FIELD_SELECT, FIELD_SELECT_MULTIPLE, FIELD_DATE)
 from .six import string_types, integer_types
-from .utils import fn_name_to_pretty_label, float_to_decimal
+from .utils import clear_rule_data_cache, fn_name_to_pretty_label, float_to_decimal
 
 
 class BaseType(object):
+
+    def __init_subclass__(cls, **kwargs):
+        super(BaseType, cls).__init_subclass__(**kwargs)
+        cls._register_operators()
+
+    @classmethod
+    def _register_operators(cls):
+        """
+            Collects the operators of the class once, when the class is created. Operators added to the class
+            afterwards aren't registered.
+        """
+        methods = inspect.getmembers(cls)
+        cls._operators = dict(m for m in methods if getattr(m[1], 'is_operator', False))
+        cls._operators_data = [{'name': m[0],
+                                'label': m[1].label,
+                                'input_type': m[1].input_type}
+                               for m in methods if getattr(m[1], 'is_operator', False)]
+
     def __init__(self, value):
         self.value = self._assert_valid_value_and_cast(value)
 
     def _assert_valid_value_and_cast(self, value):
         raise NotImplemented()
 
+    @classmethod
+    def cast_operator_value(cls, operator_name, value):
+        """
+            Casts a constant that rules compare against using the given operator, so that it can be done once when the
+            rules are compiled instead of on every operator call.
+
+            Returns the value untouched if the operator doesn't cast its arguments.
+        """
+        operator = getattr(cls, operator_name)
+        if operator.input_type == FIELD_NO_INPUT or not operator.assert_type_for_arguments:
+            return value
+        return cls.__new__(cls)._assert_valid_value_and_cast(value)
+
     @classmethod
     def get_all_operators(cls):
-        methods = inspect.getmembers(cls)
-        return [{'name': m[0],
-                 'label': m[1].label,
-                 'input_type': m[1].input_type}
-                for m in methods if getattr(m[1], 'is_operator', False)]
+        """ Returns the data of every operator sorted by name. The list is shared, don't modify it. """
+        return cls._operators_data
+
+
+BaseType._register_operators()
+
+# name of the class -> class, for every type decorated with export_type
+EXPORTED_TYPES = {}
 
 
 def export_type(cls):
     """ Decorator to expose the given class to business_rules.export_rule_data. """
     cls.export_in_rule_data = True
+    EXPORTED_TYPES[cls.__name__] = cls
+    clear_rule_data_cache()
     return cls
 
 
@@ -38,13 +78,15 @@ def type_operator(input_type, label=None,
         Decorator to make a function into a type operator.
 
         - assert_type_for_arguments - if True this patches the operator function, so that arguments passed to it will
-          have _assert_valid_value_and_cast called on them to make type errors explicit.
+          have _assert_valid_value_and_cast called on them to make type errors explicit. The undecorated function
+          stays available as __wrapped__ for callers that already cast the arguments with cast_operator_value.
     """
 
     def wrapper(func):
         func.is_operator = True
         func.label = label or fn_name_to_pretty_label(func.__name__)
         func.input_type = input_type
+        func.assert_type_for_arguments = assert_type_for_arguments
 
         @wraps(func)
         def inner(self, *args, **kwargs):
@@ -59,6 +101,66 @@ def type_operator(input_type, label=None,
     return wrapper
 
 
+class RegexCache(object):
+    """
+        A bounded LRU cache of compiled regular expressions, used by StringType.matches_regex for patterns that weren't
+        compiled when the rules were loaded. Records how long each cached pattern took to compile, to help spotting
+        pathological regexes.
+    """
+
+    def __init__(self, maxsize=1024):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._patterns = OrderedDict()
+        self._lock = threading.Lock()
+
+    def compile(self, pattern):
+        with self._lock:
+            entry = self._patterns.get(pattern)
+            if entry is not None:
+                self._patterns.move_to_end(pattern)
+                self.hits += 1
+                return entry[0]
+
+        start = time.perf_counter()
+        compiled = re.compile(pattern)
+        compile_time = time.perf_counter() - start
+
+        with self._lock:
+            self.misses += 1
+            self._patterns[pattern] = (compiled, compile_time)
+            self._evict()
+        return compiled
+
+    def resize(self, maxsize):
+        with self._lock:
+            self.maxsize = maxsize
+            self._evict()
+
+    def clear(self):
+        with self._lock:
+            self._patterns.clear()
+            self.hits = self.misses = 0
+
+    def _evict(self):
+        while len(self._patterns) > self.maxsize:
+            self._patterns.popitem(last=False)
+
+    def stats(self):
+        """ Returns the hit / miss counts and the compile time in seconds of every cached pattern. """
+        with self._lock:
+            return {'maxsize': self.maxsize,
+                    'size': len(self._patterns),
+                    'hits': self.hits,
+                    'misses': self.misses,
+                    'compile_times': dict((pattern, entry[1]) for pattern, entry in self._patterns.items())}
+
+
+regex_cache = RegexCache()
+_PATTERN_TYPE = type(re.compile(''))
+
+
 @export_type
 class StringType(BaseType):
     name = "string"
@@ -69,6 +171,13 @@ class StringType(BaseType):
             raise AssertionError("{0} is not a valid string type.".format(value))
         return value
 
+    @classmethod
+    def cast_operator_value(cls, operator_name, value):
+        value = super(StringType, cls).cast_operator_value(operator_name, value)
+        if operator_name == 'matches_regex':
+            return regex_cache.compile(value)
+        return value
+
     @type_operator(FIELD_TEXT)
     def equal_to(self, other_string):
         return self.value == other_string
@@ -95,7 +204,9 @@ class StringType(BaseType):
 
     @type_operator(FIELD_TEXT)
     def matches_regex(self, regex):
-        return re.search(regex, self.value)
+        if not isinstance(regex, _PATTERN_TYPE):
+            regex = regex_cache.compile(regex)
+        return regex.search(self.value)
 
     @type_operator(FIELD_NO_INPUT)
     def non_empty(self):
@@ -134,7 +245,8 @@ class NumericType(BaseType):
 
     @type_operator(FIELD_NUMERIC)
     def greater_than_or_equal_to(self, other_numeric):
-        return self.greater_than(other_numeric) or self.equal_to(other_numeric)
+        # greater_than or equal_to, without casting other_numeric again through their type_operator wrappers
+        return (self.value - other_numeric) >= -self.EPSILON
 
     @type_operator(FIELD_NUMERIC)
     def less_than(self, other_numeric):
@@ -142,7 +254,30 @@ class NumericType(BaseType):
 
     @type_operator(FIELD_NUMERIC)
     def less_than_or_equal_to(self, other_numeric):
-        return self.less_than(other_numeric) or self.equal_to(other_numeric)
+        return (other_numeric - self.value) >= -self.EPSILON
+
+
+class NativeNumericType(NumericType):
+    """
+        NumericType comparing native ints and floats, with the same EPSILON semantics but without allocating any
+        Decimal. Decimals are converted to floats, so precision beyond what a float can hold is lost.
+
+        Opt in per variable with numeric_rule_variable(native=True), or per rule set with
+        compile_rules(..., native_numbers=True).
+    """
+    EPSILON = float(NumericType.EPSILON)
+
+    # exported as NumericType, which has the same name and operators
+    export_in_rule_data = False
+
+    @staticmethod
+    def _assert_valid_value_and_cast(value):
+        if isinstance(value, (float,) + integer_types):
+            return value
+        if isinstance(value, Decimal):
+            return float(value)
+        else:
+            raise AssertionError("{0} is not a valid numeric type.".format(value))
 
 
 @export_type
@@ -163,8 +298,66 @@ class BooleanType(BaseType):
         return not self.value
 
 
+def fold_select_value(value):
+    """ Lowers strings so select items can be compared case insensitively, returns other values untouched. """
+    return value.lower() if isinstance(value, string_types) else value
+
+
+class FoldedValues(object):
+    """
+        The items of a select value with every string lowered, kept in order and, if they are all hashable, as a
+        frozenset so membership tests are O(1). Two items match the way SelectType._case_insensitive_equal_to does.
+    """
+
+    def __init__(self, values):
+        self.items = tuple(fold_select_value(value) for value in values)
+        try:
+            self.set = frozenset(self.items)
+        except TypeError:
+            self.set = None
+
+    def __contains__(self, folded_item):
+        if self.set is not None:
+            try:
+                return folded_item in self.set
+            except TypeError:
+                pass
+        return folded_item in self.items
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __eq__(self, other):
+        return isinstance(other, FoldedValues) and self.items == other.items
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        return hash(self.items)
+
+    def __repr__(self):
+        return 'FoldedValues({0!r})'.format(list(self.items))
+
+
+def _folded_items(values):
+    if isinstance(values, FoldedValues):
+        return values.items
+    return [fold_select_value(value) for value in values]
+
+
+class _FoldedSelectMixin(object):
+
+    def _folded_value(self):
+        """ Returns the value as FoldedValues, computed once per instance (i.e. per variable evaluation). """
+        folded = self.__dict__.get('_folded')
+        if folded is None:
+            folded = self._folded = FoldedValues(self.value)
+        return folded
+
+
 @export_type
-class SelectType(BaseType):
+class SelectType(_FoldedSelectMixin, BaseType):
     name = "select"
 
     def _assert_valid_value_and_cast(self, value):
@@ -181,21 +374,15 @@ class SelectType(BaseType):
 
     @type_operator(FIELD_SELECT, assert_type_for_arguments=False)
     def contains(self, other_value):
-        for val in self.value:
-            if self._case_insensitive_equal_to(val, other_value):
-                return True
-        return False
+        return fold_select_value(other_value) in self._folded_value()
 
     @type_operator(FIELD_SELECT, assert_type_for_arguments=False)
     def does_not_contain(self, other_value):
-        for val in self.value:
-            if self._case_insensitive_equal_to(val, other_value):
-                return False
-        return True
+        return fold_select_value(other_value) not in self._folded_value()
 
 
 @export_type
-class SelectMultipleType(BaseType):
+class SelectMultipleType(_FoldedSelectMixin, BaseType):
     name = "select_multiple"
 
     def _assert_valid_value_and_cast(self, value):
@@ -203,33 +390,44 @@ class SelectMultipleType(BaseType):
             raise AssertionError("{0} is not a valid select multiple type".format(value))
         return value
 
+    @classmethod
+    def cast_operator_value(cls, operator_name, value):
+        return FoldedValues(super(SelectMultipleType, cls).cast_operator_value(operator_name, value))
+
     @type_operator(FIELD_SELECT_MULTIPLE)
     def contains_all(self, other_value):
-        select = SelectType(self.value)
-        for other_val in other_value:
-            if not select.contains(other_val):
+        folded = self._folded_value()
+        for other_val in _folded_items(other_value):
+            if other_val not in folded:
                 return False
         return True
 
     @type_operator(FIELD_SELECT_MULTIPLE)
     def is_contained_by(self, other_value):
-        other_select_multiple = SelectMultipleType(other_value)
-        return other_select_multiple.contains_all(self.value)
+        if not isinstance(other_value, FoldedValues):
+            other_value = FoldedValues(other_value)
+        for val in self._folded_value().items:
+            if val not in other_value:
+                return False
+        return True
 
-    @type_operator(FIELD_SELECT_MULTIPLE)
-    def shares_at_least_one_element_with(self, other_value):
-        select = SelectType(self.value)
-        for other_val in other_value:
-            if select.contains(other_val):
+    def _shares_an_element_with(self, other_value):
+        folded = self._folded_value()
+        for other_val in _folded_items(other_value):
+            if other_val in folded:
                 return True
         return False
 
+    @type_operator(FIELD_SELECT_MULTIPLE)
+    def shares_at_least_one_element_with(self, other_value):
+        return self._shares_an_element_with(other_value)
+
     @type_operator(FIELD_SELECT_MULTIPLE)
     def shares_exactly_one_element_with(self, other_value):
         found_one = False
-        select = SelectType(self.value)
-        for other_val in other_value:
-            if select.contains(other_val):
+        folded = self._folded_value()
+        for other_val in _folded_items(other_value):
+            if other_val in folded:
                 if found_one:
                     return False
                 found_one = True
@@ -237,7 +435,69 @@ class SelectMultipleType(BaseType):
 
     @type_operator(FIELD_SELECT_MULTIPLE)
     def shares_no_elements_with(self, other_value):
-        return not self.shares_at_least_one_element_with(other_value)
+        return not self._shares_an_element_with(other_value)
+
+
+DATE_PARSE_CACHE_SIZE = 4096
+
+
+def parse_date(value):
+    """
+        Casts a date value to a datetime, trying the cheapest way first:
+
+        - datetimes are returned untouched and dates are converted to datetimes at midnight,
+        - ISO 8601 strings are parsed with datetime.fromisoformat (or strptime on Python 3.6, which doesn't have it),
+        - any other string falls back to dateutil.
+
+        Parsed strings are kept in a bounded LRU cache (see DATE_PARSE_CACHE_SIZE), as rules and variables tend to
+        repeat the same literals.
+    """
+    if isinstance(value, datetime):
+        return value
+    if isinstance(value, date):
+        return datetime(value.year, value.month, value.day)
+    if isinstance(value, string_types):
+        return _parse_date_string(value)
+    raise AssertionError("`{}` is not a valid date type".format(value))
+
+
+# ISO 8601 layouts parsed by _strptime_iso, each optionally followed by a UTC offset
+ISO_DATE_FORMATS = ('%Y-%m-%d',
+                    '%Y-%m-%dT%H:%M:%S',
+                    '%Y-%m-%dT%H:%M:%S.%f',
+                    '%Y-%m-%d %H:%M:%S',
+                    '%Y-%m-%d %H:%M:%S.%f')
+_ISO_OFFSET = re.compile(r'([+-]\d\d):(\d\d)$')
+
+
+def _strptime_iso(value):
+    """ Stands in for datetime.fromisoformat on Python 3.6, for the layouts of ISO_DATE_FORMATS. """
+    offset_format = ''
+    match = _ISO_OFFSET.search(value)
+    if match:
+        # %z only accepts +HHMM before Python 3.7
+        value, offset_format = value[:match.start()] + match.group(1) + match.group(2), '%z'
+    for date_format in ISO_DATE_FORMATS:
+        try:
+            return datetime.strptime(value, date_format + offset_format)
+        except ValueError:
+            pass
+    raise ValueError("Invalid isoformat string: {0!r}".format(value))
+
+
+_fromisoformat = getattr(datetime, 'fromisoformat', _strptime_iso)
+
+
+@lru_cache(maxsize=DATE_PARSE_CACHE_SIZE)
+def _parse_date_string(value):
+    try:
+        return _fromisoformat(value)
+    except ValueError:
+        pass
+    try:
+        return dateutil_parser.parse(value)
+    except (ValueError, OverflowError):
+        raise AssertionError("`{}` is not a valid date type".format(value))
 
 
 @export_type
@@ -245,11 +505,7 @@ class DateType(BaseType):
     name = "date"
 
     def _assert_valid_value_and_cast(self, value):
-
-        try:
-            return dateutil_parser.parse(value)
-        except ValueError:
-            raise AssertionError("`{}` is not a valid date type".format(value))
+        return parse_date(value)
 
     @type_operator(FIELD_DATE)
     def equal_to(self, other_date):
@@ -274,3 +530,25 @@ class DateType(BaseType):
     @type_operator(FIELD_DATE)
     def less_than_or_equal_to(self, other_date):
         return self.value <= other_date
+
+
+class EpochDateType(DateType):
+    """
+        DateType comparing POSIX timestamps (float seconds) instead of datetimes, which is cheaper and lets naive and
+        timezone aware values be compared together: naive datetimes are taken as UTC. Ints and floats are accepted as
+        timestamps.
+
+        Opt in per variable with date_rule_variable(epoch=True), or per rule set with
+        compile_rules(..., epoch_dates=True).
+    """
+
+    # exported as DateType, which has the same name and operators
+    export_in_rule_data = False
+
+    def _assert_valid_value_and_cast(self, value):
+        if isinstance(value, (float,) + integer_types) and not isinstance(value, bool):
+            return float(value)
+        value = parse_date(value)
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        return value.timestamp()
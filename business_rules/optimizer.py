@@ -0,0 +1,130 @@
+from decimal import Decimal
+
+from .compiler import ConditionGroup, ConditionLeaf, field_type_overrides, leaf_key, prepare_conditions
+from .operators import BooleanType, DateType, NumericType, StringType
+from .utils import make_hashable
+
+# operator -> (bound, is the bound strict, offset of the bound in epsilons) of the interval of values satisfying it,
+# for the NumericType and DateType operators. equal_to bounds both sides.
+INTERVAL_OPERATORS = {
+    'greater_than': (('lower', True, 1),),
+    'greater_than_or_equal_to': (('lower', False, -1),),
+    'less_than': (('upper', True, -1),),
+    'less_than_or_equal_to': (('upper', False, 1),),
+    'equal_to': (('lower', False, -1), ('upper', False, 1)),
+}
+
+
+def optimize_conditions(conditions):
+    """
+        Simplifies a tree returned by compiler.prepare_conditions without changing which objects it is true for:
+
+        - all / any nodes with a single child are replaced by their child, and children of the same kind as their
+          parent are merged into it,
+        - repeated children are removed,
+        - leaves that contradict each other under an all node fold it to False: is_true and is_false on the same
+          boolean, StringType equal_to different constants, NumericType / DateType ranges that don't overlap
+          (taking EPSILON into account), e.g. greater_than 10 and less_than 5,
+        - is_true and is_false on the same boolean under an any node fold it to True,
+        - constants are folded: an all node with a False child is False, an any node with a True child is True.
+
+        Returns the simplified tree, or True / False if the whole tree folded to a constant. Variables whose
+        conditions were folded away aren't fetched anymore, so an invalid value of theirs won't raise either.
+    """
+    if isinstance(conditions, ConditionLeaf):
+        return conditions
+
+    kind = conditions.kind
+    children = []
+    for child in conditions.children:
+        child = optimize_conditions(child)
+        if isinstance(child, bool):
+            if child != (kind == 'all'):
+                return child
+            continue
+        if isinstance(child, ConditionGroup) and child.kind == kind:
+            children.extend(child.children)
+        else:
+            children.append(child)
+
+    unique_children, seen = [], set()
+    for child in children:
+        key = _node_key(child)
+        if key not in seen:
+            seen.add(key)
+            unique_children.append(child)
+
+    if _contradicts(kind, [child for child in unique_children if isinstance(child, ConditionLeaf)]):
+        return kind == 'any'
+    if not unique_children:
+        return kind == 'all'
+    if len(unique_children) == 1:
+        return unique_children[0]
+    return ConditionGroup(kind, tuple(unique_children))
+
+
+def never_firing_rules(rule_list, variables_cls, native_numbers=False, epoch_dates=False):
+    """ Returns the indices of the rules of rule_list whose conditions optimize_conditions folds to False. """
+    field_types = field_type_overrides(native_numbers=native_numbers, epoch_dates=epoch_dates)
+    return [rule_index for rule_index, rule in enumerate(rule_list)
+            if optimize_conditions(prepare_conditions(rule['conditions'], variables_cls,
+                                                      field_types=field_types)) is False]
+
+
+def _node_key(conditions):
+    if isinstance(conditions, ConditionLeaf):
+        return leaf_key(conditions) + (conditions.field_type,)
+    return conditions.kind, tuple(_node_key(child) for child in conditions.children)
+
+
+def _contradicts(kind, leaves):
+    """
+        Returns True if the leaves, all children of the same node, can't all be true (for an all node) or can't all
+        be false (for an any node) at once.
+    """
+    by_variable = {}
+    for leaf in leaves:
+        by_variable.setdefault((leaf.name, make_hashable(leaf.params), leaf.field_type), []).append(leaf)
+
+    for (_, _, field_type), variable_leaves in by_variable.items():
+        if len(variable_leaves) < 2:
+            continue
+        operators = set(leaf.operator for leaf in variable_leaves)
+        if issubclass(field_type, BooleanType) and {'is_true', 'is_false'} <= operators:
+            return True
+        if kind != 'all':
+            continue
+        if issubclass(field_type, StringType):
+            if len(set(leaf.value for leaf in variable_leaves if leaf.operator == 'equal_to')) > 1:
+                return True
+        elif issubclass(field_type, (NumericType, DateType)):
+            if _empty_interval(field_type, [leaf for leaf in variable_leaves if leaf.operator in INTERVAL_OPERATORS]):
+                return True
+    return False
+
+
+def _empty_interval(field_type, leaves):
+    """
+        Returns True if no value satisfies every leaf. With native floats, bounds that are too close to call are given
+        the benefit of the doubt, since the comparisons themselves round.
+    """
+    epsilon = getattr(field_type, 'EPSILON', 0)
+    slack = 0 if isinstance(epsilon, (Decimal, int)) else epsilon
+    lower = upper = None
+    try:
+        for leaf in leaves:
+            for bound, strict, offset in INTERVAL_OPERATORS[leaf.operator]:
+                value = leaf.value + offset * epsilon if epsilon else leaf.value
+                if bound == 'lower':
+                    if lower is None or value > lower[0] or (value == lower[0] and strict):
+                        lower = (value, strict)
+                elif upper is None or value < upper[0] or (value == upper[0] and strict):
+                    upper = (value, strict)
+        if lower is None or upper is None:
+            return False
+        if slack:
+            return lower[0] - upper[0] > slack
+        return lower[0] > upper[0] or (lower[0] == upper[0] and (lower[1] or upper[1]))
+    except TypeError:
+        # e.g. naive and timezone aware datetimes
+        return False
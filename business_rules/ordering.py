@@ -0,0 +1,221 @@
+from .compiler import (ConditionGroup,
+                       ConditionLeaf,
+                       _build_leaf,
+                       _get_variable_method,
+                       compile_rules)
+from .engine import EvaluationContext, do_actions
+
+# probability of a leaf being true when nothing was measured yet
+DEFAULT_PROBABILITY = 0.5
+
+
+def build_adaptive(rule_list, variables_cls, actions_cls, reorder_every=1000, native_numbers=False, epoch_dates=False,
+                   optimize=False):
+    """ Compiles rule_list and wraps it in an AdaptiveRuleSet. """
+    return AdaptiveRuleSet(compile_rules(rule_list, variables_cls, actions_cls, native_numbers=native_numbers,
+                                         epoch_dates=epoch_dates, optimize=optimize),
+                           reorder_every=reorder_every)
+
+
+def variable_cost(variables_cls, name):
+    """ Returns the cost hint the variable was declared with, see rule_variable(cost=...). """
+    return getattr(_get_variable_method(variables_cls, name), 'cost', 1)
+
+
+def order_by_cost(conditions, variables_cls):
+    """
+        Returns a tree returned by compiler.prepare_conditions with the children of every all / any node sorted by
+        their cost, cheapest first, so the expensive variables are only fetched when the cheap ones didn't decide the
+        node. The cost of a leaf is the cost hint of its variable, the cost of a node is its expected cost assuming
+        every child is true half of the time.
+
+        Which objects the tree is true for doesn't change, but a variable that raises for some objects may now be
+        fetched for objects it was short-circuited for before.
+    """
+    return _order_by_cost(conditions, variables_cls)[0]
+
+
+def _order_by_cost(conditions, variables_cls):
+    """ Returns the reordered tree and its cost. """
+    if not isinstance(conditions, ConditionGroup):
+        cost = variable_cost(variables_cls, conditions.name) if isinstance(conditions, ConditionLeaf) else 0
+        return conditions, cost
+    children = sorted((_order_by_cost(child, variables_cls) for child in conditions.children),
+                      key=lambda child: child[1])
+    cost = expected_cost(conditions.kind, [(child_cost, DEFAULT_PROBABILITY) for _, child_cost in children])
+    return ConditionGroup(conditions.kind, tuple(child for child, _ in children)), cost
+
+
+def expected_cost(kind, children):
+    """
+        Returns the expected cost of evaluating an all / any node whose children, in evaluation order, are given as
+        (cost, probability of being true) pairs.
+    """
+    cost, reached = 0.0, 1.0
+    for child_cost, probability in children:
+        cost += reached * child_cost
+        reached *= probability if kind == 'all' else 1 - probability
+    return cost
+
+
+def _ordering_key(kind, cost, probability):
+    """
+        Sorting the children of a node by this key minimizes its expected cost: an all node should first evaluate the
+        children that are cheap and likely to be false, an any node the ones that are cheap and likely to be true.
+    """
+    return cost / (1 - probability) if kind == 'all' else cost / probability
+
+
+class AdaptiveRuleSet(object):
+    """
+        Wraps a CompiledRuleSet, counting how often every leaf and all / any node is evaluated and true. Every
+        reorder_every calls to run_all or triggered_rules, the children of every node are sorted to minimize the
+        expected cost of the node given these selectivity statistics and the cost hints of the variables (see
+        rule_variable(cost=...)): children of all nodes by cost / (1 - p), children of any nodes by cost / p, where p
+        is the measured probability of the child being true. The counts are then halved, so the order follows the
+        objects as they change.
+
+        The triggered rules are the same as with the compiled rules, only the order the conditions are evaluated in
+        changes (see order_by_cost). Running it from several threads is safe, a few counts may just be lost.
+    """
+
+    def __init__(self, compiled_rules, reorder_every=1000):
+        self.compiled_rules = compiled_rules
+        self.rules = compiled_rules.rules
+        self.reorder_every = reorder_every
+        self.checks = [self._build_node(rule.conditions) for rule in self.rules]
+        self._calls = 0
+
+    def __len__(self):
+        return len(self.rules)
+
+    def _build_node(self, conditions):
+        if isinstance(conditions, ConditionGroup):
+            return _AdaptiveGroup(conditions.kind, [self._build_node(child) for child in conditions.children])
+        if isinstance(conditions, bool):
+            return _AdaptiveConstant(conditions)
+        variables_cls = self.compiled_rules.variables_cls
+        return _AdaptiveLeaf(conditions, _build_leaf(conditions, variables_cls),
+                             variable_cost(variables_cls, conditions.name))
+
+    def conditions(self, rule_index):
+        """ Returns the condition tree of a rule, in the order its children are currently evaluated in. """
+        return self.checks[rule_index].conditions()
+
+    def reorder(self):
+        """ Sorts the children of every node given the statistics collected so far. Called every reorder_every. """
+        for check in self.checks:
+            check.reorder()
+
+    def _count_call(self):
+        self._calls += 1
+        if self._calls >= self.reorder_every:
+            self._calls = 0
+            self.reorder()
+
+    def triggered_rules(self, defined_variables, cache_variables=False):
+        """ Returns the indices of the rules whose conditions are met, without running any action. """
+        self._count_call()
+        if cache_variables:
+            defined_variables = EvaluationContext(defined_variables)
+        return [rule_index for rule_index, check in enumerate(self.checks) if check(defined_variables)]
+
+    def run_all(self, defined_variables, defined_actions, stop_on_first_trigger=False, cache_variables=False):
+        """ Same semantics as engine.run_all. """
+        self._count_call()
+        if cache_variables:
+            defined_variables = EvaluationContext(defined_variables)
+        rule_was_triggered = False
+        for rule, check in zip(self.rules, self.checks):
+            if check(defined_variables):
+                do_actions(rule.actions, defined_actions)
+                rule_was_triggered = True
+                if stop_on_first_trigger:
+                    return True
+        return rule_was_triggered
+
+
+class _AdaptiveNode(object):
+    """ Counts how often a node is evaluated and true. """
+
+    def __init__(self):
+        self.evaluations = 0
+        self.true_count = 0
+
+    @property
+    def probability(self):
+        """ The probability of the node being true, starting from DEFAULT_PROBABILITY (Laplace smoothing). """
+        return (self.true_count + 2 * DEFAULT_PROBABILITY) / (self.evaluations + 2.0)
+
+    def _decay(self):
+        self.evaluations //= 2
+        self.true_count //= 2
+
+
+class _AdaptiveLeaf(_AdaptiveNode):
+
+    def __init__(self, leaf, check, cost):
+        super(_AdaptiveLeaf, self).__init__()
+        self.leaf = leaf
+        self.check = check
+        self.cost = cost
+
+    def __call__(self, defined_variables):
+        self.evaluations += 1
+        if self.check(defined_variables):
+            self.true_count += 1
+            return True
+        return False
+
+    def conditions(self):
+        return self.leaf
+
+    def reorder(self):
+        """ Returns the expected cost of the node. """
+        self._decay()
+        return self.cost
+
+
+class _AdaptiveConstant(_AdaptiveLeaf):
+    """ A tree folded to a constant by optimizer.optimize_conditions. """
+
+    def __init__(self, value):
+        super(_AdaptiveConstant, self).__init__(value, lambda defined_variables: value, 0)
+
+
+class _AdaptiveGroup(_AdaptiveNode):
+
+    def __init__(self, kind, children):
+        super(_AdaptiveGroup, self).__init__()
+        self.kind = kind
+        self.children = tuple(children)
+
+    def __call__(self, defined_variables):
+        self.evaluations += 1
+        if self.kind == 'all':
+            for child in self.children:
+                if not child(defined_variables):
+                    return False
+            self.true_count += 1
+            return True
+
+        for child in self.children:
+            if child(defined_variables):
+                self.true_count += 1
+                return True
+        return False
+
+    def conditions(self):
+        return ConditionGroup(self.kind, tuple(child.conditions() for child in self.children))
+
+    def reorder(self):
+        """ Sorts the children and returns the expected cost of the node. """
+        children = []
+        for child in self.children:
+            probability = child.probability
+            children.append((child.reorder(), probability, child))
+        children.sort(key=lambda child: _ordering_key(self.kind, child[0], child[1]))
+        # swapping the whole tuple keeps concurrent evaluations consistent
+        self.children = tuple(child for _, _, child in children)
+        self._decay()
+        return expected_cost(self.kind, [(cost, probability) for cost, probability, _ in children])
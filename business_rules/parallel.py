@@ -0,0 +1,123 @@
+import multiprocessing
+
+from .actions import BaseActions
+from .compiler import CompiledRuleSet, compile_rules
+from .engine import run_all
+from .plan import execute_plan, plan_all
+from .variables import BaseVariables
+
+# Set in every worker process by _init_worker, so the rules are only sent and compiled once per worker
+_worker_state = {}
+
+
+def run_all_parallel(rule_list,
+                     objects,
+                     variables_factory,
+                     actions_factory,
+                     workers=None,
+                     chunksize=100,
+                     stop_on_first_trigger=False,
+                     execute_actions_in_workers=True,
+                     native_numbers=False,
+                     epoch_dates=False):
+    """
+        Runs rule_list against every object of an iterable in a pool of worker processes.
+
+        - variables_factory / actions_factory - picklable callables (e.g. the BaseVariables / BaseActions subclasses)
+          returning the defined_variables / defined_actions for one object.
+        - workers - number of worker processes, defaults to the number of CPUs.
+        - chunksize - number of objects sent to a worker at a time.
+        - execute_actions_in_workers - if False, workers only evaluate the conditions and the actions of the triggered
+          rules are run in the calling process, in input order. Use it when actions aren't picklable or must not run
+          concurrently.
+        - native_numbers / epoch_dates - passed to compiler.compile_rules.
+
+        When variables_factory is a BaseVariables subclass (and actions_factory a BaseActions subclass, if actions
+        run in the workers) every worker compiles the rules once with compiler.compile_rules, instead of interpreting
+        the rule dicts for every object.
+
+        Returns a list with the result of run_all for each object, in input order.
+    """
+    compile_options = _compile_options(rule_list, variables_factory,
+                                       actions_factory if execute_actions_in_workers else None,
+                                       native_numbers, epoch_dates)
+    initargs = (rule_list, variables_factory, actions_factory, stop_on_first_trigger, execute_actions_in_workers,
+                compile_options)
+    pool = multiprocessing.Pool(workers, initializer=_init_worker, initargs=initargs)
+    try:
+        if execute_actions_in_workers:
+            return pool.map(_run_object, objects, chunksize)
+
+        objects = list(objects)
+        results = []
+        for obj, plan in zip(objects, pool.imap(_run_object, objects, chunksize)):
+            results.append(execute_plan(plan, actions_factory(obj)) if plan.triggered_rules else False)
+        return results
+    finally:
+        pool.close()
+        pool.join()
+
+
+def plan_all_parallel(rule_list, objects, variables_factory, workers=None, chunksize=100,
+                      stop_on_first_trigger=False, native_numbers=False, epoch_dates=False):
+    """
+        Evaluates rule_list for every object of an iterable in a pool of worker processes without running any action.
+        The rules are compiled once per worker when variables_factory is a BaseVariables subclass, see
+        run_all_parallel.
+
+        Returns the plan.Plan of each object, in input order, to run with plan.execute_plan or plan.execute_plans.
+    """
+    compile_options = _compile_options(rule_list, variables_factory, None, native_numbers, epoch_dates)
+    initargs = (rule_list, variables_factory, None, stop_on_first_trigger, False, compile_options)
+    pool = multiprocessing.Pool(workers, initializer=_init_worker, initargs=initargs)
+    try:
+        return pool.map(_run_object, objects, chunksize)
+    finally:
+        pool.close()
+        pool.join()
+
+
+def _compile_options(rule_list, variables_factory, actions_factory, native_numbers, epoch_dates):
+    """
+        Returns the arguments the workers give to compile_rules, or None if the factories aren't classes the rules can
+        be compiled against. The rules are compiled once here too, so that invalid rules fail in the calling process
+        instead of in the initializer of every worker.
+    """
+    if not _is_subclass(variables_factory, BaseVariables) or \
+            not (actions_factory is None or _is_subclass(actions_factory, BaseActions)):
+        if native_numbers or epoch_dates:
+            raise AssertionError("native_numbers and epoch_dates require the factories to be BaseVariables and "
+                                 "BaseActions subclasses")
+        return None
+    options = dict(variables_cls=variables_factory, actions_cls=actions_factory,
+                   native_numbers=native_numbers, epoch_dates=epoch_dates)
+    compile_rules(rule_list, **options)
+    return options
+
+
+def _is_subclass(factory, cls):
+    return isinstance(factory, type) and issubclass(factory, cls)
+
+
+def _init_worker(rule_list, variables_factory, actions_factory, stop_on_first_trigger, execute_actions,
+                 compile_options):
+    if compile_options is not None:
+        rule_list = compile_rules(rule_list, **compile_options)
+    _worker_state.update(rule_list=rule_list,
+                         variables_factory=variables_factory,
+                         actions_factory=actions_factory,
+                         stop_on_first_trigger=stop_on_first_trigger,
+                         execute_actions=execute_actions)
+
+
+def _run_object(obj):
+    state = _worker_state
+    defined_variables = state['variables_factory'](obj)
+    rule_list = state['rule_list']
+    if state['execute_actions']:
+        if isinstance(rule_list, CompiledRuleSet):
+            return rule_list.run_all(defined_variables, state['actions_factory'](obj),
+                                     stop_on_first_trigger=state['stop_on_first_trigger'])
+        return run_all(rule_list, defined_variables, state['actions_factory'](obj),
+                       stop_on_first_trigger=state['stop_on_first_trigger'])
+    return plan_all(rule_list, defined_variables, stop_on_first_trigger=state['stop_on_first_trigger'])
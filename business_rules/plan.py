@@ -0,0 +1,73 @@
+from collections import namedtuple
+
+from .bulk import ActionQueue
+from .compiler import CompiledRuleSet
+from .engine import EvaluationContext, check_conditions_recursively, do_actions
+
+# The outcome of evaluating a rule set for one object, see plan_all. Plans only hold tuples, dicts and the values of
+# the rules, so they can be pickled and sent to another process.
+Plan = namedtuple('Plan', ['triggered_rules', 'actions'])
+PlannedAction = namedtuple('PlannedAction', ['rule', 'name', 'params'])
+
+
+def plan_all(rules, defined_variables, stop_on_first_trigger=False, cache_variables=False):
+    """
+        Evaluates the conditions of every rule like run_all, but instead of running the actions of the triggered rules
+        returns them as a Plan to run later with execute_plan, possibly in another process.
+
+        - rules - a rule list or a CompiledRuleSet.
+
+        Returns a Plan whose triggered_rules are the indices of the triggered rules and whose actions are the
+        PlannedAction(rule index, action name, params) of these rules, in the order run_all would run them. Values
+        returned by actions are chained into the params of the next action when the plan is executed.
+    """
+    if cache_variables:
+        defined_variables = EvaluationContext(defined_variables)
+    if isinstance(rules, CompiledRuleSet):
+        outcomes = ((rule.check(defined_variables), rule.actions) for rule in rules)
+    else:
+        outcomes = ((check_conditions_recursively(rule['conditions'], defined_variables), rule['actions'])
+                    for rule in rules)
+
+    triggered_rules, actions = [], []
+    for rule_index, (triggered, rule_actions) in enumerate(outcomes):
+        if triggered:
+            triggered_rules.append(rule_index)
+            actions.extend(PlannedAction(rule_index, action['name'], action.get('params') or {})
+                           for action in rule_actions)
+            if stop_on_first_trigger:
+                break
+    return Plan(tuple(triggered_rules), tuple(actions))
+
+
+def execute_plan(plan, defined_actions):
+    """ Runs the actions of a Plan like run_all would have. Returns True if the plan triggered any rule. """
+    for actions in _actions_by_rule(plan):
+        do_actions(actions, defined_actions)
+    return bool(plan.triggered_rules)
+
+
+def execute_plans(plans):
+    """
+        Runs the actions of many plans, grouping the calls to bulk actions like run_all_bulk does.
+
+        - plans - an iterable of (plan, defined_actions) pairs.
+
+        Returns a list telling for each plan whether it triggered any rule.
+    """
+    queue = ActionQueue()
+    results = []
+    for plan, defined_actions in plans:
+        for actions in _actions_by_rule(plan):
+            queue.add(actions, defined_actions)
+        results.append(bool(plan.triggered_rules))
+    queue.flush()
+    return results
+
+
+def _actions_by_rule(plan):
+    """ Returns the planned actions as one do_actions action list per triggered rule. """
+    actions_by_rule = dict((rule_index, []) for rule_index in plan.triggered_rules)
+    for action in plan.actions:
+        actions_by_rule[action.rule].append({'name': action.name, 'params': action.params})
+    return [actions_by_rule[rule_index] for rule_index in plan.triggered_rules]
@@ -0,0 +1,268 @@
+import time
+
+from .compiler import ConditionLeaf, build_condition
+from .engine import (EvaluationContext,
+                     _call_action,
+                     _do_operator_comparison,
+                     _get_variable_value,
+                     _prepare_action)
+
+
+class Profiler(object):
+    """
+        Records where run_all spends its time. Pass an instance as run_all(..., profiler=profiler) or
+        CompiledRuleSet.run_all(..., profiler=profiler), possibly over many calls, then read it with as_dict or
+        as_prometheus. Rules are identified by their index in the rule list.
+
+        Recorded, as call counts and total wall time in seconds:
+
+        - rules, with the number of times each one was triggered and how often its all / any nodes short-circuited,
+        - leaf conditions, by their "name operator value" text, with the number of times they were true,
+        - variable fetches, by variable name (values read from the cache_variables cache aren't counted),
+        - actions, by action name.
+
+        The runs without a profiler don't pay anything for it beyond one branch. A Profiler isn't thread safe, use one
+        per thread.
+    """
+
+    def __init__(self, clock=time.perf_counter):
+        self.clock = clock
+        self.reset()
+
+    def reset(self):
+        self.rules = {}
+        self.conditions = {}
+        self.variables = {}
+        self.actions = {}
+        self._compiled_leaves = {}
+
+    def run_all(self, rule_list, defined_variables, defined_actions, stop_on_first_trigger=False,
+                cache_variables=False):
+        """ Same as engine.run_all, recording timings. """
+        defined_variables = _ProfiledContext(defined_variables, self, cache_variables)
+        rule_was_triggered = False
+        for rule_index, rule in enumerate(rule_list):
+            if self._run_rule(rule_index, rule['conditions'], rule['actions'], self._check_conditions,
+                              defined_variables, defined_actions):
+                rule_was_triggered = True
+                if stop_on_first_trigger:
+                    return True
+        return rule_was_triggered
+
+    def run_compiled(self, compiled_rules, defined_variables, defined_actions, stop_on_first_trigger=False,
+                     cache_variables=False):
+        """ Same as compiler.CompiledRuleSet.run_all, recording timings. """
+        if cache_variables:
+            defined_variables = EvaluationContext(defined_variables)
+
+        def check(conditions, rule_stats, defined_variables):
+            return self._check_compiled(conditions, rule_stats, defined_variables, compiled_rules.variables_cls)
+
+        rule_was_triggered = False
+        for rule_index, rule in enumerate(compiled_rules.rules):
+            if self._run_rule(rule_index, rule.conditions, rule.actions, check, defined_variables, defined_actions):
+                rule_was_triggered = True
+                if stop_on_first_trigger:
+                    return True
+        return rule_was_triggered
+
+    def timed_variable(self, name, fetch):
+        """ Wraps a function fetching the given variable so every call is recorded. """
+        stats = self._stats(self.variables, name)
+        clock = self.clock
+
+        def timed_fetch(*args, **kwargs):
+            start = clock()
+            try:
+                return fetch(*args, **kwargs)
+            finally:
+                stats.record(clock() - start)
+
+        return timed_fetch
+
+    def _stats(self, stats_by_key, key):
+        stats = stats_by_key.get(key)
+        if stats is None:
+            stats = stats_by_key[key] = _Stats()
+        return stats
+
+    def _run_rule(self, rule_index, conditions, actions, check, defined_variables, defined_actions):
+        rule_stats = self._stats(self.rules, rule_index)
+        start = self.clock()
+        try:
+            triggered = check(conditions, rule_stats, defined_variables)
+            if triggered:
+                self._do_actions(actions, defined_actions)
+        finally:
+            rule_stats.record(self.clock() - start)
+        if triggered:
+            rule_stats.hits += 1
+        return triggered
+
+    def _check_group(self, kind, children, rule_stats, check_child):
+        """ Evaluates the children of an all / any node like the engine does, counting short-circuits. """
+        assert len(children) >= 1
+        rule_stats.groups += 1
+        for position, child in enumerate(children):
+            result = check_child(child)
+            if bool(result) != (kind == 'all'):
+                if position < len(children) - 1:
+                    rule_stats.short_circuits += 1
+                return result
+        return kind == 'all'
+
+    def _check_conditions(self, conditions, rule_stats, defined_variables):
+        keys = list(conditions.keys())
+        if keys == ['all'] or keys == ['any']:
+            return self._check_group(keys[0], conditions[keys[0]], rule_stats,
+                                     lambda child: self._check_conditions(child, rule_stats, defined_variables))
+
+        # help prevent errors - any and all can only be in the condition dict if they're the only item
+        assert not ('any' in keys or 'all' in keys)
+        name, op, value, params = conditions['name'], conditions['operator'], conditions['value'], \
+            conditions.get('params', {})
+        stats = self._stats(self.conditions, _condition_label(name, op, value, params))
+        start = self.clock()
+        try:
+            result = _do_operator_comparison(_get_variable_value(defined_variables, name, params), op, value)
+        finally:
+            stats.record(self.clock() - start)
+        if result:
+            stats.hits += 1
+        return result
+
+    def _check_compiled(self, conditions, rule_stats, defined_variables, variables_cls):
+        if isinstance(conditions, bool):
+            return conditions
+        if not isinstance(conditions, ConditionLeaf):
+            return self._check_group(conditions.kind, conditions.children, rule_stats,
+                                     lambda child: self._check_compiled(child, rule_stats, defined_variables,
+                                                                        variables_cls))
+
+        entry = self._compiled_leaves.get(id(conditions))
+        if entry is None or entry[0] is not conditions:
+            label = _condition_label(conditions.name, conditions.operator, conditions.value, conditions.params)
+            entry = self._compiled_leaves[id(conditions)] = (conditions, self._stats(self.conditions, label),
+                                                             build_condition(conditions, variables_cls, self))
+        stats, check = entry[1], entry[2]
+        start = self.clock()
+        try:
+            result = check(defined_variables)
+        finally:
+            stats.record(self.clock() - start)
+        if result:
+            stats.hits += 1
+        return result
+
+    def _do_actions(self, actions, defined_actions):
+        """ Same as engine.do_actions, recording the time spent in each action. """
+        returned_values = None
+        for action in actions:
+            method, params = _prepare_action(action, defined_actions, returned_values)
+            stats = self._stats(self.actions, action['name'])
+            start = self.clock()
+            try:
+                returned_values = _call_action(method, defined_actions, params)
+            finally:
+                stats.record(self.clock() - start)
+
+    def as_dict(self):
+        """ Returns everything recorded so far as plain dicts, e.g. to dump as JSON. """
+        rules = {}
+        for rule_index, stats in self.rules.items():
+            rule = stats.as_dict()
+            rule['triggered'] = stats.hits
+            rule['groups'] = stats.groups
+            rule['short_circuits'] = stats.short_circuits
+            rule['short_circuit_rate'] = float(stats.short_circuits) / stats.groups if stats.groups else 0.0
+            rules[rule_index] = rule
+
+        conditions = {}
+        for label, stats in self.conditions.items():
+            condition = conditions[label] = stats.as_dict()
+            condition['true'] = stats.hits
+
+        return {'rules': rules,
+                'conditions': conditions,
+                'variables': dict((name, stats.as_dict()) for name, stats in self.variables.items()),
+                'actions': dict((name, stats.as_dict()) for name, stats in self.actions.items())}
+
+    def as_prometheus(self, prefix='business_rules'):
+        """ Returns everything recorded so far in the Prometheus text exposition format. """
+        lines = []
+
+        def metric(name, help_text, label, values):
+            name = '{0}_{1}'.format(prefix, name)
+            lines.append('# HELP {0} {1}'.format(name, help_text))
+            lines.append('# TYPE {0} counter'.format(name))
+            for key, value in sorted(values, key=lambda item: str(item[0])):
+                lines.append('{0}{{{1}="{2}"}} {3!r}'.format(name, label, _escape_label_value(key), value))
+
+        def family(name, help_name, label, stats_by_key):
+            metric(name + '_seconds_total', 'Wall time spent in each {0}.'.format(help_name), label,
+                   [(key, stats.total) for key, stats in stats_by_key.items()])
+            metric(name + '_calls_total', 'Number of times each {0} was run.'.format(help_name), label,
+                   [(key, stats.count) for key, stats in stats_by_key.items()])
+
+        family('rule', 'rule', 'rule', self.rules)
+        metric('rule_triggered_total', 'Number of times each rule was triggered.', 'rule',
+               [(key, stats.hits) for key, stats in self.rules.items()])
+        metric('rule_groups_total', 'Number of all / any nodes evaluated in each rule.', 'rule',
+               [(key, stats.groups) for key, stats in self.rules.items()])
+        metric('rule_short_circuits_total', 'Number of all / any nodes of each rule that short-circuited.', 'rule',
+               [(key, stats.short_circuits) for key, stats in self.rules.items()])
+        family('condition', 'leaf condition', 'condition', self.conditions)
+        metric('condition_true_total', 'Number of times each leaf condition was true.', 'condition',
+               [(key, stats.hits) for key, stats in self.conditions.items()])
+        family('variable', 'variable fetch', 'variable', self.variables)
+        family('action', 'action', 'action', self.actions)
+        return '\n'.join(lines) + '\n'
+
+
+class _Stats(object):
+    __slots__ = ('count', 'total', 'hits', 'groups', 'short_circuits')
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.hits = 0
+        self.groups = 0
+        self.short_circuits = 0
+
+    def record(self, elapsed):
+        self.count += 1
+        self.total += elapsed
+
+    def as_dict(self):
+        return {'count': self.count, 'total_seconds': self.total}
+
+
+class _ProfiledContext(EvaluationContext):
+    """ EvaluationContext timing every variable it fetches, and only memoizing them if cache is True. """
+
+    def __init__(self, defined_variables, profiler, cache):
+        super(_ProfiledContext, self).__init__(defined_variables)
+        self.profiler = profiler
+        self.cache = cache
+
+    def get_variable_value(self, name, params, field_type=None):
+        if self.cache:
+            return super(_ProfiledContext, self).get_variable_value(name, params, field_type)
+        value = self._fetch_variable_value(name, params)
+        if field_type is not None and type(value) is not field_type:
+            return field_type(value.value)
+        return value
+
+    def _fetch_variable_value(self, name, params):
+        fetch = super(_ProfiledContext, self)._fetch_variable_value
+        return self.profiler.timed_variable(name, fetch)(name, params)
+
+
+def _condition_label(name, operator, value, params):
+    if params:
+        name = '{0}({1})'.format(name, ', '.join('{0}={1}'.format(k, params[k]) for k in sorted(params)))
+    return '{0} {1} {2}'.format(name, operator, getattr(value, 'pattern', value))
+
+
+def _escape_label_value(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
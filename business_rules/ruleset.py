@@ -0,0 +1,191 @@
+import threading
+
+from .compiler import CompiledRuleSet, compile_rule, field_type_overrides
+from .engine import EvaluationContext
+from .index import IndexedRuleSet
+
+
+class RuleSet(object):
+    """
+        A versioned rule list that can be edited while it's being run, e.g. by other threads serving requests.
+
+        Every rule is a rule dict with a unique id under id_key. The rules are compiled once, when they're added or
+        changed: apply_diff only compiles the rules it adds or changes and reuses the compiled rules of the others.
+        Each version is an immutable RuleSetSnapshot, swapped in atomically once it's fully built, so readers never
+        wait for a reload and an evaluation that started on a snapshot runs to the end on that same snapshot.
+
+        - indexed - if True, every snapshot is also indexed (see index.IndexedRuleSet) and run_all uses the index.
+          apply_diff updates the index of the previous version with IndexedRuleSet.updated instead of rebuilding it.
+        - native_numbers / epoch_dates - see compiler.compile_rules.
+    """
+
+    def __init__(self, rule_list, variables_cls, actions_cls, id_key='id', indexed=False, native_numbers=False,
+                 epoch_dates=False):
+        self.variables_cls = variables_cls
+        self.actions_cls = actions_cls
+        self.id_key = id_key
+        self.indexed = indexed
+        self.field_types = field_type_overrides(native_numbers=native_numbers, epoch_dates=epoch_dates)
+        self._lock = threading.Lock()
+
+        rule_ids, entries = [], {}
+        for rule in rule_list:
+            rule_id = self._rule_id(rule)
+            if rule_id in entries:
+                raise AssertionError("Rule {0} is defined more than once".format(rule_id))
+            entries[rule_id] = (rule, self._compile(rule), len(rule_ids))
+            rule_ids.append(rule_id)
+        # rule indices in the index of every snapshot: they increase with the position of the rules, and a rule keeps
+        # its index across versions, see IndexedRuleSet.updated
+        self._next_rule_index = len(rule_ids)
+
+        compiled_rules = self._compiled_rules(rule_ids, entries)
+        index, rule_ids_by_index = None, None
+        if indexed:
+            index = IndexedRuleSet(compiled_rules)
+            # the rule indices of the updated indexes aren't positions, keep them in a dict
+            index.rules = dict(enumerate(index.rules))
+            rule_ids_by_index = dict(enumerate(rule_ids))
+        self._snapshot = RuleSetSnapshot(0, tuple(rule_ids), entries, compiled_rules, index, rule_ids_by_index)
+
+    def __len__(self):
+        return len(self._snapshot)
+
+    @property
+    def version(self):
+        return self._snapshot.version
+
+    def snapshot(self):
+        """ Returns the current RuleSetSnapshot. Hold on to it to run several evaluations on the same version. """
+        return self._snapshot
+
+    def run_all(self, defined_variables, defined_actions, stop_on_first_trigger=False):
+        """ Same semantics as engine.run_all, on the current snapshot. See RuleSetSnapshot.run_all. """
+        return self._snapshot.run_all(defined_variables, defined_actions, stop_on_first_trigger=stop_on_first_trigger)
+
+    def apply_diff(self, added=(), removed=(), changed=()):
+        """
+            Builds and swaps in the next version of the rule set, all or nothing.
+
+            - added - rule dicts to append after the current rules, in the given order.
+            - removed - ids of the rules to remove.
+            - changed - rule dicts replacing the current rules with the same ids. They keep their position.
+
+            Raises an AssertionError, leaving the current version as it is, if an added rule's id is already used, a
+            removed or changed rule doesn't exist or a new rule doesn't compile. Returns the new snapshot.
+        """
+        with self._lock:
+            current = self._snapshot
+            entries = dict(current.entries)
+            rule_ids = list(current.rule_ids)
+            # rule indices of the rules leaving the index, (rule index, rule id, CompiledRule) of the ones entering it
+            removed_indices, added_rules = [], []
+            next_rule_index = self._next_rule_index
+
+            removed = set(removed)
+            for rule_id in removed:
+                if rule_id not in entries:
+                    raise AssertionError("Cannot remove rule {0}, it does not exist".format(rule_id))
+                removed_indices.append(entries.pop(rule_id)[2])
+            if removed:
+                rule_ids = [rule_id for rule_id in rule_ids if rule_id not in removed]
+
+            for rule in changed:
+                rule_id = self._rule_id(rule)
+                if rule_id not in entries:
+                    raise AssertionError("Cannot change rule {0}, it does not exist".format(rule_id))
+                if entries[rule_id][0] != rule:
+                    rule_index = entries[rule_id][2]
+                    entries[rule_id] = (rule, self._compile(rule), rule_index)
+                    removed_indices.append(rule_index)
+                    added_rules.append((rule_index, rule_id, entries[rule_id][1]))
+
+            for rule in added:
+                rule_id = self._rule_id(rule)
+                if rule_id in entries:
+                    raise AssertionError("Cannot add rule {0}, it already exists".format(rule_id))
+                rule_ids.append(rule_id)
+                entries[rule_id] = (rule, self._compile(rule), next_rule_index)
+                added_rules.append((next_rule_index, rule_id, entries[rule_id][1]))
+                next_rule_index += 1
+
+            index, rule_ids_by_index = None, None
+            if current.index is not None:
+                rules, rule_ids_by_index = dict(current.index.rules), dict(current.rule_ids_by_index)
+                for rule_index in removed_indices:
+                    del rules[rule_index]
+                    del rule_ids_by_index[rule_index]
+                for rule_index, rule_id, compiled_rule in added_rules:
+                    rules[rule_index] = compiled_rule
+                    rule_ids_by_index[rule_index] = rule_id
+                index = current.index.updated(rules, removed_indices, [rule[0] for rule in added_rules])
+
+            self._next_rule_index = next_rule_index
+            self._snapshot = RuleSetSnapshot(current.version + 1, tuple(rule_ids), entries,
+                                             self._compiled_rules(rule_ids, entries), index, rule_ids_by_index)
+            return self._snapshot
+
+    def _rule_id(self, rule):
+        if self.id_key not in rule:
+            raise AssertionError("Rule has no {0}: {1}".format(self.id_key, rule))
+        return rule[self.id_key]
+
+    def _compile(self, rule):
+        return compile_rule(rule, self.variables_cls, self.actions_cls, field_types=self.field_types)
+
+    def _compiled_rules(self, rule_ids, entries):
+        return CompiledRuleSet([entries[rule_id][1] for rule_id in rule_ids], self.variables_cls, self.actions_cls)
+
+
+class RuleSetSnapshot(object):
+    """
+        One version of a RuleSet. Never modified once built.
+
+        - rule_ids - the ids of the rules, in evaluation order.
+        - compiled_rules - the CompiledRuleSet of the rules, in the same order.
+        - index - the IndexedRuleSet of the rules, or None. Its rule indices are kept across versions, so they aren't
+          positions in compiled_rules.
+        - rule_ids_by_index - rule index in index -> rule id, if there's an index.
+    """
+
+    def __init__(self, version, rule_ids, entries, compiled_rules, index=None, rule_ids_by_index=None):
+        self.version = version
+        self.rule_ids = rule_ids
+        # rule id -> (rule dict, CompiledRule, rule index in index)
+        self.entries = entries
+        self.compiled_rules = compiled_rules
+        self.index = index
+        self.rule_ids_by_index = rule_ids_by_index
+
+    def __len__(self):
+        return len(self.rule_ids)
+
+    def rule(self, rule_id):
+        """ Returns the rule dict with the given id. """
+        return self.entries[rule_id][0]
+
+    def run_all(self, defined_variables, defined_actions, stop_on_first_trigger=False):
+        """
+            Same semantics as engine.run_all. Variables are memoized until a rule fires, as its actions may change what
+            they return (see index.IndexedRuleSet.run_all).
+        """
+        if self.index is not None:
+            return self.index.run_all(defined_variables, defined_actions, stop_on_first_trigger=stop_on_first_trigger)
+        variables = EvaluationContext(defined_variables)
+        rule_was_triggered = False
+        for rule in self.compiled_rules.rules:
+            if rule.run(variables, defined_actions):
+                rule_was_triggered = True
+                if stop_on_first_trigger:
+                    return True
+                variables = EvaluationContext(defined_variables)
+        return rule_was_triggered
+
+    def triggered_rules(self, defined_variables):
+        """ Returns the ids of the rules whose conditions are met, without running any action. """
+        defined_variables = EvaluationContext(defined_variables)
+        if self.index is not None:
+            return [self.rule_ids_by_index[rule_index] for rule_index in self.index.candidate_rules(defined_variables)
+                    if self.index.rules[rule_index].check(defined_variables)]
+        return [rule_id for rule_id, rule in zip(self.rule_ids, self.compiled_rules.rules)
+                if rule.check(defined_variables)]
@@ -0,0 +1,234 @@
+"""
+    Evaluates a rule set over a stream of records, e.g. a JSONL dump, with bounded memory.
+
+    Usage: business_rules RULES.json [RECORDS.jsonl] --schema SCHEMA.json [options]
+
+    Writes one JSON line per record that triggered at least one rule: {"record": <position of the record in
+    the input, from 0>, "rules": [<indices of the triggered rules>]}. With --on-error report, records whose evaluation
+    failed are written as {"record": <position>, "error": <message>}.
+"""
+import argparse
+import collections
+import itertools
+import json
+import multiprocessing
+import sys
+
+from .compiler import build_condition, field_type_overrides, prepare_conditions
+from .engine import EvaluationContext
+from .operators import EXPORTED_TYPES
+from .variables import BaseVariables, rule_variable
+
+# Set in every worker process by _init_worker
+_worker_state = {}
+
+ON_ERROR_CHOICES = ('raise', 'skip', 'report')
+
+
+class RecordError(Exception):
+    """ Yielded by evaluate_records(..., on_error='report') instead of the triggered rules of a record that failed. """
+
+
+def record_variables_cls(schema):
+    """
+        Returns a BaseVariables subclass exposing the keys of a record (a dict) as variables. schema maps every
+        variable name to its field type, either a BaseType subclass or the name of an exported type (e.g. 'numeric',
+        'string', 'date'). Missing keys are read as None.
+    """
+    types_by_name = dict((field_type.name, field_type) for field_type in EXPORTED_TYPES.values())
+
+    def make_variable(name, field_type):
+        if isinstance(field_type, str):
+            if field_type not in types_by_name:
+                raise AssertionError("Unknown field type {0} for variable {1}, expected one of {2}".format(
+                    field_type, name, ', '.join(sorted(types_by_name))))
+            field_type = types_by_name[field_type]
+
+        def variable(self):
+            return self.record.get(name)
+
+        variable.__name__ = name
+        return rule_variable(field_type)(variable)
+
+    attributes = dict((name, make_variable(name, field_type)) for name, field_type in schema.items())
+    attributes['__init__'] = _init_record_variables
+    return type('RecordVariables', (BaseVariables,), attributes)
+
+
+def _init_record_variables(self, record):
+    self.record = record
+
+
+def evaluate_records(rule_list,
+                     records,
+                     variables,
+                     stop_on_first_trigger=False,
+                     batch_size=1000,
+                     workers=None,
+                     native_numbers=False,
+                     epoch_dates=False,
+                     on_error='raise'):
+    """
+        Lazily evaluates the conditions of rule_list for every record of an iterable, with the semantics of
+        run_all(..., cache_variables=True). No action is run.
+
+        - variables - a schema (see record_variables_cls), or a BaseVariables subclass taking the record as only
+          argument. With workers, a class has to be importable by the worker processes.
+        - batch_size - number of records read, evaluated and yielded at a time.
+        - workers - if given, batches are evaluated in that many worker processes. At most two batches per worker
+          are in flight, so memory stays bounded.
+        - on_error - what to do when evaluating a record raises, e.g. a numeric variable missing from the record:
+          'raise' stops the stream, 'skip' leaves the record out of the results and 'report' yields a RecordError
+          holding the error message in place of the triggered rules.
+
+        Yields, in input order, a (record, list of the indices of the rules it triggered) tuple for every record.
+    """
+    if on_error not in ON_ERROR_CHOICES:
+        raise AssertionError("on_error must be one of {0}, got {1}".format(', '.join(ON_ERROR_CHOICES), on_error))
+
+    batches = _batches(records, batch_size)
+    if not workers:
+        checks = _compile_checks(rule_list, variables, native_numbers, epoch_dates)
+        for batch in batches:
+            results = [_triggered_rules(checks, record, stop_on_first_trigger, on_error) for record in batch]
+            for result in _batch_results(batch, results, on_error):
+                yield result
+        return
+
+    pool = multiprocessing.Pool(workers, initializer=_init_worker,
+                                initargs=(rule_list, variables, stop_on_first_trigger, native_numbers, epoch_dates,
+                                          on_error))
+    try:
+        pending = collections.deque()
+        for batch in batches:
+            pending.append((batch, pool.apply_async(_evaluate_batch, (batch,))))
+            if len(pending) >= 2 * workers:
+                batch, results = pending.popleft()
+                for result in _batch_results(batch, results.get(), on_error):
+                    yield result
+        while pending:
+            batch, results = pending.popleft()
+            for result in _batch_results(batch, results.get(), on_error):
+                yield result
+    finally:
+        pool.terminate()
+        pool.join()
+
+
+def _batch_results(batch, results, on_error):
+    for record, triggered in zip(batch, results):
+        if not (on_error == 'skip' and isinstance(triggered, RecordError)):
+            yield record, triggered
+
+
+def _batches(records, batch_size):
+    records = iter(records)
+    while True:
+        batch = list(itertools.islice(records, batch_size))
+        if not batch:
+            return
+        yield batch
+
+
+def _compile_checks(rule_list, variables, native_numbers, epoch_dates):
+    variables_cls = variables if isinstance(variables, type) else record_variables_cls(variables)
+    field_types = field_type_overrides(native_numbers=native_numbers, epoch_dates=epoch_dates)
+    return variables_cls, [build_condition(prepare_conditions(rule['conditions'], variables_cls,
+                                                              field_types=field_types), variables_cls)
+                           for rule in rule_list]
+
+
+def _triggered_rules(checks, record, stop_on_first_trigger, on_error='raise'):
+    """ Returns the indices of the rules the record triggers, or a RecordError if it fails and on_error isn't raise. """
+    variables_cls, conditions = checks
+    triggered = []
+    try:
+        defined_variables = EvaluationContext(variables_cls(record))
+        for rule_index, check in enumerate(conditions):
+            if check(defined_variables):
+                triggered.append(rule_index)
+                if stop_on_first_trigger:
+                    break
+    except Exception as error:
+        if on_error == 'raise':
+            raise
+        return RecordError("{0}: {1}".format(type(error).__name__, error))
+    return triggered
+
+
+def _init_worker(rule_list, variables, stop_on_first_trigger, native_numbers, epoch_dates, on_error):
+    _worker_state.update(checks=_compile_checks(rule_list, variables, native_numbers, epoch_dates),
+                         stop_on_first_trigger=stop_on_first_trigger,
+                         on_error=on_error)
+
+
+def _evaluate_batch(batch):
+    checks, stop_on_first_trigger = _worker_state['checks'], _worker_state['stop_on_first_trigger']
+    return [_triggered_rules(checks, record, stop_on_first_trigger, _worker_state['on_error']) for record in batch]
+
+
+def read_jsonl(lines):
+    """ Lazily parses JSON lines, skipping blank ones. """
+    for line in lines:
+        if line.strip():
+            yield json.loads(line)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('rules', help='JSON file holding the rule list')
+    parser.add_argument('records', nargs='?', default='-', help='JSONL file of records, - for stdin (default)')
+    parser.add_argument('--schema', required=True,
+                        help='JSON file mapping each record key used by the rules to its field type')
+    parser.add_argument('-o', '--output', default='-', help='JSONL file to write the results to, - for stdout')
+    parser.add_argument('--batch-size', type=int, default=1000, help='records evaluated at a time (default: 1000)')
+    parser.add_argument('--workers', type=int, default=None, help='number of worker processes (default: none)')
+    parser.add_argument('--stop-on-first-trigger', action='store_true',
+                        help='only report the first rule triggered by each record')
+    parser.add_argument('--id-field', help='record key to copy to the results as "id"')
+    parser.add_argument('--all', action='store_true', help='also write the records that triggered no rule')
+    parser.add_argument('--native-numbers', action='store_true', help='compare numbers as native ints and floats')
+    parser.add_argument('--epoch-dates', action='store_true', help='compare dates as POSIX timestamps')
+    parser.add_argument('--on-error', choices=ON_ERROR_CHOICES, default='raise',
+                        help='when evaluating a record fails: stop (raise, default), skip the record, or report the '
+                             'error in the results')
+    args = parser.parse_args(argv)
+
+    with open(args.rules) as rules_file:
+        rule_list = json.load(rules_file)
+    with open(args.schema) as schema_file:
+        schema = json.load(schema_file)
+
+    records_file = sys.stdin if args.records == '-' else open(args.records)
+    output_file = sys.stdout if args.output == '-' else open(args.output, 'w')
+    try:
+        results = evaluate_records(rule_list, read_jsonl(records_file), schema,
+                                   stop_on_first_trigger=args.stop_on_first_trigger,
+                                   batch_size=args.batch_size,
+                                   workers=args.workers,
+                                   native_numbers=args.native_numbers,
+                                   epoch_dates=args.epoch_dates,
+                                   # skipped records are reported too, so that the positions stay right
+                                   on_error='raise' if args.on_error == 'raise' else 'report')
+        for record_index, (record, triggered) in enumerate(results):
+            if isinstance(triggered, RecordError):
+                if args.on_error == 'skip':
+                    continue
+                result = {'record': record_index, 'error': str(triggered)}
+            elif not (triggered or args.all):
+                continue
+            else:
+                result = {'record': record_index, 'rules': triggered}
+            if args.id_field:
+                result['id'] = record.get(args.id_field)
+            output_file.write(json.dumps(result) + '\n')
+    finally:
+        if records_file is not sys.stdin:
+            records_file.close()
+        if output_file is not sys.stdout:
+            output_file.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
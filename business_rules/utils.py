@@ -1,4 +1,5 @@
-import inspect
+import hashlib
+import json
 from decimal import Decimal, Inexact, Context
 
 from business_rules import fields
@@ -8,6 +9,10 @@ def fn_name_to_pretty_label(name):
     return ' '.join([w.title() for w in name.split('_')])
 
 
+# (variables class, actions class) -> (rule data, etag), see export_rule_data
+_rule_data_cache = {}
+
+
 def export_rule_data(variables, actions):
     """
         export_rule_data is used to export all information about the variables, actions, and operators to the client.
@@ -15,13 +20,45 @@ def export_rule_data(variables, actions):
             - variables: a list of all available variables along with their label, type and options
             - actions: a list of all actions along with their label and params
             - variable_type_operators: a dictionary of all field_types -> list of available operators
+
+        The dictionary is computed once per variables and actions classes and shared between calls, don't modify it.
+    """
+    return _get_rule_data(variables, actions)[0]
+
+
+def rule_data_etag(variables, actions):
+    """
+        Returns a stable hash of export_rule_data(variables, actions), e.g. to use as an HTTP ETag. It only changes
+        when the exported variables, actions or operators do.
     """
-    from . import operators
+    return _get_rule_data(variables, actions)[1]
+
+
+def clear_rule_data_cache():
+    _rule_data_cache.clear()
+
+
+def _get_rule_data(variables, actions):
+    key = (_class_of(variables), _class_of(actions))
+    entry = _rule_data_cache.get(key)
+    if entry is None:
+        data = _build_rule_data(variables, actions)
+        etag = hashlib.sha256(json.dumps(data, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+        entry = _rule_data_cache[key] = (data, etag)
+    return entry
+
+
+def _class_of(obj):
+    return obj if isinstance(obj, type) or obj is None else type(obj)
+
+
+def _build_rule_data(variables, actions):
+    from .operators import EXPORTED_TYPES
     actions_data = actions.get_all_actions() if actions else None
     variables_data = variables.get_all_variables() if variables else None
     variable_type_operators = {}
-    for variable_class in inspect.getmembers(operators, lambda x: getattr(x, 'export_in_rule_data', False)):
-        variable_type = variable_class[1]  # getmembers returns (name, value)
+    for class_name in sorted(EXPORTED_TYPES):
+        variable_type = EXPORTED_TYPES[class_name]
         variable_type_operators[variable_type.name] = variable_type.get_all_operators()
 
     return {"variables": variables_data,
@@ -45,6 +82,20 @@ def float_to_decimal(f):
     return result
 
 
+def make_hashable(value):
+    """
+        Recursively converts dicts, lists and sets (e.g. the params of a condition) into tuples and frozensets so the
+        result can be used as a dictionary key.
+    """
+    if isinstance(value, dict):
+        return tuple(sorted((k, make_hashable(v)) for k, v in value.items()))
+    if isinstance(value, (list, tuple)):
+        return tuple(make_hashable(v) for v in value)
+    if isinstance(value, (set, frozenset)):
+        return frozenset(make_hashable(v) for v in value)
+    return value
+
+
 def validate_parameters(func, params, element):
     """
         Verifies that the parameters specified are actual parameters for the function `func`,
@@ -1,32 +1,59 @@
 import inspect
 
 from .operators import (BaseType,
+                        NativeNumericType,
                         NumericType,
                         StringType,
                         BooleanType,
                         SelectType,
                         SelectMultipleType,
-                        DateType)
+                        DateType,
+                        EpochDateType)
 from .utils import fn_name_to_pretty_label, validate_parameters, docstring_to_tooltip
 
 
 class BaseVariables(object):
     """ Classes that hold a collection of variables to use with the rules engine should inherit from this. """
 
+    def __init_subclass__(cls, **kwargs):
+        super(BaseVariables, cls).__init_subclass__(**kwargs)
+        cls._register_variables()
+
     @classmethod
-    def get_all_variables(cls):
+    def _register_variables(cls):
+        """
+            Collects the rule variables of the class once, when the class is created. Variables added to the class
+            afterwards aren't registered.
+        """
         methods = inspect.getmembers(cls)
-        return [{'name': m[0],
-                 'label': m[1].label,
-                 'field_type': m[1].field_type.name,
-                 'options': m[1].options,
-                 'params': m[1].params,
-                 'tooltip': docstring_to_tooltip(m[1].__doc__)
-                 } for m in methods if getattr(m[1], 'is_rule_variable', False)]
+        cls._rule_variables = dict(m for m in methods if getattr(m[1], 'is_rule_variable', False))
+        cls._variables_data = [{'name': m[0],
+                                'label': m[1].label,
+                                'field_type': m[1].field_type.name,
+                                'options': m[1].options,
+                                'params': m[1].params,
+                                'tooltip': docstring_to_tooltip(m[1].__doc__)
+                                } for m in methods if getattr(m[1], 'is_rule_variable', False)]
+
+    @classmethod
+    def get_all_variables(cls):
+        """ Returns the data of every variable sorted by name. The list is shared, don't modify it. """
+        return cls._variables_data
+
+
+BaseVariables._register_variables()
+
 
+def rule_variable(field_type, label=None, options=None, params=None, cache=True, cost=1):
+    """
+        Decorator to make a function into a rule variable.
 
-def rule_variable(field_type, label=None, options=None, params=None):
-    """ Decorator to make a function into a rule variable. """
+        - cache - set to False for variables whose value can change between two reads, so that
+          run_all(..., cache_variables=True) fetches them again every time a condition names them.
+        - cost - how expensive fetching the variable is compared to the others, e.g. 100 for a remote call. Used to
+          evaluate the cheap conditions first, see compile_rules(..., order_by_cost=True) and
+          ordering.AdaptiveRuleSet.
+    """
     options = options or []
     params = params or {}
 
@@ -47,37 +74,43 @@ def rule_variable(field_type, label=None, options=None, params=None):
         func.label = label or fn_name_to_pretty_label(func.__name__)
         func.options = options
         func.params = params
+        func.cache = cache
+        func.cost = cost
         return func
 
     return wrapper
 
 
-def _rule_variable_wrapper(field_type, label, params):
+def _rule_variable_wrapper(field_type, label, params, cache=True, cost=1):
     if callable(label):
         # Decorator is being called with no args, label is actually the decorated func
         return rule_variable(field_type)(label)
-    return rule_variable(field_type, label=label, params=params)
+    return rule_variable(field_type, label=label, params=params, cache=cache, cost=cost)
 
 
-def numeric_rule_variable(label=None, params=None):
-    return _rule_variable_wrapper(NumericType, label, params)
+def numeric_rule_variable(label=None, params=None, cache=True, native=False, cost=1):
+    """
+        With native=True the variable is compared as a native int / float instead of a Decimal, see NativeNumericType.
+    """
+    return _rule_variable_wrapper(NativeNumericType if native else NumericType, label, params, cache=cache, cost=cost)
 
 
-def string_rule_variable(label=None, params=None):
-    return _rule_variable_wrapper(StringType, label, params=params)
+def string_rule_variable(label=None, params=None, cache=True, cost=1):
+    return _rule_variable_wrapper(StringType, label, params=params, cache=cache, cost=cost)
 
 
-def boolean_rule_variable(label=None, params=None):
-    return _rule_variable_wrapper(BooleanType, label, params=params)
+def boolean_rule_variable(label=None, params=None, cache=True, cost=1):
+    return _rule_variable_wrapper(BooleanType, label, params=params, cache=cache, cost=cost)
 
 
-def select_rule_variable(label=None, options=None, params=None):
-    return rule_variable(SelectType, label=label, options=options, params=params)
+def select_rule_variable(label=None, options=None, params=None, cache=True, cost=1):
+    return rule_variable(SelectType, label=label, options=options, params=params, cache=cache, cost=cost)
 
 
-def select_multiple_rule_variable(label=None, options=None, params=None):
-    return rule_variable(SelectMultipleType, label=label, options=options, params=params)
+def select_multiple_rule_variable(label=None, options=None, params=None, cache=True, cost=1):
+    return rule_variable(SelectMultipleType, label=label, options=options, params=params, cache=cache, cost=cost)
 
 
-def date_rule_variable(label=None, params=None):
-    return rule_variable(DateType, label=label, params=params)
+def date_rule_variable(label=None, params=None, cache=True, epoch=False, cost=1):
+    """ With epoch=True the variable is compared as a POSIX timestamp instead of a datetime, see EpochDateType. """
+    return rule_variable(EpochDateType if epoch else DateType, label=label, params=params, cache=cache, cost=cost)
@@ -17,5 +17,8 @@ setuptools.setup(
         author_email='open-source@venmo.com',
         url='https://github.com/venmo/business-rules',
         packages=['business_rules'],
+        python_requires='>=3.6',
+        extras_require={'numpy': ['numpy']},
+        entry_points={'console_scripts': ['business_rules = business_rules.stream:main']},
         license='MIT',
 )
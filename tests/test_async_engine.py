@@ -0,0 +1,146 @@
+import asyncio
+
+from business_rules.actions import BaseActions, bulk_rule_action, rule_action
+from business_rules.async_engine import run_all_async, check_conditions_recursively_async
+from business_rules.fields import FIELD_NUMERIC, FIELD_TEXT
+from business_rules.variables import BaseVariables, numeric_rule_variable, string_rule_variable
+from . import TestCase
+from .test_bulk import RULES as STOCK_RULES, StockActions, StockVariables
+
+
+def _run(coroutine):
+    """ asyncio.run, which only exists from Python 3.7. """
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coroutine)
+    finally:
+        loop.close()
+
+
+class RemoteVariables(BaseVariables):
+
+    def __init__(self, inventory=10, name='widget'):
+        self.inventory = inventory
+        self.name = name
+        self.fetches = []
+        self.running = 0
+        self.max_running = 0
+
+    async def _remote_call(self, name, value):
+        self.fetches.append(name)
+        self.running += 1
+        self.max_running = max(self.max_running, self.running)
+        await asyncio.sleep(0.01)
+        self.running -= 1
+        return value
+
+    @numeric_rule_variable
+    async def current_inventory(self):
+        return await self._remote_call('current_inventory', self.inventory)
+
+    @numeric_rule_variable(params={'extra': FIELD_NUMERIC})
+    async def inventory_plus(self, extra):
+        return await self._remote_call('inventory_plus', self.inventory + extra)
+
+    @string_rule_variable
+    def product_name(self):
+        self.fetches.append('product_name')
+        return self.name
+
+
+class RemoteActions(BaseActions):
+
+    def __init__(self):
+        self.calls = []
+
+    @rule_action(params={'number_to_order': FIELD_NUMERIC})
+    async def order_more(self, number_to_order):
+        await asyncio.sleep(0)
+        self.calls.append(('order_more', number_to_order))
+        return {'note': 'ordered'}
+
+    @rule_action(params={'note': FIELD_TEXT})
+    def log(self, note='none'):
+        self.calls.append(('log', note))
+
+
+RULES = [
+    {'conditions': {'all': [{'name': 'product_name', 'operator': 'equal_to', 'value': 'widget'},
+                            {'name': 'current_inventory', 'operator': 'less_than', 'value': 5},
+                            {'name': 'inventory_plus', 'operator': 'less_than', 'value': 20,
+                             'params': {'extra': 5}}]},
+     'actions': [{'name': 'order_more', 'params': {'number_to_order': 40}}, {'name': 'log'}]},
+    {'conditions': {'any': [{'name': 'current_inventory', 'operator': 'greater_than', 'value': 100},
+                            {'name': 'product_name', 'operator': 'starts_with', 'value': 'wid'}]},
+     'actions': [{'name': 'log', 'params': {'note': 'second'}}]},
+]
+
+
+class AsyncEngineTests(TestCase):
+
+    def test_run_all_async(self):
+        variables, actions = RemoteVariables(inventory=2), RemoteActions()
+        self.assertTrue(_run(run_all_async(RULES, variables, actions)))
+        self.assertEqual(actions.calls, [('order_more', 40), ('log', 'ordered'), ('log', 'second')])
+        self.assertEqual(variables.fetches, ['product_name', 'current_inventory', 'inventory_plus',
+                                             'current_inventory', 'product_name'])
+
+    def test_short_circuits(self):
+        variables = RemoteVariables(name='gadget')
+        self.assertFalse(_run(check_conditions_recursively_async(RULES[0]['conditions'], variables)))
+        self.assertEqual(variables.fetches, ['product_name'])
+
+    def test_cache_variables(self):
+        variables = RemoteVariables(inventory=2)
+        _run(run_all_async(RULES, variables, RemoteActions(), cache_variables=True))
+        self.assertEqual(variables.fetches, ['product_name', 'current_inventory', 'inventory_plus'])
+
+    def test_prefetch_fetches_siblings_concurrently(self):
+        variables, actions = RemoteVariables(inventory=2), RemoteActions()
+        self.assertTrue(_run(run_all_async(RULES, variables, actions, prefetch=True)))
+        self.assertEqual(sorted(variables.fetches), ['current_inventory', 'inventory_plus', 'product_name'])
+        self.assertEqual(variables.max_running, 2)
+        self.assertEqual(actions.calls, [('order_more', 40), ('log', 'ordered'), ('log', 'second')])
+
+    def test_prefetch_concurrency_limit(self):
+        variables = RemoteVariables(inventory=2)
+        _run(run_all_async(RULES, variables, RemoteActions(), prefetch=True, concurrency=1))
+        self.assertEqual(variables.max_running, 1)
+
+    def test_stop_on_first_trigger(self):
+        actions = RemoteActions()
+        self.assertTrue(_run(run_all_async(RULES, RemoteVariables(inventory=2), actions,
+                                           stop_on_first_trigger=True)))
+        self.assertEqual(actions.calls, [('order_more', 40), ('log', 'ordered')])
+
+    def test_unknown_variable(self):
+        conditions = {'name': 'food', 'operator': 'equal_to', 'value': 'm'}
+        with self.assertRaisesRegexp(AssertionError, 'Variable food is not defined in class RemoteVariables'):
+            _run(check_conditions_recursively_async(conditions, RemoteVariables()))
+
+
+class AsyncStockActions(StockActions):
+
+    @bulk_rule_action(params={'quantity': FIELD_NUMERIC})
+    async def order_more(cls, calls):
+        await asyncio.sleep(0)
+        cls.bulk_calls.append([(actions.product, params) for actions, params in calls])
+        return [{'order_id': 'async-{0}'.format(actions.product)} for actions, params in calls]
+
+
+class AsyncBulkActionTests(TestCase):
+
+    def setUp(self):
+        StockActions.bulk_calls = []
+
+    def test_bulk_action(self):
+        actions = StockActions('apple')
+        self.assertTrue(_run(run_all_async(STOCK_RULES, StockVariables(1), actions)))
+        self.assertEqual(StockActions.bulk_calls, [[('apple', {'quantity': 10})]])
+        self.assertEqual(actions.calls, [('notify', 'apple-10')])
+
+    def test_async_bulk_action(self):
+        actions = AsyncStockActions('pear')
+        self.assertTrue(_run(run_all_async(STOCK_RULES, StockVariables(0), actions)))
+        self.assertEqual(StockActions.bulk_calls, [[('pear', {'quantity': 10})]])
+        self.assertEqual(actions.calls, [('notify', 'async-pear'), ('flag',), ('notify', None)])
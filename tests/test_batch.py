@@ -0,0 +1,196 @@
+from datetime import datetime
+
+import numpy as np
+from mock import patch
+
+from business_rules import run_all
+from business_rules.actions import BaseActions
+from business_rules.batch import run_all_batch
+from business_rules.engine import check_conditions_recursively
+from business_rules.operators import SelectMultipleType, SelectType
+from business_rules.variables import (BaseVariables,
+                                      boolean_rule_variable,
+                                      date_rule_variable,
+                                      numeric_rule_variable,
+                                      select_multiple_rule_variable,
+                                      select_rule_variable,
+                                      string_rule_variable)
+from . import TestCase
+
+
+class RecordVariables(BaseVariables):
+
+    def __init__(self, record):
+        self.record = record
+
+    @numeric_rule_variable
+    def total(self):
+        return self.record['total']
+
+    @string_rule_variable
+    def state(self):
+        return self.record['state']
+
+    @boolean_rule_variable
+    def express(self):
+        return self.record['express']
+
+    @date_rule_variable()
+    def ordered_at(self):
+        return self.record['ordered_at']
+
+    @select_rule_variable()
+    def tags(self):
+        return self.record['tags']
+
+
+RECORDS = [
+    {'total': 10, 'state': 'CA', 'express': True, 'ordered_at': '2019-10-10', 'tags': ['gift']},
+    {'total': 10.000001, 'state': 'ny', 'express': False, 'ordered_at': '2019-10-11', 'tags': []},
+    {'total': 250.5, 'state': 'NY', 'express': True, 'ordered_at': '2020-01-01', 'tags': ['Fragile', 'gift']},
+    {'total': 0, 'state': None, 'express': False, 'ordered_at': '2018-05-05', 'tags': ['fragile']},
+]
+
+
+def _leaf(name, operator, value=''):
+    return {'name': name, 'operator': operator, 'value': value}
+
+
+RULES = [{'conditions': conditions, 'actions': []} for conditions in [
+    _leaf('total', 'equal_to', 10),
+    _leaf('total', 'greater_than', 10),
+    _leaf('total', 'less_than_or_equal_to', 10),
+    {'all': [_leaf('state', 'equal_to_case_insensitive', 'ny'), _leaf('express', 'is_true')]},
+    {'any': [_leaf('state', 'starts_with', 'C'), _leaf('ordered_at', 'greater_than', '2019-12-31')]},
+    {'any': [_leaf('state', 'non_empty'), _leaf('express', 'is_false')]},
+    _leaf('state', 'matches_regex', '^N'),
+    _leaf('ordered_at', 'less_than_or_equal_to', '2019-10-10'),
+    {'all': [_leaf('tags', 'contains', 'FRAGILE'), {'any': [_leaf('total', 'not_equal_to', 0),
+                                                            _leaf('tags', 'does_not_contain', 'gift')]}]},
+]]
+
+COLUMNS = {
+    'total': np.array([record['total'] for record in RECORDS]),
+    'state': np.array([record['state'] for record in RECORDS], dtype=object),
+    'express': np.array([record['express'] for record in RECORDS]),
+    'ordered_at': np.array([record['ordered_at'] for record in RECORDS], dtype='datetime64[us]'),
+    'tags': np.array([None] * len(RECORDS), dtype=object),
+}
+for i, record in enumerate(RECORDS):
+    COLUMNS['tags'][i] = record['tags']
+
+
+class RunAllBatchTests(TestCase):
+
+    def _expected(self):
+        return np.array([[check_conditions_recursively(rule['conditions'], RecordVariables(record))
+                          for record in RECORDS] for rule in RULES], dtype=bool)
+
+    def test_same_results_as_check_conditions(self):
+        result = run_all_batch(RULES, COLUMNS, RecordVariables)
+        self.assertEqual(result.shape, (len(RULES), len(RECORDS)))
+        np.testing.assert_array_equal(result, self._expected())
+
+    def test_infers_field_types(self):
+        np.testing.assert_array_equal(run_all_batch(RULES, COLUMNS), self._expected())
+
+    def test_any_row_matches_run_all(self):
+        result = run_all_batch(RULES, COLUMNS, RecordVariables)
+        for i, record in enumerate(RECORDS):
+            self.assertEqual(result[:, i].any(), run_all(RULES, RecordVariables(record), BaseActions()))
+
+    def test_columns_must_have_same_length(self):
+        with self.assertRaises(AssertionError):
+            run_all_batch(RULES, {'total': np.array([1, 2]), 'state': np.array(['a'])})
+
+    def test_missing_column(self):
+        with self.assertRaisesRegexp(AssertionError, 'No column was given for variable state'):
+            run_all_batch([{'conditions': _leaf('state', 'non_empty'), 'actions': []}],
+                          {'total': np.array([1, 2])}, RecordVariables)
+
+    def test_dates_with_datetime_objects(self):
+        rules = [{'conditions': _leaf('ordered_at', 'greater_than', datetime(2019, 10, 10, 12).isoformat()),
+                  'actions': []}]
+        result = run_all_batch(rules, COLUMNS, RecordVariables)
+        np.testing.assert_array_equal(result, [[False, True, True, False]])
+
+    def test_integers_are_compared_exactly(self):
+        class TotalVariables(BaseVariables):
+
+            def __init__(self, value):
+                self.value = value
+
+            @numeric_rule_variable
+            def total(self):
+                return self.value
+
+        operators = ['equal_to', 'not_equal_to', 'greater_than', 'greater_than_or_equal_to', 'less_than',
+                     'less_than_or_equal_to']
+        constants = [2 ** 60, 2 ** 60 + 1, -3, 10.5, 10.0000005, 2 ** 70, -2 ** 70]
+        rules = [{'conditions': _leaf('total', operator, constant), 'actions': []}
+                 for operator in operators for constant in constants]
+        for column in [np.array([2 ** 60, 2 ** 60 + 1, -3, 10, 11, 0]), np.array([0, 10, 11, 255], dtype=np.uint8)]:
+            expected = np.array([[check_conditions_recursively(rule['conditions'], TotalVariables(int(value)))
+                                  for value in column] for rule in rules], dtype=bool)
+            np.testing.assert_array_equal(run_all_batch(rules, {'total': column}, TotalVariables), expected)
+            np.testing.assert_array_equal(run_all_batch(rules, {'total': column}), expected)
+
+
+class TagVariables(BaseVariables):
+
+    def __init__(self, tags):
+        self.tags = tags
+
+    @select_rule_variable()
+    def tag(self):
+        return self.tags
+
+    @select_multiple_rule_variable()
+    def tag_set(self):
+        return self.tags
+
+
+TAGS = [['gift', 'Fragile'], [], ['GIFT'], ['fragile', 'bulky', 'gift'], [1, 'bulky']]
+
+TAG_RULES = [{'conditions': conditions, 'actions': []} for conditions in [
+    _leaf('tag', 'contains', 'Gift'),
+    _leaf('tag', 'does_not_contain', 'fragile'),
+    _leaf('tag', 'contains', 1),
+    _leaf('tag', 'contains', 'missing'),
+    _leaf('tag_set', 'contains_all', ['gift', 'FRAGILE']),
+    _leaf('tag_set', 'contains_all', ['gift', 'missing']),
+    _leaf('tag_set', 'contains_all', []),
+    _leaf('tag_set', 'is_contained_by', ['gift', 'fragile']),
+    _leaf('tag_set', 'shares_at_least_one_element_with', ['bulky', 'missing']),
+    _leaf('tag_set', 'shares_exactly_one_element_with', ['gift', 'bulky']),
+    _leaf('tag_set', 'shares_exactly_one_element_with', ['gift', 'GIFT']),
+    _leaf('tag_set', 'shares_no_elements_with', ['fragile', 1]),
+]]
+
+
+class SelectBatchTests(TestCase):
+
+    def _expected(self, tags):
+        return np.array([[check_conditions_recursively(rule['conditions'], TagVariables(value)) for value in tags]
+                         for rule in TAG_RULES], dtype=bool)
+
+    def test_select_operators_are_vectorized(self):
+        with patch.object(SelectType, '_folded_value', side_effect=AssertionError('not vectorized')), \
+                patch.object(SelectMultipleType, '_folded_value', side_effect=AssertionError('not vectorized')):
+            result = run_all_batch(TAG_RULES, {'tag': TAGS, 'tag_set': TAGS}, TagVariables)
+        np.testing.assert_array_equal(result, self._expected(TAGS))
+
+    def test_columns_of_sequences(self):
+        # lists of different lengths, of the same length, arrays, and an already 2-D array
+        same_length = [['gift', 'bulky'], ['Fragile', 'x'], ['a', 'b']]
+        for tags in [TAGS, same_length, [np.array(value) for value in same_length], np.array(same_length)]:
+            result = run_all_batch(TAG_RULES, {'tag': tags, 'tag_set': tags}, TagVariables)
+            np.testing.assert_array_equal(result, self._expected([list(value) for value in tags]))
+            np.testing.assert_array_equal(run_all_batch(TAG_RULES, {'tag': tags, 'tag_set': tags}), result)
+
+    def test_unhashable_items_fall_back_to_the_operators(self):
+        tags = [[{'a': 1}, 'gift'], ['fragile']]
+        rules = [{'conditions': _leaf('tag', 'contains', 'gift'), 'actions': []},
+                 {'conditions': _leaf('tag_set', 'shares_no_elements_with', ['fragile']), 'actions': []}]
+        np.testing.assert_array_equal(run_all_batch(rules, {'tag': tags, 'tag_set': tags}, TagVariables),
+                                      [[True, False], [True, False]])
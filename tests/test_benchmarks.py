@@ -0,0 +1,31 @@
+from benchmarks.generators import SyntheticActions, generate_objects, generate_rules, make_variables_cls
+from benchmarks.results import compare
+from business_rules import compile_rules, run_all
+from . import TestCase
+
+
+class BenchmarkTests(TestCase):
+
+    def test_generated_rules_are_valid(self):
+        rules = generate_rules(50, depth=2, fanout=3, any_ratio=0.3)
+        self.assertEqual(len(rules), 50)
+        self.assertEqual(generate_rules(50, depth=2, fanout=3, any_ratio=0.3), rules)
+
+        variables_cls = make_variables_cls()
+        compiled = compile_rules(rules, variables_cls, SyntheticActions)
+        for record in generate_objects(5):
+            actions, compiled_actions = SyntheticActions(), SyntheticActions()
+            run_all(rules, variables_cls(record), actions)
+            compiled.run_all(variables_cls(record), compiled_actions)
+            self.assertEqual(compiled_actions.calls, actions.calls)
+
+    def test_type_weights(self):
+        rules = generate_rules(20, depth=0, type_weights={'boolean': 1})
+        self.assertEqual(set(rule['conditions']['operator'] for rule in rules), {'is_true', 'is_false'})
+
+    def test_compare(self):
+        old = {'results': {'a': 10.0, 'b': 10.0, 'c': 10.0, 'removed': 1.0}}
+        new = {'results': {'a': 20.0, 'b': 5.0, 'c': 10.5, 'added': 1.0}}
+        self.assertEqual([(row[0], row[4]) for row in compare(old, new, threshold=0.1)],
+                         [('a', 'slower'), ('added', 'added'), ('b', 'faster'), ('c', 'same'),
+                          ('removed', 'removed')])
@@ -0,0 +1,100 @@
+from business_rules import run_all
+from business_rules.actions import BaseActions, bulk_rule_action, rule_action
+from business_rules.bulk import ActionQueue, run_all_bulk
+from business_rules.fields import FIELD_NUMERIC
+from business_rules.variables import BaseVariables, numeric_rule_variable
+from . import TestCase
+
+
+class StockVariables(BaseVariables):
+
+    def __init__(self, stock):
+        self.stock = stock
+
+    @numeric_rule_variable
+    def current_stock(self):
+        return self.stock
+
+
+class StockActions(BaseActions):
+    bulk_calls = []
+
+    def __init__(self, product):
+        self.product = product
+        self.calls = []
+
+    @bulk_rule_action(params={'quantity': FIELD_NUMERIC})
+    def order_more(cls, calls):
+        """ Orders more of many products at once. """
+        cls.bulk_calls.append([(actions.product, params) for actions, params in calls])
+        return [{'order_id': '{0}-{1}'.format(actions.product, params['quantity'])} for actions, params in calls]
+
+    @rule_action(params={'order_id': FIELD_NUMERIC})
+    def notify(self, order_id=None):
+        self.calls.append(('notify', order_id))
+
+    @rule_action()
+    def flag(self):
+        self.calls.append(('flag',))
+
+
+RULES = [
+    {'conditions': {'name': 'current_stock', 'operator': 'less_than', 'value': 5},
+     'actions': [{'name': 'order_more', 'params': {'quantity': 10}}, {'name': 'notify'}]},
+    {'conditions': {'name': 'current_stock', 'operator': 'equal_to', 'value': 0},
+     'actions': [{'name': 'flag'}, {'name': 'notify'}]},
+]
+
+
+class BulkActionTests(TestCase):
+
+    def setUp(self):
+        StockActions.bulk_calls = []
+
+    def test_bulk_rule_action_is_exported(self):
+        action = [action for action in StockActions.get_all_actions() if action['name'] == 'order_more'][0]
+        self.assertEqual(action['params'], [{'label': 'Quantity', 'name': 'quantity', 'fieldType': FIELD_NUMERIC}])
+        self.assertEqual(action['tooltip'], 'Orders more of many products at once.')
+
+    def test_run_all_calls_bulk_actions_one_object_at_a_time(self):
+        actions = StockActions('apple')
+        self.assertTrue(run_all(RULES, StockVariables(1), actions))
+        self.assertEqual(StockActions.bulk_calls, [[('apple', {'quantity': 10})]])
+        self.assertEqual(actions.calls, [('notify', 'apple-10')])
+
+    def test_run_all_bulk_groups_calls(self):
+        actions = [StockActions(name) for name in ['apple', 'pear', 'plum']]
+        results = run_all_bulk(RULES, [(StockVariables(1), actions[0]),
+                                       (StockVariables(7), actions[1]),
+                                       (StockVariables(0), actions[2])])
+        self.assertEqual(results, [True, False, True])
+        self.assertEqual(StockActions.bulk_calls, [[('apple', {'quantity': 10}), ('plum', {'quantity': 10})]])
+        # returned values are chained per object, and reset between the rules of an object
+        self.assertEqual(actions[0].calls, [('notify', 'apple-10')])
+        self.assertEqual(actions[1].calls, [])
+        self.assertEqual(actions[2].calls, [('notify', 'plum-10'), ('flag',), ('notify', None)])
+
+    def test_same_results_as_run_all(self):
+        stocks = [0, 1, 4, 5, 9]
+        for stop_on_first_trigger in (False, True):
+            expected_actions = [StockActions(stock) for stock in stocks]
+            expected = [run_all(RULES, StockVariables(stock), actions, stop_on_first_trigger=stop_on_first_trigger)
+                        for stock, actions in zip(stocks, expected_actions)]
+            bulk_actions = [StockActions(stock) for stock in stocks]
+            self.assertEqual(run_all_bulk(RULES, [(StockVariables(stock), actions)
+                                                  for stock, actions in zip(stocks, bulk_actions)],
+                                          stop_on_first_trigger=stop_on_first_trigger,
+                                          cache_variables=True), expected)
+            self.assertEqual([actions.calls for actions in bulk_actions],
+                             [actions.calls for actions in expected_actions])
+
+    def test_queue(self):
+        queue = ActionQueue()
+        actions = StockActions('apple')
+        queue.add([{'name': 'flag'}], actions)
+        self.assertEqual(len(queue), 1)
+        with self.assertRaisesRegexp(AssertionError, 'Action fakeone is not defined in class StockActions'):
+            queue.add([{'name': 'fakeone'}], actions)
+        queue.flush()
+        self.assertEqual(len(queue), 0)
+        self.assertEqual(actions.calls, [('flag',)])
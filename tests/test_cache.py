@@ -0,0 +1,93 @@
+import json
+import os
+import shutil
+import tempfile
+
+from mock import patch
+
+from business_rules import cache, run_all
+from business_rules.cache import cache_key, compile_rules_cached
+from business_rules.operators import NumericType
+from business_rules.variables import numeric_rule_variable
+from . import TestCase
+from .test_compiler import RULES, ProductActions, ProductVariables
+
+
+class CacheTests(TestCase):
+
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.cache_dir)
+
+    def compile(self, rules=RULES, variables_cls=ProductVariables, actions_cls=ProductActions, **kwargs):
+        with patch.object(cache, 'compile_rules', wraps=cache.compile_rules) as compile_rules:
+            compiled = compile_rules_cached(rules, variables_cls, actions_cls, self.cache_dir, **kwargs)
+        return compiled, compile_rules.called
+
+    def assert_same_behavior(self, compiled):
+        for variables in [ProductVariables(), ProductVariables(inventory=2), ProductVariables(name='gadget')]:
+            expected_actions, compiled_actions = ProductActions(), ProductActions()
+            expected = compiled.run_all(variables, compiled_actions)
+            self.assertEqual(run_all(RULES, variables, expected_actions), expected)
+            self.assertEqual(compiled_actions.calls, expected_actions.calls)
+
+    def test_warm_start_loads_the_cached_rules(self):
+        for rules in [RULES, json.dumps(RULES)]:
+            compiled, compiled_now = self.compile(rules)
+            self.assertTrue(compiled_now)
+
+            cached, compiled_now = self.compile(rules)
+            self.assertFalse(compiled_now)
+            self.assertEqual([rule.conditions for rule in cached], [rule.conditions for rule in compiled])
+            self.assert_same_behavior(cached)
+        self.assertEqual(len(os.listdir(self.cache_dir)), 2)
+        # a str and its utf-8 encoding share their cache file
+        self.assertFalse(self.compile(json.dumps(RULES).encode('utf-8'))[1])
+
+    def test_options_and_rules_are_part_of_the_key(self):
+        self.compile()
+        self.assertTrue(self.compile(native_numbers=True)[1])
+        self.assertTrue(self.compile(RULES[:1])[1])
+        self.assertFalse(self.compile(native_numbers=True)[1])
+
+    def test_without_actions_cls(self):
+        self.assertTrue(self.compile(actions_cls=None)[1])
+        cached, compiled_now = self.compile(actions_cls=None)
+        self.assertFalse(compiled_now)
+        self.assertIsNone(cached.actions_cls)
+        self.assert_same_behavior(cached)
+        # the actions class is part of the key
+        self.assertTrue(self.compile()[1])
+
+    def test_changed_variables_invalidate_the_cache(self):
+        self.compile()
+
+        class MoreProductVariables(ProductVariables):
+
+            @numeric_rule_variable(params={'extra': 'numeric'})
+            def inventory_plus(self, extra, unused=None):
+                return self.inventory + extra
+
+        self.assertTrue(self.compile(variables_cls=MoreProductVariables)[1])
+
+    def test_changed_operator_invalidates_the_cache(self):
+        key = cache_key(b'[]', ProductVariables, ProductActions)
+        self.assertEqual(cache_key(b'[]', ProductVariables, ProductActions), key)
+
+        def less_than(self, other_numeric):
+            return self.value < other_numeric
+
+        with patch.object(NumericType, 'less_than', less_than):
+            self.assertNotEqual(cache_key(b'[]', ProductVariables, ProductActions), key)
+        with patch.object(NumericType, 'EPSILON', NumericType.EPSILON * 10):
+            self.assertNotEqual(cache_key(b'[]', ProductVariables, ProductActions), key)
+
+    def test_corrupt_file_is_replaced(self):
+        self.compile()
+        path = os.path.join(self.cache_dir, os.listdir(self.cache_dir)[0])
+        with open(path, 'wb') as cache_file:
+            cache_file.write(b'not a pickle')
+        compiled, compiled_now = self.compile()
+        self.assertTrue(compiled_now)
+        self.assertFalse(self.compile()[1])
+        self.assertEqual(os.listdir(self.cache_dir), [os.path.basename(path)])
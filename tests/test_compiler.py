@@ -0,0 +1,211 @@
+from datetime import datetime, timezone
+from decimal import Decimal
+
+from mock import patch
+
+from business_rules import compile_rules, run_all
+from business_rules.actions import BaseActions, rule_action
+from business_rules.compiler import ConditionGroup, ConditionLeaf
+from business_rules.fields import FIELD_NUMERIC
+from business_rules.operators import BooleanType, DateType, EpochDateType, NativeNumericType, NumericType
+from business_rules.variables import (BaseVariables,
+                                      boolean_rule_variable,
+                                      date_rule_variable,
+                                      numeric_rule_variable,
+                                      string_rule_variable)
+from . import TestCase
+
+
+class ProductVariables(BaseVariables):
+
+    def __init__(self, inventory=10, name='widget', on_sale=False):
+        self.inventory = inventory
+        self.name = name
+        self.on_sale = on_sale
+
+    @numeric_rule_variable
+    def current_inventory(self):
+        return self.inventory
+
+    @numeric_rule_variable(params={'extra': FIELD_NUMERIC})
+    def inventory_plus(self, extra):
+        return self.inventory + extra
+
+    @string_rule_variable
+    def product_name(self):
+        return self.name
+
+    @boolean_rule_variable
+    def is_on_sale(self):
+        return self.on_sale
+
+    @date_rule_variable()
+    def expiration_date(self):
+        return '2019-10-10'
+
+
+class ProductActions(BaseActions):
+
+    def __init__(self):
+        self.calls = []
+
+    @rule_action(params={'number_to_order': FIELD_NUMERIC})
+    def order_more(self, number_to_order):
+        self.calls.append(('order_more', number_to_order))
+
+    @rule_action()
+    def put_on_sale(self):
+        self.calls.append(('put_on_sale',))
+
+
+RULES = [
+    {'conditions': {'all': [{'name': 'current_inventory', 'operator': 'less_than', 'value': 5},
+                            {'name': 'is_on_sale', 'operator': 'is_false', 'value': ''}]},
+     'actions': [{'name': 'put_on_sale'}]},
+    {'conditions': {'any': [{'name': 'product_name', 'operator': 'equal_to', 'value': 'gadget'},
+                            {'all': [{'name': 'inventory_plus', 'operator': 'less_than', 'value': 20,
+                                      'params': {'extra': 5}},
+                                     {'name': 'product_name', 'operator': 'starts_with', 'value': 'wid'}]}]},
+     'actions': [{'name': 'order_more', 'params': {'number_to_order': 40}}]},
+]
+
+
+class CompileRulesTests(TestCase):
+
+    def test_prepare_builds_condition_tree(self):
+        compiled = compile_rules(RULES, ProductVariables, ProductActions)
+        self.assertEqual(len(compiled), 2)
+        self.assertEqual(
+            compiled.rules[0].conditions,
+            ConditionGroup('all', (ConditionLeaf('current_inventory', 'less_than', 5, {}, NumericType),
+                                   ConditionLeaf('is_on_sale', 'is_false', '', {}, BooleanType))))
+
+    def test_same_results_as_run_all(self):
+        compiled = compile_rules(RULES, ProductVariables, ProductActions)
+        for variables in [ProductVariables(), ProductVariables(inventory=2), ProductVariables(name='gadget'),
+                          ProductVariables(inventory=2, on_sale=True), ProductVariables(inventory=50)]:
+            expected_actions, compiled_actions = ProductActions(), ProductActions()
+            expected = run_all(RULES, variables, expected_actions)
+            self.assertEqual(compiled.run_all(variables, compiled_actions), expected)
+            self.assertEqual(compiled_actions.calls, expected_actions.calls)
+
+    def test_subclass_overriding_a_variable(self):
+        class GadgetVariables(ProductVariables):
+
+            @string_rule_variable
+            def product_name(self):
+                return 'gadget'
+
+        compiled = compile_rules(RULES, ProductVariables, ProductActions)
+        for cache_variables in [False, True]:
+            expected_actions, compiled_actions = ProductActions(), ProductActions()
+            run_all(RULES, GadgetVariables(inventory=50), expected_actions)
+            self.assertTrue(compiled.run_all(GadgetVariables(inventory=50), compiled_actions,
+                                             cache_variables=cache_variables))
+            self.assertEqual(compiled_actions.calls, expected_actions.calls)
+
+    def test_stop_on_first_trigger(self):
+        compiled = compile_rules(RULES, ProductVariables, ProductActions)
+        actions = ProductActions()
+        self.assertTrue(compiled.run_all(ProductVariables(inventory=2), actions, stop_on_first_trigger=True))
+        self.assertEqual(actions.calls, [('put_on_sale',)])
+
+    def test_any_short_circuits(self):
+        compiled = compile_rules(RULES, ProductVariables, ProductActions)
+        # inventory_plus would raise a TypeError if it was evaluated
+        variables = ProductVariables(inventory=None, name='gadget')
+        self.assertTrue(compiled.rules[1].check(variables))
+
+    def test_cache_variables_shares_values_between_rules(self):
+        variables = ProductVariables(inventory=2)
+        fetches = []
+        original = ProductVariables.product_name
+
+        def counting_product_name(self):
+            fetches.append(self)
+            return original(self)
+
+        counting_product_name.__dict__.update(original.__dict__)
+        with patch.object(ProductVariables, 'product_name', counting_product_name):
+            compiled = compile_rules(RULES, ProductVariables, ProductActions)
+            compiled.run_all(variables, ProductActions(), cache_variables=True)
+            self.assertEqual(len(fetches), 1)
+            compiled.run_all(variables, ProductActions())
+            self.assertEqual(len(fetches), 3)
+
+    def test_constants_are_cast_once(self):
+        rules = [{'conditions': {'all': [{'name': 'current_inventory', 'operator': 'greater_than', 'value': 1.5},
+                                         {'name': 'expiration_date', 'operator': 'less_than', 'value': '2019-11-01'}]},
+                  'actions': []}]
+        compiled = compile_rules(rules, ProductVariables, ProductActions)
+        inventory_leaf, date_leaf = compiled.rules[0].conditions.children
+        self.assertEqual(inventory_leaf.value, Decimal('1.5'))
+        self.assertEqual(date_leaf.value, datetime(2019, 11, 1))
+
+        casts = []
+        cast = DateType._assert_valid_value_and_cast
+
+        def counting_cast(self, value):
+            casts.append(value)
+            return cast(self, value)
+
+        # a plain function rather than autospec=True with wraps=, which older mock releases don't combine
+        with patch.object(DateType, '_assert_valid_value_and_cast', counting_cast):
+            for _ in range(3):
+                self.assertTrue(compiled.rules[0].check(ProductVariables()))
+        # only the variable value is cast, once per evaluation
+        self.assertEqual(casts, ['2019-10-10'] * 3)
+
+    def test_native_numbers(self):
+        compiled = compile_rules(RULES, ProductVariables, ProductActions, native_numbers=True)
+        leaf = compiled.rules[0].conditions.children[0]
+        self.assertEqual(leaf.field_type, NativeNumericType)
+        self.assertIsInstance(leaf.value, int)
+        for variables in [ProductVariables(), ProductVariables(inventory=2), ProductVariables(inventory=2.5)]:
+            expected_actions, compiled_actions = ProductActions(), ProductActions()
+            expected = run_all(RULES, variables, expected_actions, cache_variables=True)
+            self.assertEqual(compiled.run_all(variables, compiled_actions, cache_variables=True), expected)
+            self.assertEqual(compiled_actions.calls, expected_actions.calls)
+
+    def test_epoch_dates(self):
+        rules = [{'conditions': {'name': 'expiration_date', 'operator': 'less_than', 'value': '2019-11-01'},
+                  'actions': [{'name': 'put_on_sale'}]}]
+        compiled = compile_rules(rules, ProductVariables, ProductActions, epoch_dates=True)
+        leaf = compiled.rules[0].conditions
+        self.assertEqual(leaf.field_type, EpochDateType)
+        self.assertEqual(leaf.value, datetime(2019, 11, 1, tzinfo=timezone.utc).timestamp())
+        actions = ProductActions()
+        self.assertTrue(compiled.run_all(ProductVariables(), actions))
+        self.assertEqual(actions.calls, [('put_on_sale',)])
+
+    def test_invalid_constant_fails_at_compile_time(self):
+        rules = [{'conditions': {'name': 'current_inventory', 'operator': 'greater_than', 'value': 'lots'},
+                  'actions': []}]
+        with self.assertRaisesRegexp(AssertionError, 'lots is not a valid numeric type'):
+            compile_rules(rules, ProductVariables, ProductActions)
+
+    def test_unknown_variable_fails_at_compile_time(self):
+        rules = [{'conditions': {'name': 'food', 'operator': 'equal_to', 'value': 'm'}, 'actions': []}]
+        with self.assertRaisesRegexp(AssertionError, 'Variable food is not defined in class ProductVariables'):
+            compile_rules(rules, ProductVariables, ProductActions)
+
+    def test_unknown_operator_fails_at_compile_time(self):
+        rules = [{'conditions': {'name': 'product_name', 'operator': 'equal_tooooze', 'value': 'm'}, 'actions': []}]
+        with self.assertRaisesRegexp(AssertionError, 'Operator equal_tooooze does not exist for type StringType'):
+            compile_rules(rules, ProductVariables, ProductActions)
+
+    def test_unknown_action_fails_at_compile_time(self):
+        rules = [{'conditions': {'name': 'product_name', 'operator': 'non_empty', 'value': ''},
+                  'actions': [{'name': 'fakeone'}]}]
+        with self.assertRaisesRegexp(AssertionError, 'Action fakeone is not defined in class ProductActions'):
+            compile_rules(rules, ProductVariables, ProductActions)
+
+    def test_empty_all_fails_at_compile_time(self):
+        with self.assertRaises(AssertionError):
+            compile_rules([{'conditions': {'all': []}, 'actions': []}], ProductVariables, ProductActions)
+
+    def test_all_and_any_together_fails_at_compile_time(self):
+        conditions = {'all': [{'name': 'is_on_sale', 'operator': 'is_true', 'value': ''}],
+                      'any': [{'name': 'is_on_sale', 'operator': 'is_true', 'value': ''}]}
+        with self.assertRaises(AssertionError):
+            compile_rules([{'conditions': conditions, 'actions': []}], ProductVariables, ProductActions)
@@ -2,8 +2,9 @@ from mock import patch, MagicMock
 
 from business_rules import engine
 from business_rules.actions import BaseActions
+from business_rules.fields import FIELD_NUMERIC
 from business_rules.operators import StringType
-from business_rules.variables import BaseVariables
+from business_rules.variables import BaseVariables, numeric_rule_variable
 from . import TestCase
 
 
@@ -216,3 +217,44 @@ class EngineTests(TestCase):
         defined_actions.action3.assert_called_once_with(param1='baz')
         # action result overrides params of the following action
         defined_actions.action4.assert_called_once_with(param1='new')
+
+    ###
+    ### Variable caching
+    ###
+
+    def test_run_all_caches_variables_across_rules(self):
+        fetches = []
+
+        class CountingVariables(BaseVariables):
+
+            @numeric_rule_variable(params={'limit': FIELD_NUMERIC})
+            def inventory(self, limit):
+                fetches.append(('inventory', limit))
+                return 10
+
+            @numeric_rule_variable(cache=False)
+            def clock(self):
+                fetches.append(('clock',))
+                return 1
+
+        rules = [{'conditions': {'all': [{'name': 'inventory', 'operator': 'greater_than', 'value': 5,
+                                          'params': {'limit': 1}},
+                                         {'name': 'clock', 'operator': 'equal_to', 'value': 1}]},
+                  'actions': []}] * 3
+        rules.append({'conditions': {'name': 'inventory', 'operator': 'greater_than', 'value': 5,
+                                     'params': {'limit': 2}},
+                      'actions': []})
+
+        self.assertTrue(engine.run_all(rules, CountingVariables(), BaseActions(), cache_variables=True))
+        self.assertEqual(fetches, [('inventory', 1), ('clock',), ('clock',), ('clock',), ('inventory', 2)])
+
+        del fetches[:]
+        engine.run_all(rules, CountingVariables(), BaseActions())
+        self.assertEqual(len(fetches), 7)
+
+    def test_evaluation_context_forwards_attributes(self):
+        variables = BaseVariables()
+        variables.product = 'widget'
+        context = engine.EvaluationContext(variables)
+        self.assertEqual(context.product, 'widget')
+        self.assertIs(context.defined_variables, variables)
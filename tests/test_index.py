@@ -0,0 +1,243 @@
+from itertools import product
+
+from business_rules import run_all
+from business_rules.actions import BaseActions, rule_action
+from business_rules.fields import FIELD_TEXT
+from business_rules.index import build_index
+from business_rules.variables import (BaseVariables,
+                                      boolean_rule_variable,
+                                      date_rule_variable,
+                                      numeric_rule_variable,
+                                      select_rule_variable,
+                                      string_rule_variable)
+from . import TestCase
+
+
+class OrderVariables(BaseVariables):
+
+    def __init__(self, state='CA', tags=(), express=False, total=10):
+        self.state = state
+        self.tags = list(tags)
+        self.express = express
+        self.total = total
+        self.fetches = []
+
+    @string_rule_variable
+    def current_state(self):
+        self.fetches.append('current_state')
+        return self.state
+
+    @select_rule_variable()
+    def order_tags(self):
+        self.fetches.append('order_tags')
+        return self.tags
+
+    @boolean_rule_variable
+    def is_express(self):
+        self.fetches.append('is_express')
+        return self.express
+
+    @numeric_rule_variable
+    def order_total(self):
+        self.fetches.append('order_total')
+        return self.total
+
+    @string_rule_variable(params={'field': FIELD_TEXT})
+    def address_field(self, field):
+        return field
+
+
+class OrderActions(BaseActions):
+
+    def __init__(self):
+        self.calls = []
+
+    @rule_action(params={'rule': FIELD_TEXT})
+    def record(self, rule):
+        self.calls.append(rule)
+
+
+def _rule(name, conditions):
+    return {'conditions': conditions, 'actions': [{'name': 'record', 'params': {'rule': name}}]}
+
+
+RULES = [
+    _rule('ca', {'name': 'current_state', 'operator': 'equal_to', 'value': 'CA'}),
+    _rule('ny big', {'all': [{'name': 'order_total', 'operator': 'greater_than', 'value': 100},
+                             {'name': 'current_state', 'operator': 'equal_to', 'value': 'NY'}]}),
+    _rule('gift', {'all': [{'name': 'order_tags', 'operator': 'contains', 'value': 'Gift'}]}),
+    _rule('express', {'any': [{'all': [{'name': 'is_express', 'operator': 'is_true', 'value': ''}]}]}),
+    _rule('not express', {'name': 'is_express', 'operator': 'is_false', 'value': ''}),
+    _rule('ca or big', {'any': [{'name': 'current_state', 'operator': 'equal_to', 'value': 'CA'},
+                                {'name': 'order_total', 'operator': 'greater_than', 'value': 100}]}),
+    _rule('params', {'name': 'address_field', 'operator': 'equal_to', 'value': 'zip', 'params': {'field': 'zip'}}),
+]
+
+
+class StateActions(OrderActions):
+    """ Changes the state of the variables, which the rules after the one that fired have to see. """
+
+    def __init__(self, variables):
+        super(StateActions, self).__init__()
+        self.variables = variables
+
+    @rule_action(params={'state': FIELD_TEXT})
+    def set_state(self, state):
+        self.calls.append(state)
+        self.variables.state = state
+
+
+STATE_RULES = [{'conditions': {'name': 'current_state', 'operator': 'equal_to', 'value': state},
+                'actions': [{'name': 'set_state', 'params': {'state': next_state}}]}
+               for state, next_state in [('a', 'b'), ('b', 'c'), ('a', 'd'), ('c', 'e')]]
+
+
+class IndexedRuleSetTests(TestCase):
+
+    def test_gates(self):
+        index = build_index(RULES, OrderVariables, OrderActions)
+        self.assertEqual(index.ungated_rules, [5])
+        self.assertEqual(index.gates[('current_state', ())].rules, {'CA': [0], 'NY': [1]})
+        self.assertEqual(index.gates[('order_tags', ())].rules, {'gift': [2]})
+        self.assertEqual(index.gates[('is_express', ())].rules, {True: [3], False: [4]})
+        self.assertEqual(index.gates[('address_field', (('field', 'zip'),))].rules, {'zip': [6]})
+
+    def test_candidate_rules(self):
+        index = build_index(RULES, OrderVariables, OrderActions)
+        self.assertEqual(index.candidate_rules(OrderVariables(state='NY', tags=['GIFT', 'fragile'])),
+                         [1, 2, 4, 5, 6])
+        self.assertEqual(index.candidate_rules(OrderVariables(state='TX', express=True)), [3, 5, 6])
+
+    def test_same_results_as_run_all(self):
+        index = build_index(RULES, OrderVariables, OrderActions)
+        for kwargs in [{}, {'state': 'NY'}, {'state': 'NY', 'total': 500}, {'tags': ['gift']},
+                       {'tags': [{'unhashable': True}, 'Gift']}, {'express': True, 'state': 'TX', 'total': 101}]:
+            expected_actions, indexed_actions = OrderActions(), OrderActions()
+            expected = run_all(RULES, OrderVariables(**kwargs), expected_actions)
+            self.assertEqual(index.run_all(OrderVariables(**kwargs), indexed_actions), expected)
+            self.assertEqual(indexed_actions.calls, expected_actions.calls)
+
+    def test_gate_variables_fetched_once(self):
+        index = build_index(RULES[:3] + [RULES[5]], OrderVariables, OrderActions)
+        variables = OrderVariables(state='TX', total=50)
+        self.assertFalse(index.run_all(variables, OrderActions()))
+        self.assertEqual(sorted(variables.fetches), ['current_state', 'order_tags', 'order_total'])
+
+    def test_actions_changing_the_variables(self):
+        index = build_index(STATE_RULES, OrderVariables, StateActions)
+        for run in [lambda variables, actions: run_all(STATE_RULES, variables, actions), index.run_all]:
+            variables = OrderVariables(state='a')
+            actions = StateActions(variables)
+            self.assertTrue(run(variables, actions))
+            self.assertEqual(actions.calls, ['b', 'c', 'e'])
+
+    def test_stop_on_first_trigger(self):
+        index = build_index(RULES, OrderVariables, OrderActions)
+        actions = OrderActions()
+        self.assertTrue(index.run_all(OrderVariables(state='NY', tags=['gift']), actions, stop_on_first_trigger=True))
+        self.assertEqual(actions.calls, ['gift'])
+
+
+class ThresholdIndexTests(TestCase):
+
+    THRESHOLDS = [1, 5, 10, 10.000001, 10.000002, 9.999999, 20, 100.5]
+
+    def _rules(self, operator):
+        return [_rule('{} {}'.format(operator, threshold),
+                      {'name': 'order_total', 'operator': operator, 'value': threshold})
+                for threshold in self.THRESHOLDS]
+
+    def test_threshold_gates_match_run_all(self):
+        for operator, native_numbers in product(['greater_than', 'greater_than_or_equal_to', 'less_than',
+                                                 'less_than_or_equal_to'], [False, True]):
+            rules = self._rules(operator)
+            index = build_index(rules, OrderVariables, OrderActions, native_numbers=native_numbers)
+            self.assertEqual(index.ungated_rules, [])
+            for total in [0, 1, 5, 9.999999, 10, 10.000001, 10.000002, 10.5, 100.5, 1000]:
+                expected_actions, indexed_actions = OrderActions(), OrderActions()
+                run_all(rules, OrderVariables(total=total), expected_actions)
+                index.run_all(OrderVariables(total=total), indexed_actions)
+                self.assertEqual(indexed_actions.calls, expected_actions.calls, (operator, total))
+
+    def test_equality_gate_is_preferred(self):
+        rules = [_rule('ny big', {'all': [{'name': 'order_total', 'operator': 'greater_than', 'value': 100},
+                                          {'name': 'current_state', 'operator': 'equal_to', 'value': 'NY'}]}),
+                 _rule('big', {'all': [{'name': 'order_total', 'operator': 'greater_than', 'value': 100},
+                                       {'name': 'order_total', 'operator': 'less_than', 'value': 1000}]})]
+        index = build_index(rules, OrderVariables, OrderActions)
+        self.assertEqual(index.gates[('current_state', ())].rules, {'NY': [0]})
+        self.assertEqual(index.gates[('order_total', (), 'greater_than')].rule_indices, [1])
+        self.assertEqual(index.candidate_rules(OrderVariables(state='NY', total=50)), [0])
+        self.assertEqual(index.candidate_rules(OrderVariables(state='CA', total=500)), [1])
+
+
+class LateVariables(BaseVariables):
+    """ express and total are only known for the state 'y', like a variable guarded by an earlier condition. """
+
+    def __init__(self, state, express=True, total=20):
+        self.state = state
+        self.express = express
+        self.total = total
+
+    @string_rule_variable
+    def current_state(self):
+        return self.state
+
+    @boolean_rule_variable
+    def is_express(self):
+        return self.express if self.state == 'y' else None
+
+    @numeric_rule_variable
+    def order_total(self):
+        return self.total if self.state == 'y' else None
+
+
+class FailingGateTests(TestCase):
+
+    def _assert_same_as_run_all(self, second_condition):
+        rules = [_rule('late', {'all': [{'name': 'current_state', 'operator': 'starts_with', 'value': 'y'},
+                                        second_condition]})]
+        index = build_index(rules, LateVariables, OrderActions)
+        self.assertEqual(index.ungated_rules, [])
+        for state in ['n', 'y']:
+            expected_actions, indexed_actions = OrderActions(), OrderActions()
+            self.assertEqual(index.run_all(LateVariables(state), indexed_actions),
+                             run_all(rules, LateVariables(state), expected_actions))
+            self.assertEqual(indexed_actions.calls, expected_actions.calls)
+        self.assertEqual(index.candidate_rules(LateVariables('n')), [0])
+        self.assertEqual(index.candidate_rules(LateVariables('y', express=False, total=0)), [])
+
+    def test_equality_gate(self):
+        self._assert_same_as_run_all({'name': 'is_express', 'operator': 'is_true', 'value': ''})
+
+    def test_threshold_gate(self):
+        self._assert_same_as_run_all({'name': 'order_total', 'operator': 'greater_than', 'value': 10})
+
+
+class ShipVariables(BaseVariables):
+
+    def __init__(self, shipped_at):
+        self.shipped_at = shipped_at
+
+    @date_rule_variable()
+    def shipped(self):
+        return self.shipped_at
+
+
+class UpdatedIndexTests(TestCase):
+
+    def test_incomparable_constant_ungates_the_gate(self):
+        def rule(name, value):
+            return _rule(name, {'name': 'shipped', 'operator': 'greater_than', 'value': value})
+
+        rules = [rule('2019', '2019-01-01'), rule('2020', '2020-01-01')]
+        index = build_index(rules, ShipVariables, OrderActions)
+        aware = build_index([rule('aware', '2019-06-01T00:00:00+00:00')], ShipVariables, OrderActions).rules[0]
+        updated = index.updated({0: index.rules[0], 1: index.rules[1], 2: aware}, added=[2])
+        self.assertEqual(updated.gates, {})
+        self.assertEqual(updated.ungated_rules, [0, 1, 2])
+        self.assertEqual(index.candidate_rules(ShipVariables('2019-06-01')), [0])
+
+        removed = index.updated({1: index.rules[1]}, removed=[0])
+        self.assertEqual(removed.gates[('shipped', (), 'greater_than')].rule_indices, [1])
+        self.assertEqual(index.gates[('shipped', (), 'greater_than')].rule_indices, [0, 1])
@@ -1,4 +1,6 @@
-from business_rules import export_rule_data
+from mock import patch
+
+from business_rules import export_rule_data, rule_data_etag
 from business_rules.actions import rule_action, BaseActions
 from business_rules.engine import check_condition
 from business_rules.fields import FIELD_TEXT, FIELD_NUMERIC, FIELD_SELECT
@@ -380,3 +382,24 @@ class IntegrationTests(TestCase):
                 ]
             }
         )
+
+    def test_export_rule_data_is_computed_once(self):
+        """ The data is cached per variables and actions classes, for classes and instances alike. """
+        with patch('business_rules.variables.inspect.getmembers') as getmembers:
+            all_data = export_rule_data(SomeVariables, SomeActions)
+            self.assertIs(export_rule_data(SomeVariables(), SomeActions()), all_data)
+            self.assertFalse(getmembers.called)
+
+    def test_rule_data_etag(self):
+        etag = rule_data_etag(SomeVariables, SomeActions)
+        self.assertEqual(len(etag), 64)
+        self.assertEqual(rule_data_etag(SomeVariables(), SomeActions()), etag)
+
+        class OtherActions(BaseActions):
+
+            @rule_action()
+            def some_action(self):
+                pass
+
+        self.assertNotEqual(rule_data_etag(SomeVariables, OtherActions), etag)
+        self.assertEqual(export_rule_data(SomeVariables, OtherActions)['actions'][0]['name'], 'some_action')
@@ -0,0 +1,126 @@
+from business_rules import run_all
+from business_rules.actions import BaseActions, rule_action
+from business_rules.network import build_network
+from business_rules.variables import BaseVariables, numeric_rule_variable, string_rule_variable
+from . import TestCase
+from .test_compiler import RULES, ProductActions, ProductVariables
+
+
+class CountingVariables(BaseVariables):
+
+    def __init__(self, inventory, state):
+        self.inventory = inventory
+        self.state = state
+        self.fetches = []
+
+    @numeric_rule_variable
+    def current_inventory(self):
+        self.fetches.append('current_inventory')
+        return self.inventory
+
+    @string_rule_variable
+    def current_state(self):
+        self.fetches.append('current_state')
+        return self.state
+
+
+class NoActions(BaseActions):
+
+    @rule_action()
+    def notify(self):
+        pass
+
+
+SHARED_LEAF = {'name': 'current_state', 'operator': 'equal_to', 'value': 'CA'}
+SHARED_ALL = {'all': [SHARED_LEAF, {'name': 'current_inventory', 'operator': 'greater_than', 'value': 5}]}
+
+
+class ConditionNetworkTests(TestCase):
+
+    def test_identical_conditions_share_nodes(self):
+        rules = [{'conditions': SHARED_ALL, 'actions': []},
+                 {'conditions': {'any': [SHARED_ALL, SHARED_LEAF]}, 'actions': []},
+                 {'conditions': dict(SHARED_LEAF), 'actions': [{'name': 'notify'}]}]
+        network = build_network(rules, CountingVariables, NoActions)
+        # SHARED_LEAF, the inventory leaf, SHARED_ALL and the any node
+        self.assertEqual(len(network.nodes), 4)
+        self.assertEqual(len(network), 3)
+
+    def test_each_node_evaluated_once_per_object(self):
+        rules = [{'conditions': SHARED_ALL, 'actions': []},
+                 {'conditions': {'any': [SHARED_ALL, SHARED_LEAF]}, 'actions': []},
+                 {'conditions': SHARED_LEAF, 'actions': []}]
+        network = build_network(rules, CountingVariables, NoActions)
+        variables = CountingVariables(10, 'CA')
+        self.assertEqual(network.triggered_rules(variables), [0, 1, 2])
+        self.assertEqual(variables.fetches, ['current_state', 'current_inventory'])
+
+        variables = CountingVariables(1, 'NY')
+        self.assertEqual(network.triggered_rules(variables), [])
+        self.assertEqual(variables.fetches, ['current_state'])
+
+    def test_same_results_as_run_all(self):
+        network = build_network(RULES, ProductVariables, ProductActions)
+        for variables in [ProductVariables(), ProductVariables(inventory=2), ProductVariables(name='gadget'),
+                          ProductVariables(inventory=2, on_sale=True), ProductVariables(inventory=50)]:
+            expected_actions, network_actions = ProductActions(), ProductActions()
+            expected = run_all(RULES, variables, expected_actions)
+            self.assertEqual(network.run_all(variables, network_actions), expected)
+            self.assertEqual(network_actions.calls, expected_actions.calls)
+
+    def test_stop_on_first_trigger(self):
+        network = build_network(RULES, ProductVariables, ProductActions)
+        actions = ProductActions()
+        self.assertTrue(network.run_all(ProductVariables(inventory=2), actions, stop_on_first_trigger=True))
+        self.assertEqual(actions.calls, [('put_on_sale',)])
+
+
+class IncrementalSessionTests(TestCase):
+
+    RULES = [{'conditions': SHARED_ALL, 'actions': []},
+             {'conditions': {'any': [SHARED_ALL, SHARED_LEAF]}, 'actions': []},
+             {'conditions': {'name': 'current_inventory', 'operator': 'less_than', 'value': 3}, 'actions': []}]
+
+    def test_dependencies(self):
+        network = build_network(self.RULES, CountingVariables, NoActions)
+        self.assertEqual(sorted(network.leaves_by_variable), ['current_inventory', 'current_state'])
+        self.assertEqual(len(network.leaves_by_variable['current_inventory']), 2)
+
+    def test_update_reports_flipped_rules(self):
+        network = build_network(self.RULES, CountingVariables, NoActions)
+        variables = CountingVariables(10, 'CA')
+        session = network.session(variables)
+        self.assertEqual(session.triggered_rules, [0, 1])
+        self.assertEqual(variables.fetches, ['current_state', 'current_inventory'])
+
+        del variables.fetches[:]
+        variables.inventory = 1
+        self.assertEqual(session.update(['current_inventory']), [0, 2])
+        self.assertEqual(session.triggered_rules, [1, 2])
+        # the state leaf wasn't evaluated again
+        self.assertEqual(variables.fetches, ['current_inventory'])
+
+        del variables.fetches[:]
+        variables.state = 'NY'
+        self.assertEqual(session.update(['current_state']), [1])
+        self.assertEqual(variables.fetches, ['current_state'])
+
+        self.assertEqual(session.update(['unknown_variable']), [])
+
+    def test_same_outcomes_as_a_fresh_evaluation(self):
+        network = build_network(self.RULES, CountingVariables, NoActions)
+        variables = CountingVariables(1, 'NY')
+        session = network.session(variables)
+        for inventory, state in [(10, 'NY'), (10, 'CA'), (2, 'CA'), (6, 'TX'), (6, 'CA')]:
+            changed = []
+            if inventory != variables.inventory:
+                changed.append('current_inventory')
+            if state != variables.state:
+                changed.append('current_state')
+            variables.inventory, variables.state = inventory, state
+            previous = list(session.outcomes)
+            flipped = session.update(changed)
+            expected = network.triggered_rules(CountingVariables(inventory, state))
+            self.assertEqual(session.triggered_rules, expected)
+            self.assertEqual(flipped, [index for index in range(len(self.RULES))
+                                       if previous[index] != session.outcomes[index]])
@@ -1,12 +1,22 @@
+import re
 import sys
+from datetime import date, datetime, timedelta, timezone
 from decimal import Decimal
 
-from business_rules.operators import (StringType,
+from mock import patch
+
+from business_rules.operators import (FoldedValues,
+                                      RegexCache,
+                                      StringType,
+                                      NativeNumericType,
                                       NumericType,
                                       BooleanType,
                                       SelectType,
                                       SelectMultipleType,
-                                      DateType)
+                                      DateType,
+                                      EpochDateType,
+                                      _strptime_iso,
+                                      parse_date)
 from . import TestCase
 
 
@@ -49,12 +59,44 @@ class StringOperatorTests(TestCase):
         self.assertTrue(StringType("hello").matches_regex(r"^h"))
         self.assertFalse(StringType("hello").matches_regex(r"^sh"))
 
+    def test_string_matches_compiled_regex(self):
+        self.assertTrue(StringType("hello").matches_regex.__wrapped__(StringType("hello"), re.compile(r"^h")))
+
+    def test_string_cast_operator_value_compiles_regex(self):
+        pattern = StringType.cast_operator_value('matches_regex', r"^h.*o$")
+        self.assertEqual(pattern.pattern, r"^h.*o$")
+        self.assertEqual(StringType.cast_operator_value('equal_to', None), "")
+
     def test_non_empty(self):
         self.assertTrue(StringType("hello").non_empty())
         self.assertFalse(StringType("").non_empty())
         self.assertFalse(StringType(None).non_empty())
 
 
+class RegexCacheTests(TestCase):
+
+    def test_cache_hits_and_eviction(self):
+        cache = RegexCache(maxsize=2)
+        first = cache.compile(r"^a")
+        self.assertIs(cache.compile(r"^a"), first)
+        cache.compile(r"^b")
+        cache.compile(r"^a")
+        cache.compile(r"^c")  # evicts ^b, the least recently used
+        stats = cache.stats()
+        self.assertEqual((stats['hits'], stats['misses'], stats['size']), (2, 3, 2))
+        self.assertEqual(sorted(stats['compile_times']), [r"^a", r"^c"])
+        self.assertTrue(all(seconds >= 0 for seconds in stats['compile_times'].values()))
+
+    def test_resize_and_clear(self):
+        cache = RegexCache()
+        for pattern in ['a', 'b', 'c']:
+            cache.compile(pattern)
+        cache.resize(1)
+        self.assertEqual(list(cache.stats()['compile_times']), ['c'])
+        cache.clear()
+        self.assertEqual(cache.stats()['size'], 0)
+
+
 class NumericOperatorTests(TestCase):
     EPSILON = Decimal('0.000001')
 
@@ -135,6 +177,43 @@ class NumericOperatorTests(TestCase):
         self.assertTrue(NumericType(10).less_than_or_equal_to(10.000002))
         self.assertTrue(NumericType(10).less_than_or_equal_to(10))
 
+    def test_compound_operators_cast_their_argument_once(self):
+        casts = []
+
+        class CountingNumericType(NumericType):
+
+            @staticmethod
+            def _assert_valid_value_and_cast(value):
+                casts.append(value)
+                return NumericType._assert_valid_value_and_cast(value)
+
+        number = CountingNumericType(10)
+        del casts[:]
+        self.assertTrue(number.greater_than_or_equal_to(10))
+        self.assertTrue(number.less_than_or_equal_to(10))
+        self.assertEqual(casts, [10, 10])
+
+
+class NativeNumericOperatorTests(TestCase):
+
+    def test_casts_to_native_numbers(self):
+        self.assertIsInstance(NativeNumericType(10).value, int)
+        self.assertIsInstance(NativeNumericType(10.5).value, float)
+        self.assertIsInstance(NativeNumericType(Decimal('10.5')).value, float)
+        with self.assertRaisesRegexp(AssertionError, "foo is not a valid numeric type"):
+            NativeNumericType("foo")
+
+    def test_same_results_as_numeric_type(self):
+        values = [1, 10, 10.0, 10.000001, 10.000002, 9.999999, 11, Decimal('10.0')]
+        operators = ['equal_to', 'not_equal_to', 'greater_than', 'greater_than_or_equal_to',
+                     'less_than', 'less_than_or_equal_to']
+        for value in values:
+            for other in values:
+                for operator in operators:
+                    self.assertEqual(getattr(NativeNumericType(value), operator)(other),
+                                     getattr(NumericType(value), operator)(other),
+                                     (value, operator, other))
+
 
 class BooleanOperatorTests(TestCase):
 
@@ -166,8 +245,49 @@ class SelectOperatorTests(TestCase):
         self.assertFalse(SelectType([1, 2, "a"]).does_not_contain("A"))
 
 
+    def test_unhashable_items(self):
+        self.assertTrue(SelectType([{'a': 1}, "B"]).contains({'a': 1}))
+        self.assertTrue(SelectType([{'a': 1}, "B"]).contains("b"))
+        self.assertTrue(SelectType([1, "B"]).does_not_contain({'a': 1}))
+
+    def test_value_is_folded_once(self):
+        select = SelectType(["A", "b"])
+        self.assertTrue(select.contains("a"))
+        folded = select._folded_value()
+        self.assertTrue(select.does_not_contain("c"))
+        self.assertIs(select._folded_value(), folded)
+
+
+class FoldedValuesTests(TestCase):
+
+    def test_folded_values(self):
+        folded = FoldedValues(["A", 1, "b", "A"])
+        self.assertEqual(folded.items, ("a", 1, "b", "a"))
+        self.assertEqual(folded.set, frozenset(["a", 1, "b"]))
+        self.assertIn("a", folded)
+        self.assertNotIn("A", folded)
+        self.assertNotIn([1], folded)
+        self.assertEqual(folded, FoldedValues(["a", 1, "B", "a"]))
+        self.assertEqual(hash(folded), hash(FoldedValues(["a", 1, "B", "a"])))
+
+    def test_unhashable_items(self):
+        folded = FoldedValues([[1], "A"])
+        self.assertIsNone(folded.set)
+        self.assertIn([1], folded)
+        self.assertIn("a", folded)
+
+
 class SelectMultipleOperatorTests(TestCase):
 
+    def test_cast_operator_value(self):
+        folded = SelectMultipleType.cast_operator_value('contains_all', ["A", 2])
+        self.assertEqual(folded, FoldedValues(["a", 2]))
+        operator = SelectMultipleType.shares_exactly_one_element_with.__wrapped__
+        self.assertTrue(operator(SelectMultipleType([1, "a"]), folded))
+        self.assertFalse(operator(SelectMultipleType([2, "a"]), folded))
+        self.assertTrue(SelectMultipleType.is_contained_by.__wrapped__(SelectMultipleType(["a", "A"]), folded))
+        self.assertTrue(SelectMultipleType.shares_no_elements_with.__wrapped__(SelectMultipleType([3]), folded))
+
     def test_contains_all(self):
         self.assertTrue(SelectMultipleType([1, 2]).
                         contains_all([2, 1]))
@@ -252,3 +372,58 @@ class DateOperatorTests(TestCase):
                          less_than_or_equal_to('10-9-2019'))
         self.assertTrue(DateType('10-9-2019').
                         less_than_or_equal_to('10-10-2019'))
+
+    def test_date_type_passes_native_values_through(self):
+        value = datetime(2019, 10, 10, 12, 30)
+        self.assertIs(DateType(value).value, value)
+        self.assertEqual(DateType(date(2019, 10, 10)).value, datetime(2019, 10, 10))
+        self.assertTrue(DateType(date(2019, 10, 10)).less_than(value))
+
+    def test_parse_date_skips_dateutil_for_iso_strings(self):
+        with patch('business_rules.operators.dateutil_parser.parse') as parse:
+            self.assertEqual(parse_date('2019-10-10T12:30:00+00:00'),
+                             datetime(2019, 10, 10, 12, 30, tzinfo=timezone.utc))
+            self.assertFalse(parse.called)
+
+    def test_strptime_iso(self):
+        """ The fallback for interpreters without datetime.fromisoformat parses like it. """
+        for value, expected in [('2019-10-10', datetime(2019, 10, 10)),
+                                ('2019-10-10T12:30:00', datetime(2019, 10, 10, 12, 30)),
+                                ('2019-10-10 12:30:00.250000', datetime(2019, 10, 10, 12, 30, 0, 250000)),
+                                ('2019-10-10T12:30:00+02:00',
+                                 datetime(2019, 10, 10, 12, 30, tzinfo=timezone(timedelta(hours=2)))),
+                                ('2019-10-10T12:30:00.5-05:30',
+                                 datetime(2019, 10, 10, 12, 30, 0, 500000,
+                                          tzinfo=timezone(-timedelta(hours=5, minutes=30))))]:
+            self.assertEqual(_strptime_iso(value), expected)
+            self.assertEqual(_strptime_iso(value).utcoffset(), expected.utcoffset())
+        for value in ['2019-10-10T12', 'October 10, 2019', '10/10/2019']:
+            with self.assertRaises(ValueError):
+                _strptime_iso(value)
+
+    def test_parse_date_falls_back_to_dateutil(self):
+        self.assertEqual(parse_date('October 10, 2019'), datetime(2019, 10, 10))
+
+    def test_parse_date_invalid(self):
+        err_string = "`foo` is not a valid date type"
+        with self.assertRaisesRegexp(AssertionError, err_string):
+            DateType('foo')
+        with self.assertRaisesRegexp(AssertionError, "is not a valid date type"):
+            DateType(10)
+
+
+class EpochDateOperatorTests(TestCase):
+
+    def test_casts_to_timestamps(self):
+        self.assertEqual(EpochDateType('1970-01-02').value, 86400.0)
+        self.assertEqual(EpochDateType(datetime(1970, 1, 2, tzinfo=timezone.utc)).value, 86400.0)
+        self.assertEqual(EpochDateType(86400).value, 86400.0)
+
+    def test_compares_naive_and_aware_values(self):
+        self.assertTrue(EpochDateType('2019-10-10T00:00:00+00:00').equal_to('2019-10-10'))
+        self.assertTrue(EpochDateType('2019-10-10T00:00:00+02:00').less_than('2019-10-10'))
+        self.assertTrue(EpochDateType(date(2019, 10, 11)).greater_than_or_equal_to('10-10-2019'))
+
+    def test_rejects_booleans(self):
+        with self.assertRaisesRegexp(AssertionError, "is not a valid date type"):
+            EpochDateType(True)
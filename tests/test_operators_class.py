@@ -1,5 +1,6 @@
 from mock import MagicMock
 
+from business_rules.fields import FIELD_NO_INPUT
 from business_rules.operators import BaseType, type_operator
 from . import TestCase
 
@@ -66,3 +67,29 @@ class OperatorsClassTests(TestCase):
         some_type.other_operator('blah')
         some_type.other_operator(other_param='blah')
         self.assertEqual(some_type._assert_valid_value_and_cast.call_count, 0)
+
+    def test_cast_operator_value(self):
+        """ cast_operator_value casts constants like the type_operator wrapper would, without needing an instance. """
+
+        class SomeType(BaseType):
+
+            def _assert_valid_value_and_cast(self, value):
+                return int(value)
+
+            @type_operator('text')
+            def some_operator(self, other_param):
+                return self.value == other_param
+
+            @type_operator('text', assert_type_for_arguments=False)
+            def other_operator(self, other_param):
+                pass
+
+            @type_operator(FIELD_NO_INPUT)
+            def no_input_operator(self):
+                pass
+
+        self.assertEqual(SomeType.cast_operator_value('some_operator', '10'), 10)
+        self.assertEqual(SomeType.cast_operator_value('other_operator', '10'), '10')
+        self.assertEqual(SomeType.cast_operator_value('no_input_operator', ''), '')
+        # the undecorated operator can then be called with the cast value directly
+        self.assertTrue(SomeType.some_operator.__wrapped__(SomeType('10'), 10))
@@ -0,0 +1,141 @@
+from itertools import product
+
+from business_rules import compile_rules, run_all
+from business_rules.compiler import ConditionGroup, prepare_conditions
+from business_rules.index import build_index
+from business_rules.optimizer import never_firing_rules, optimize_conditions
+from business_rules.variables import date_rule_variable, numeric_rule_variable
+from . import TestCase
+from .test_compiler import RULES, ProductActions, ProductVariables
+
+
+def _leaf(name, operator, value=''):
+    return {'name': name, 'operator': operator, 'value': value}
+
+
+def _rule(conditions):
+    return {'conditions': conditions, 'actions': [{'name': 'put_on_sale'}]}
+
+
+class ExtraVariables(ProductVariables):
+
+    @numeric_rule_variable(native=True)
+    def native_inventory(self):
+        return self.inventory
+
+    @date_rule_variable(epoch=True)
+    def epoch_date(self):
+        return '2019-10-10'
+
+
+class OptimizeConditionsTests(TestCase):
+
+    def _optimize(self, conditions):
+        return optimize_conditions(prepare_conditions(conditions, ExtraVariables))
+
+    def _prepare(self, conditions):
+        return prepare_conditions(conditions, ExtraVariables)
+
+    def test_flattens_and_removes_duplicates(self):
+        small = _leaf('current_inventory', 'less_than', 5)
+        sale = _leaf('is_on_sale', 'is_true')
+        gadget = _leaf('product_name', 'equal_to', 'gadget')
+        self.assertEqual(self._optimize({'all': [{'any': [small]}]}), self._prepare(small))
+        self.assertEqual(self._optimize({'all': [small, {'all': [sale, {'all': [small]}]}, sale]}),
+                         ConditionGroup('all', (self._prepare(small), self._prepare(sale))))
+        self.assertEqual(self._optimize({'any': [gadget, {'all': [small, sale]}, {'any': [gadget]},
+                                                 {'all': [small, sale]}]}),
+                         self._prepare({'any': [gadget, {'all': [small, sale]}]}))
+
+    def test_boolean_contradictions(self):
+        self.assertIs(self._optimize({'all': [_leaf('is_on_sale', 'is_true'), _leaf('is_on_sale', 'is_false')]}),
+                      False)
+        self.assertIs(self._optimize({'any': [_leaf('is_on_sale', 'is_true'), _leaf('is_on_sale', 'is_false')]}),
+                      True)
+
+    def test_string_contradictions(self):
+        self.assertIs(self._optimize({'all': [_leaf('product_name', 'equal_to', 'a'),
+                                              _leaf('product_name', 'equal_to', 'b')]}), False)
+        self.assertEqual(self._optimize({'all': [_leaf('product_name', 'equal_to', 'a'),
+                                                 _leaf('product_name', 'equal_to', 'a')]}),
+                         self._prepare(_leaf('product_name', 'equal_to', 'a')))
+        # different constants are fine under an any node
+        self.assertIsInstance(self._optimize({'any': [_leaf('product_name', 'equal_to', 'a'),
+                                                      _leaf('product_name', 'equal_to', 'b')]}), ConditionGroup)
+
+    def test_range_contradictions(self):
+        for name in ['current_inventory', 'native_inventory']:
+            self.assertIs(self._optimize({'all': [_leaf(name, 'greater_than', 10), _leaf(name, 'less_than', 5)]}),
+                          False)
+            self.assertIs(self._optimize({'all': [_leaf(name, 'equal_to', 3), _leaf(name, 'greater_than', 4)]}),
+                          False)
+            self.assertIsInstance(self._optimize({'all': [_leaf(name, 'greater_than', 5),
+                                                          _leaf(name, 'less_than', 10)]}), ConditionGroup)
+        self.assertIs(self._optimize({'all': [_leaf('expiration_date', 'greater_than', '2020-01-01'),
+                                              _leaf('expiration_date', 'less_than_or_equal_to', '2020-01-01')]}),
+                      False)
+        self.assertIs(self._optimize({'all': [_leaf('epoch_date', 'less_than', '2020-01-01'),
+                                              _leaf('epoch_date', 'greater_than', '2021-01-01')]}), False)
+
+    def test_constant_folding(self):
+        contradiction = {'all': [_leaf('is_on_sale', 'is_true'), _leaf('is_on_sale', 'is_false')]}
+        tautology = {'any': [_leaf('is_on_sale', 'is_true'), _leaf('is_on_sale', 'is_false')]}
+        small = _leaf('current_inventory', 'less_than', 5)
+        self.assertIs(self._optimize({'all': [small, {'any': [contradiction]}]}), False)
+        self.assertEqual(self._optimize({'any': [small, contradiction]}), self._prepare(small))
+        self.assertEqual(self._optimize({'all': [small, tautology]}), self._prepare(small))
+        self.assertIs(self._optimize({'any': [small, tautology]}), True)
+        self.assertIs(self._optimize({'all': [tautology]}), True)
+
+    def test_same_results_as_the_original_conditions(self):
+        """ Compares the optimized and original rules for a grid of values around every constant and EPSILON. """
+        operators = ['greater_than', 'greater_than_or_equal_to', 'less_than', 'less_than_or_equal_to', 'equal_to']
+        rules = []
+        for first, second in product(operators, repeat=2):
+            for low, high in [(5, 5), (5, 5.000001), (5, 5.000002), (5, 5.0000021), (5, 4.999999), (5, 4.999998),
+                              (5, 4.9999979), (5, 10)]:
+                for name in ['current_inventory', 'native_inventory']:
+                    rules.append(_rule({'all': [_leaf(name, first, low), _leaf(name, second, high)]}))
+        inventories = [4.999997, 4.999998, 4.999999, 4.9999995, 5, 5.0000005, 5.000001, 5.000002, 5.0000021,
+                       5.000003, 7, 10]
+
+        compiled = compile_rules(rules, ExtraVariables, ProductActions, optimize=True)
+        self.assertTrue(compiled.never_firing_rules())
+        for inventory in inventories:
+            expected = [index for index, rule in enumerate(rules)
+                        if run_all([rule], ExtraVariables(inventory=inventory), ProductActions())]
+            actual = [index for index, rule in enumerate(compiled)
+                      if rule.check(ExtraVariables(inventory=inventory))]
+            self.assertEqual(actual, expected, inventory)
+            for index in compiled.never_firing_rules():
+                self.assertNotIn(index, expected)
+
+
+class NeverFiringRulesTests(TestCase):
+
+    RULES = RULES + [
+        _rule({'all': [_leaf('current_inventory', 'greater_than', 10),
+                       {'any': [_leaf('current_inventory', 'less_than', 5)]}]}),
+        _rule({'any': [{'all': [_leaf('is_on_sale', 'is_true'), _leaf('is_on_sale', 'is_false')]},
+                       _leaf('current_inventory', 'greater_than', 10)]}),
+    ]
+
+    def test_never_firing_rules(self):
+        self.assertEqual(never_firing_rules(self.RULES, ProductVariables), [2])
+
+    def test_compiled_rules(self):
+        compiled = compile_rules(self.RULES, ProductVariables, ProductActions, optimize=True)
+        self.assertEqual(compiled.never_firing_rules(), [2])
+        self.assertIs(compiled.rules[2].conditions, False)
+        self.assertEqual(compile_rules(self.RULES, ProductVariables, ProductActions).never_firing_rules(), [])
+
+        index = build_index(self.RULES, ProductVariables, ProductActions, optimize=True)
+        for inventory, on_sale in product([1, 12], [False, True]):
+            expected_actions, actions, indexed_actions = ProductActions(), ProductActions(), ProductActions()
+            expected = run_all(self.RULES, ProductVariables(inventory=inventory, on_sale=on_sale), expected_actions)
+            self.assertEqual(compiled.run_all(ProductVariables(inventory=inventory, on_sale=on_sale), actions),
+                             expected)
+            self.assertEqual(index.run_all(ProductVariables(inventory=inventory, on_sale=on_sale), indexed_actions),
+                             expected)
+            self.assertEqual(actions.calls, expected_actions.calls)
+            self.assertEqual(indexed_actions.calls, expected_actions.calls)
@@ -0,0 +1,126 @@
+from business_rules import compile_rules, run_all
+from business_rules.actions import BaseActions
+from business_rules.compiler import ConditionGroup, prepare_conditions
+from business_rules.ordering import AdaptiveRuleSet, build_adaptive, expected_cost, order_by_cost
+from business_rules.variables import BaseVariables, boolean_rule_variable, numeric_rule_variable
+from . import TestCase
+
+
+class AccountVariables(BaseVariables):
+
+    def __init__(self, balance=0, verified=False, vip=False):
+        self.balance = balance
+        self.verified = verified
+        self.vip = vip
+        self.fetches = []
+
+    @numeric_rule_variable(cost=100)
+    def remote_balance(self):
+        self.fetches.append('remote_balance')
+        return self.balance
+
+    @boolean_rule_variable(cost=2)
+    def is_verified(self):
+        self.fetches.append('is_verified')
+        return self.verified
+
+    @boolean_rule_variable
+    def is_vip(self):
+        self.fetches.append('is_vip')
+        return self.vip
+
+
+class NoActions(BaseActions):
+    pass
+
+
+def _leaf(name, operator, value=''):
+    return {'name': name, 'operator': operator, 'value': value}
+
+
+RULES = [
+    {'conditions': {'all': [_leaf('remote_balance', 'greater_than', 10), _leaf('is_verified', 'is_true')]},
+     'actions': []},
+    {'conditions': {'any': [_leaf('remote_balance', 'less_than', 0),
+                            {'all': [_leaf('is_verified', 'is_false'), _leaf('is_vip', 'is_true')]},
+                            _leaf('is_vip', 'is_true')]},
+     'actions': []},
+]
+
+
+class CostTests(TestCase):
+
+    def test_cost_hint(self):
+        self.assertEqual(AccountVariables.remote_balance.cost, 100)
+        self.assertEqual(AccountVariables.is_vip.cost, 1)
+
+    def test_order_by_cost(self):
+        conditions = prepare_conditions(RULES[1]['conditions'], AccountVariables)
+        self.assertEqual(order_by_cost(conditions, AccountVariables),
+                         prepare_conditions({'any': [_leaf('is_vip', 'is_true'),
+                                                     {'all': [_leaf('is_vip', 'is_true'),
+                                                              _leaf('is_verified', 'is_false')]},
+                                                     _leaf('remote_balance', 'less_than', 0)]}, AccountVariables))
+
+    def test_expected_cost(self):
+        self.assertEqual(expected_cost('all', [(1, 0.5), (100, 0.5)]), 51)
+        self.assertAlmostEqual(expected_cost('any', [(1, 0.9), (100, 0.5)]), 11)
+
+    def test_compile_rules_order_by_cost(self):
+        compiled = compile_rules(RULES, AccountVariables, NoActions, order_by_cost=True)
+        variables = AccountVariables(balance=50)
+        self.assertFalse(compiled.rules[0].check(variables))
+        self.assertEqual(variables.fetches, ['is_verified'])
+        for kwargs in [{}, {'balance': 50, 'verified': True}, {'balance': -5}, {'vip': True}]:
+            expected = [index for index, rule in enumerate(RULES)
+                        if run_all([rule], AccountVariables(**kwargs), NoActions())]
+            self.assertEqual([index for index, rule in enumerate(compiled) if rule.check(AccountVariables(**kwargs))],
+                             expected)
+
+
+class AdaptiveRuleSetTests(TestCase):
+
+    def test_reorders_by_selectivity(self):
+        rules = [{'conditions': {'any': [_leaf('is_verified', 'is_true'), _leaf('is_vip', 'is_true')]},
+                  'actions': []}]
+        adaptive = build_adaptive(rules, AccountVariables, NoActions, reorder_every=50)
+        for _ in range(50):
+            self.assertEqual(adaptive.triggered_rules(AccountVariables(vip=True)), [0])
+        # is_vip is cheaper and always true, so it decides the any node on its own
+        self.assertEqual(adaptive.conditions(0),
+                         prepare_conditions({'any': [_leaf('is_vip', 'is_true'), _leaf('is_verified', 'is_true')]},
+                                            AccountVariables))
+        variables = AccountVariables(vip=True)
+        adaptive.triggered_rules(variables)
+        self.assertEqual(variables.fetches, ['is_vip'])
+
+    def test_expensive_selective_variable_goes_first_when_worth_it(self):
+        rules = [{'conditions': {'all': [_leaf('is_vip', 'is_true'), _leaf('is_verified', 'is_true')]},
+                  'actions': []}]
+        adaptive = build_adaptive(rules, AccountVariables, NoActions, reorder_every=100)
+        for _ in range(100):
+            adaptive.triggered_rules(AccountVariables(verified=False, vip=True))
+        # is_verified costs twice as much but is always false, is_vip always true
+        self.assertEqual(adaptive.conditions(0).children[0].name, 'is_verified')
+
+        for _ in range(100):
+            adaptive.triggered_rules(AccountVariables(verified=True, vip=False))
+        self.assertEqual(adaptive.conditions(0).children[0].name, 'is_vip')
+
+    def test_same_results_as_run_all(self):
+        adaptive = AdaptiveRuleSet(compile_rules(RULES, AccountVariables, NoActions), reorder_every=3)
+        objects = [{'balance': balance, 'verified': verified, 'vip': vip}
+                   for balance in [-5, 5, 50] for verified in [False, True] for vip in [False, True]]
+        for kwargs in objects * 3:
+            expected = [index for index, rule in enumerate(RULES)
+                        if run_all([rule], AccountVariables(**kwargs), NoActions())]
+            self.assertEqual(adaptive.triggered_rules(AccountVariables(**kwargs), cache_variables=True), expected)
+            self.assertEqual(adaptive.run_all(AccountVariables(**kwargs), NoActions()), bool(expected))
+        self.assertIsInstance(adaptive.conditions(1), ConditionGroup)
+
+    def test_constant_conditions(self):
+        rules = [{'conditions': {'all': [_leaf('is_vip', 'is_true'), _leaf('is_vip', 'is_false')]}, 'actions': []},
+                 {'conditions': {'any': [_leaf('is_vip', 'is_true'), _leaf('is_vip', 'is_false')]}, 'actions': []}]
+        adaptive = build_adaptive(rules, AccountVariables, NoActions, reorder_every=1, optimize=True)
+        self.assertEqual(adaptive.triggered_rules(AccountVariables()), [1])
+        self.assertIs(adaptive.conditions(0), False)
@@ -0,0 +1,108 @@
+from business_rules import run_all
+from business_rules.actions import BaseActions, rule_action
+from business_rules.compiler import CompiledRuleSet
+from business_rules.fields import FIELD_NUMERIC
+from business_rules.parallel import _init_worker, _run_object, _worker_state, plan_all_parallel, run_all_parallel
+from business_rules.plan import plan_all
+from business_rules.variables import BaseVariables, numeric_rule_variable
+from . import TestCase
+
+# actions run in the calling process record their calls here
+CALLS = []
+
+
+class NumberVariables(BaseVariables):
+
+    def __init__(self, number):
+        self.number = number
+
+    @numeric_rule_variable
+    def value(self):
+        return self.number
+
+
+class NumberActions(BaseActions):
+
+    def __init__(self, number):
+        self.number = number
+
+    @rule_action(params={'rule': FIELD_NUMERIC})
+    def record(self, rule):
+        CALLS.append((self.number, rule))
+
+
+RULES = [
+    {'conditions': {'name': 'value', 'operator': 'greater_than', 'value': 10},
+     'actions': [{'name': 'record', 'params': {'rule': 0}}]},
+    {'conditions': {'name': 'value', 'operator': 'less_than', 'value': 50},
+     'actions': [{'name': 'record', 'params': {'rule': 1}}]},
+]
+
+
+class RunAllParallelTests(TestCase):
+
+    def setUp(self):
+        del CALLS[:]
+
+    def test_results_in_input_order(self):
+        numbers = [100, 5, 20, 100, 1]
+        results = run_all_parallel(RULES, numbers, NumberVariables, NumberActions, workers=2, chunksize=2)
+        self.assertEqual(results, [run_all(RULES, NumberVariables(n), NumberActions(n)) for n in numbers])
+        self.assertEqual(results, [True, True, True, True, True])
+        del CALLS[:]
+
+        results = run_all_parallel([RULES[0]], iter(numbers), NumberVariables, NumberActions, workers=2)
+        self.assertEqual(results, [True, False, True, True, False])
+        # actions ran in the workers
+        self.assertEqual(CALLS, [])
+
+    def test_actions_in_calling_process(self):
+        results = run_all_parallel(RULES, iter([100, 5, 20]), NumberVariables, NumberActions, workers=2,
+                                   chunksize=1, execute_actions_in_workers=False)
+        self.assertEqual(results, [True, True, True])
+        self.assertEqual(CALLS, [(100, 0), (5, 1), (20, 0), (20, 1)])
+
+    def test_stop_on_first_trigger(self):
+        run_all_parallel(RULES, [20], NumberVariables, NumberActions, workers=1, stop_on_first_trigger=True,
+                         execute_actions_in_workers=False)
+        self.assertEqual(CALLS, [(20, 0)])
+
+    def test_native_numbers(self):
+        numbers = [100, 5, 20]
+        self.assertEqual(run_all_parallel(RULES, numbers, NumberVariables, NumberActions, workers=2,
+                                          native_numbers=True, epoch_dates=True),
+                         [True, True, True])
+        self.assertEqual([plan.triggered_rules for plan in plan_all_parallel(RULES, numbers, NumberVariables,
+                                                                             workers=2, native_numbers=True)],
+                         [(0,), (1,), (0, 1)])
+        with self.assertRaisesRegexp(AssertionError, 'native_numbers and epoch_dates require the factories'):
+            run_all_parallel(RULES, numbers, lambda n: NumberVariables(n), NumberActions, native_numbers=True)
+
+    def test_invalid_rules_fail_in_calling_process(self):
+        rules = [{'conditions': RULES[0]['conditions'], 'actions': [{'name': 'missing', 'params': {}}]}]
+        with self.assertRaisesRegexp(AssertionError, 'Action missing is not defined in class NumberActions'):
+            run_all_parallel(rules, [1], NumberVariables, NumberActions, workers=1)
+
+
+class WorkerTests(TestCase):
+
+    def setUp(self):
+        self.addCleanup(_worker_state.clear)
+
+    def test_rules_are_compiled_once_per_worker(self):
+        del CALLS[:]
+        options = {'variables_cls': NumberVariables, 'actions_cls': NumberActions,
+                   'native_numbers': False, 'epoch_dates': False}
+        _init_worker(RULES, NumberVariables, NumberActions, False, True, options)
+        self.assertIsInstance(_worker_state['rule_list'], CompiledRuleSet)
+        self.assertTrue(_run_object(20))
+        self.assertEqual(CALLS, [(20, 0), (20, 1)])
+
+        _init_worker(RULES, NumberVariables, None, False, False, dict(options, actions_cls=None))
+        self.assertIsInstance(_worker_state['rule_list'], CompiledRuleSet)
+        self.assertEqual(_run_object(5), plan_all(RULES, NumberVariables(5)))
+
+    def test_factories_that_are_not_classes(self):
+        _init_worker(RULES, lambda n: NumberVariables(n), None, False, False, None)
+        self.assertIs(_worker_state['rule_list'], RULES)
+        self.assertEqual(_run_object(20).triggered_rules, (0, 1))
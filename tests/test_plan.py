@@ -0,0 +1,52 @@
+import pickle
+
+from business_rules import compile_rules, run_all
+from business_rules.parallel import plan_all_parallel
+from business_rules.plan import Plan, PlannedAction, execute_plan, execute_plans, plan_all
+from . import TestCase
+from .test_bulk import RULES as STOCK_RULES, StockActions, StockVariables
+from .test_compiler import RULES, ProductActions, ProductVariables
+from .test_parallel import RULES as NUMBER_RULES, NumberVariables
+
+
+class PlanTests(TestCase):
+
+    def setUp(self):
+        StockActions.bulk_calls = []
+
+    def test_plan_all(self):
+        actions = ProductActions()
+        plan = plan_all(RULES, ProductVariables(inventory=2))
+        self.assertEqual(plan, Plan((0, 1), (PlannedAction(0, 'put_on_sale', {}),
+                                             PlannedAction(1, 'order_more', {'number_to_order': 40}))))
+        self.assertEqual(actions.calls, [])
+        self.assertEqual(pickle.loads(pickle.dumps(plan)), plan)
+
+        self.assertEqual(plan_all(RULES, ProductVariables(inventory=2), stop_on_first_trigger=True).triggered_rules,
+                         (0,))
+        self.assertEqual(plan_all(RULES, ProductVariables(name='thing')), Plan((), ()))
+
+    def test_compiled_rule_set(self):
+        compiled = compile_rules(RULES, ProductVariables, ProductActions)
+        for variables in [ProductVariables(), ProductVariables(inventory=2), ProductVariables(name='gadget')]:
+            self.assertEqual(plan_all(compiled, variables, cache_variables=True), plan_all(RULES, variables))
+
+    def test_execute_plan(self):
+        for stock in [0, 1, 7]:
+            expected_actions, actions = StockActions(stock), StockActions(stock)
+            expected = run_all(STOCK_RULES, StockVariables(stock), expected_actions)
+            self.assertEqual(execute_plan(plan_all(STOCK_RULES, StockVariables(stock)), actions), expected)
+            self.assertEqual(actions.calls, expected_actions.calls)
+
+    def test_execute_plans_groups_bulk_actions(self):
+        stocks = [0, 1, 7]
+        actions = [StockActions(stock) for stock in stocks]
+        plans = [plan_all(STOCK_RULES, StockVariables(stock)) for stock in stocks]
+        self.assertEqual(execute_plans(zip(plans, actions)), [True, True, False])
+        self.assertEqual(StockActions.bulk_calls, [[(0, {'quantity': 10}), (1, {'quantity': 10})]])
+        self.assertEqual(actions[1].calls, [('notify', '1-10')])
+
+    def test_plan_all_parallel(self):
+        numbers = [100, 5, 20]
+        self.assertEqual(plan_all_parallel(NUMBER_RULES, numbers, NumberVariables, workers=2),
+                         [plan_all(NUMBER_RULES, NumberVariables(number)) for number in numbers])
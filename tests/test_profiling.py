@@ -0,0 +1,73 @@
+import itertools
+
+from business_rules import compile_rules, run_all
+from business_rules.profiling import Profiler
+from . import TestCase
+from .test_compiler import RULES, ProductActions, ProductVariables
+
+
+def fake_clock():
+    return itertools.count().__next__
+
+
+class ProfilerTests(TestCase):
+
+    def assert_recorded(self, profile):
+        # the first rule is an all node failing on its first leaf, the second one an any node
+        self.assertEqual(profile['rules'][0]['count'], 1)
+        self.assertEqual(profile['rules'][0]['triggered'], 0)
+        self.assertEqual(profile['rules'][0]['short_circuits'], 1)
+        self.assertEqual(profile['rules'][0]['short_circuit_rate'], 1.0)
+        self.assertEqual(set(profile['rules']), set(range(len(RULES))))
+        self.assertTrue(profile['conditions'])
+        for stats in list(profile['conditions'].values()) + list(profile['variables'].values()):
+            self.assertGreater(stats['count'], 0)
+            self.assertGreater(stats['total_seconds'], 0)
+
+    def test_run_all(self):
+        profiler = Profiler(clock=fake_clock())
+        actions = ProductActions()
+        expected_actions = ProductActions()
+        self.assertEqual(run_all(RULES, ProductVariables(), actions, profiler=profiler),
+                         run_all(RULES, ProductVariables(), expected_actions))
+        self.assertEqual(actions.calls, expected_actions.calls)
+
+        profile = profiler.as_dict()
+        self.assert_recorded(profile)
+        self.assertEqual(sorted(profile['actions']), sorted(set(call[0] for call in actions.calls)))
+        self.assertEqual(profile['variables']['current_inventory']['count'], 1)
+
+    def test_cache_variables(self):
+        profiler = Profiler()
+        variables = ProductVariables()
+        run_all(RULES + RULES, variables, ProductActions(), profiler=profiler, cache_variables=True)
+        for stats in profiler.as_dict()['variables'].values():
+            self.assertEqual(stats['count'], 1)
+
+    def test_compiled_rule_set(self):
+        compiled = compile_rules(RULES, ProductVariables, ProductActions)
+        profiler = Profiler(clock=fake_clock())
+        actions = ProductActions()
+        expected_actions = ProductActions()
+        self.assertEqual(compiled.run_all(ProductVariables(), actions, profiler=profiler),
+                         compiled.run_all(ProductVariables(), expected_actions))
+        self.assertEqual(actions.calls, expected_actions.calls)
+        self.assert_recorded(profiler.as_dict())
+
+        compiled.run_all(ProductVariables(), ProductActions(), profiler=profiler)
+        self.assertEqual(profiler.as_dict()['rules'][0]['count'], 2)
+
+    def test_as_prometheus(self):
+        profiler = Profiler(clock=fake_clock())
+        run_all(RULES, ProductVariables(), ProductActions(), profiler=profiler)
+        text = profiler.as_prometheus()
+        self.assertIn('# TYPE business_rules_rule_seconds_total counter\n', text)
+        self.assertIn('business_rules_rule_calls_total{rule="0"} 1\n', text)
+        self.assertIn('business_rules_variable_calls_total{variable="current_inventory"} 1\n', text)
+        self.assertIn('business_rules_rule_short_circuits_total{rule="0"} 1\n', text)
+
+    def test_reset(self):
+        profiler = Profiler()
+        run_all(RULES, ProductVariables(), ProductActions(), profiler=profiler)
+        profiler.reset()
+        self.assertEqual(profiler.as_dict(), {'rules': {}, 'conditions': {}, 'variables': {}, 'actions': {}})
@@ -0,0 +1,131 @@
+import threading
+
+from business_rules import run_all
+from business_rules.ruleset import RuleSet
+from . import TestCase
+from .test_index import RULES as ORDER_RULES, STATE_RULES, OrderActions, OrderVariables, StateActions
+
+RULES = [dict(rule, id=index) for index, rule in enumerate(ORDER_RULES)]
+
+
+def _rule(rule_id, state):
+    return {'id': rule_id,
+            'conditions': {'name': 'current_state', 'operator': 'equal_to', 'value': state},
+            'actions': [{'name': 'record', 'params': {'rule': rule_id}}]}
+
+
+class RuleSetTests(TestCase):
+
+    def test_same_results_as_run_all(self):
+        for indexed in [False, True]:
+            rule_set = RuleSet(RULES, OrderVariables, OrderActions, indexed=indexed)
+            for kwargs in [{}, {'state': 'NY', 'total': 500}, {'tags': ['gift'], 'express': True}]:
+                expected_actions, actions = OrderActions(), OrderActions()
+                expected = run_all(RULES, OrderVariables(**kwargs), expected_actions)
+                self.assertEqual(rule_set.run_all(OrderVariables(**kwargs), actions), expected)
+                self.assertEqual(actions.calls, expected_actions.calls)
+
+    def test_actions_changing_the_variables(self):
+        for indexed in [False, True]:
+            rule_set = RuleSet([dict(rule, id=index) for index, rule in enumerate(STATE_RULES)], OrderVariables,
+                               StateActions, indexed=indexed)
+            variables = OrderVariables(state='a')
+            actions = StateActions(variables)
+            self.assertTrue(rule_set.run_all(variables, actions))
+            self.assertEqual(actions.calls, ['b', 'c', 'e'])
+
+    def test_apply_diff(self):
+        for indexed in [False, True]:
+            rule_set = RuleSet(RULES, OrderVariables, OrderActions, indexed=indexed)
+            before = rule_set.snapshot()
+            snapshot = rule_set.apply_diff(added=[_rule('tx', 'TX')], removed=[1, 4],
+                                           changed=[_rule(0, 'NY'), dict(RULES[2])])
+            self.assertEqual(rule_set.version, 1)
+            self.assertIs(rule_set.snapshot(), snapshot)
+            self.assertEqual(snapshot.rule_ids, (0, 2, 3, 5, 6, 'tx'))
+            self.assertEqual(snapshot.rule(0), _rule(0, 'NY'))
+
+            # unchanged rules, and rules changed to an equal rule, aren't compiled again
+            for rule_id in [2, 3, 5, 6]:
+                self.assertIs(snapshot.entries[rule_id][1], before.entries[rule_id][1])
+            self.assertIsNot(snapshot.entries[0][1], before.entries[0][1])
+
+            self.assertEqual(snapshot.triggered_rules(OrderVariables(state='NY')), [0, 6])
+            self.assertEqual(snapshot.triggered_rules(OrderVariables(state='TX')), [6, 'tx'])
+            # the previous snapshot is left as it was
+            self.assertEqual(before.rule_ids, (0, 1, 2, 3, 4, 5, 6))
+            self.assertEqual(before.triggered_rules(OrderVariables(state='NY')), [4, 6])
+
+    def test_index_is_updated(self):
+        rule_set = RuleSet(RULES, OrderVariables, OrderActions, indexed=True)
+        before = rule_set.snapshot()
+        big = dict(_rule('big', 'TX'), conditions={'name': 'order_total', 'operator': 'less_than', 'value': 3})
+        diffs = [dict(added=[_rule('tx', 'TX'), big], removed=[1, 4], changed=[_rule(0, 'NY'), dict(RULES[2])]),
+                 dict(removed=['big', 'tx'], changed=[dict(big, id=5)]),
+                 dict(added=[_rule(1, 'CA')], changed=[_rule(0, 'CA')]),
+                 dict(added=[dict(RULES[4], id=4)], removed=[6, 3])]
+        for diff in diffs:
+            snapshot = rule_set.apply_diff(**diff)
+            rebuilt = RuleSet([snapshot.rule(rule_id) for rule_id in snapshot.rule_ids], OrderVariables,
+                              OrderActions, indexed=True).snapshot()
+            for kwargs in [{}, {'state': 'NY', 'total': 500}, {'state': 'TX', 'total': 1}, {'tags': ['gift']},
+                           {'express': True, 'total': 2}]:
+                self.assertEqual(snapshot.triggered_rules(OrderVariables(**kwargs)),
+                                 rebuilt.triggered_rules(OrderVariables(**kwargs)))
+                expected_actions, actions = OrderActions(), OrderActions()
+                rebuilt.run_all(OrderVariables(**kwargs), expected_actions)
+                snapshot.run_all(OrderVariables(**kwargs), actions)
+                self.assertEqual(actions.calls, expected_actions.calls)
+
+        # gates that no diff touched are shared with the first version, which is left as it was
+        self.assertIs(snapshot.index.gates[('order_tags', ())], before.index.gates[('order_tags', ())])
+        self.assertEqual(before.index.gates[('current_state', ())].rules, {'CA': [0], 'NY': [1]})
+        self.assertEqual(before.triggered_rules(OrderVariables(state='NY', total=500)), [1, 4, 5, 6])
+
+    def test_invalid_diffs_are_not_applied(self):
+        rule_set = RuleSet(RULES, OrderVariables, OrderActions)
+        snapshot = rule_set.snapshot()
+        with self.assertRaisesRegexp(AssertionError, 'Cannot add rule 3, it already exists'):
+            rule_set.apply_diff(added=[_rule(3, 'TX')])
+        with self.assertRaisesRegexp(AssertionError, 'Cannot remove rule 42, it does not exist'):
+            rule_set.apply_diff(removed=[0, 42])
+        with self.assertRaisesRegexp(AssertionError, 'Cannot change rule 42, it does not exist'):
+            rule_set.apply_diff(changed=[_rule(42, 'TX')])
+        with self.assertRaisesRegexp(AssertionError, 'Rule has no id'):
+            rule_set.apply_diff(added=[{'conditions': {}, 'actions': []}])
+        with self.assertRaises(AssertionError):
+            rule_set.apply_diff(removed=[0], added=[dict(_rule('bad', 'TX'), actions=[{'name': 'nope'}])])
+        self.assertIs(rule_set.snapshot(), snapshot)
+        self.assertEqual(rule_set.version, 0)
+
+    def test_duplicate_ids(self):
+        with self.assertRaisesRegexp(AssertionError, 'Rule ca is defined more than once'):
+            RuleSet([_rule('ca', 'CA'), _rule('ca', 'NY')], OrderVariables, OrderActions)
+
+    def test_readers_see_consistent_snapshots(self):
+        # every version holds exactly one rule per state, so a reader always triggers exactly one of them
+        rule_set = RuleSet([_rule('rule-0', 'CA')], OrderVariables, OrderActions, indexed=True)
+        errors = []
+        done = threading.Event()
+
+        def read():
+            while not done.is_set():
+                actions = OrderActions()
+                rule_set.run_all(OrderVariables(state='CA'), actions)
+                if len(actions.calls) != 1:
+                    errors.append(actions.calls)
+
+        readers = [threading.Thread(target=read) for _ in range(4)]
+        for reader in readers:
+            reader.start()
+        try:
+            for version in range(1, 200):
+                rule_set.apply_diff(added=[_rule('rule-{0}'.format(version), 'CA')],
+                                    removed=['rule-{0}'.format(version - 1)])
+        finally:
+            done.set()
+            for reader in readers:
+                reader.join()
+        self.assertEqual(errors, [])
+        self.assertEqual(rule_set.version, 199)
+        self.assertEqual(len(rule_set), 1)
@@ -0,0 +1,115 @@
+import io
+import json
+import os
+import shutil
+import tempfile
+
+from mock import patch
+
+from business_rules import run_all
+from business_rules.operators import NumericType
+from business_rules.stream import RecordError, evaluate_records, main, read_jsonl, record_variables_cls
+from . import TestCase
+
+SCHEMA = {'amount': 'numeric', 'country': 'string', 'tags': 'select', 'vip': 'boolean'}
+
+RULES = [
+    {'conditions': {'name': 'amount', 'operator': 'greater_than', 'value': 100}, 'actions': []},
+    {'conditions': {'all': [{'name': 'country', 'operator': 'equal_to', 'value': 'FR'},
+                            {'name': 'tags', 'operator': 'contains', 'value': 'new'}]},
+     'actions': []},
+    {'conditions': {'any': [{'name': 'vip', 'operator': 'is_true', 'value': ''},
+                            {'name': 'amount', 'operator': 'less_than', 'value': 5}]},
+     'actions': []},
+]
+
+RECORDS = [
+    {'id': 'a', 'amount': 150, 'country': 'FR', 'tags': ['new'], 'vip': False},
+    {'id': 'b', 'amount': 50, 'country': 'US', 'tags': [], 'vip': False},
+    {'id': 'c', 'amount': 2, 'country': 'FR', 'tags': ['old'], 'vip': True},
+]
+
+
+class StreamTests(TestCase):
+
+    def test_record_variables_cls(self):
+        variables_cls = record_variables_cls({'amount': 'numeric', 'total': NumericType})
+        self.assertEqual(sorted(var['name'] for var in variables_cls.get_all_variables()), ['amount', 'total'])
+        self.assertEqual(variables_cls({'amount': 3}).amount(), 3)
+        self.assertIsNone(variables_cls({}).total())
+        with self.assertRaisesRegexp(AssertionError, 'Unknown field type money for variable amount'):
+            record_variables_cls({'amount': 'money'})
+
+    def test_evaluate_records(self):
+        variables_cls = record_variables_cls(SCHEMA)
+        results = list(evaluate_records(RULES, iter(RECORDS), SCHEMA, batch_size=2))
+        self.assertEqual([record for record, _ in results], RECORDS)
+        self.assertEqual([triggered for _, triggered in results], [[0, 1], [], [2]])
+        for record, triggered in results:
+            self.assertEqual(bool(triggered), run_all(RULES, variables_cls(record), None))
+
+    def test_stop_on_first_trigger(self):
+        results = evaluate_records(RULES, RECORDS, SCHEMA, stop_on_first_trigger=True)
+        self.assertEqual([triggered for _, triggered in results], [[0], [], [2]])
+
+    def test_records_are_read_lazily(self):
+        def records():
+            yield RECORDS[0]
+            raise AssertionError('the second record should not be read')
+
+        results = evaluate_records(RULES, records(), SCHEMA, batch_size=1)
+        self.assertEqual(next(results), (RECORDS[0], [0, 1]))
+
+    def test_workers(self):
+        records = RECORDS * 20
+        expected = list(evaluate_records(RULES, records, SCHEMA))
+        self.assertEqual(list(evaluate_records(RULES, records, SCHEMA, batch_size=7, workers=2)), expected)
+
+    def test_on_error(self):
+        # amount is missing from the second record, which NumericType can't cast
+        records = [RECORDS[0], {'id': 'x', 'country': 'US'}, RECORDS[2]]
+        with self.assertRaisesRegexp(AssertionError, 'None is not a valid numeric type'):
+            list(evaluate_records(RULES, records, SCHEMA))
+
+        results = list(evaluate_records(RULES, records, SCHEMA, on_error='skip'))
+        self.assertEqual(results, [(RECORDS[0], [0, 1]), (RECORDS[2], [2])])
+
+        for workers in [None, 2]:
+            results = list(evaluate_records(RULES, records, SCHEMA, batch_size=1, workers=workers, on_error='report'))
+            self.assertEqual([record for record, _ in results], records)
+            self.assertIsInstance(results[1][1], RecordError)
+            self.assertEqual(str(results[1][1]), 'AssertionError: None is not a valid numeric type.')
+            self.assertEqual([results[0][1], results[2][1]], [[0, 1], [2]])
+
+        with self.assertRaisesRegexp(AssertionError, 'on_error must be one of raise, skip, report, got ignore'):
+            next(evaluate_records(RULES, records, SCHEMA, on_error='ignore'))
+
+    def test_read_jsonl(self):
+        self.assertEqual(list(read_jsonl(['{"a": 1}\n', '\n', '{"a": 2}'])), [{'a': 1}, {'a': 2}])
+
+    def _main(self, records, *options):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        paths = {}
+        for name, data in [('rules', RULES), ('schema', SCHEMA)]:
+            paths[name] = os.path.join(directory, name + '.json')
+            with open(paths[name], 'w') as json_file:
+                json.dump(data, json_file)
+
+        stdin = io.StringIO(''.join(json.dumps(record) + '\n' for record in records))
+        stdout = io.StringIO()
+        with patch('sys.stdin', stdin), patch('sys.stdout', stdout):
+            self.assertEqual(main([paths['rules'], '--schema', paths['schema']] + list(options)), 0)
+        return [json.loads(line) for line in stdout.getvalue().splitlines()]
+
+    def test_main(self):
+        self.assertEqual(self._main(RECORDS, '--id-field', 'id'),
+                         [{'record': 0, 'rules': [0, 1], 'id': 'a'}, {'record': 2, 'rules': [2], 'id': 'c'}])
+
+    def test_main_on_error(self):
+        records = [{'country': 'FR'}] + RECORDS
+        self.assertEqual(self._main(records, '--on-error', 'skip'),
+                         [{'record': 1, 'rules': [0, 1]}, {'record': 3, 'rules': [2]}])
+        self.assertEqual(self._main(records, '--on-error', 'report'),
+                         [{'record': 0, 'error': 'AssertionError: None is not a valid numeric type.'},
+                          {'record': 1, 'rules': [0, 1]}, {'record': 3, 'rules': [2]}])
@@ -1,9 +1,11 @@
-from business_rules.operators import (NumericType,
+from business_rules.operators import (NativeNumericType,
+                                      NumericType,
                                       StringType,
                                       BooleanType,
                                       SelectType,
                                       SelectMultipleType,
-                                      DateType)
+                                      DateType,
+                                      EpochDateType)
 from business_rules.utils import fn_name_to_pretty_label
 from business_rules.variables import (rule_variable,
                                       numeric_rule_variable,
@@ -43,6 +45,16 @@ class RuleVariableTests(TestCase):
         self.assertEqual(func.field_type, StringType)
         self.assertEqual(func.options, ['op1', 'op2'])
 
+    def test_rule_variable_cache_flag(self):
+        @rule_variable(StringType)
+        def cached_function(self): pass
+
+        @string_rule_variable(cache=False)
+        def uncached_function(self): pass
+
+        self.assertTrue(cached_function.cache)
+        self.assertFalse(uncached_function.cache)
+
     def test_rule_variable_works_as_decorator(self):
         @rule_variable(StringType, 'Blah')
         def some_test_function(self): pass
@@ -74,6 +86,13 @@ class RuleVariableTests(TestCase):
         self.assertTrue(getattr(numeric_var, 'is_rule_variable'))
         self.assertEqual(getattr(numeric_var, 'field_type'), NumericType)
 
+    def test_numeric_rule_variable_native(self):
+        @numeric_rule_variable(native=True)
+        def numeric_var(): pass
+
+        self.assertEqual(getattr(numeric_var, 'field_type'), NativeNumericType)
+        self.assertEqual(getattr(numeric_var, 'field_type').name, 'numeric')
+
     def test_string_rule_variable(self):
         @string_rule_variable(label='My Label')
         def string_var(): pass
@@ -130,3 +149,10 @@ class RuleVariableTests(TestCase):
 
         self.assertTrue(getattr(date_var, 'is_rule_variable'))
         self.assertEqual(getattr(date_var, 'field_type'), DateType)
+
+    def test_date_rule_variable_epoch(self):
+        @date_rule_variable(epoch=True)
+        def date_var(): pass
+
+        self.assertEqual(getattr(date_var, 'field_type'), EpochDateType)
+        self.assertEqual(getattr(date_var, 'field_type').name, 'date')
@@ -33,3 +33,25 @@ class VariablesClassTests(TestCase):
 
         # should work on an instance of the class too
         self.assertEqual(len(SomeVariables().get_all_variables()), 1)
+
+    def test_variables_are_registered_when_the_class_is_created(self):
+
+        class SomeVariables(BaseVariables):
+
+            @rule_variable(StringType)
+            def zeta(self):
+                return "z"
+
+            @rule_variable(StringType)
+            def alpha(self):
+                return "a"
+
+        class MoreVariables(SomeVariables):
+
+            @rule_variable(StringType)
+            def beta(self):
+                return "b"
+
+        self.assertEqual(sorted(SomeVariables._rule_variables), ['alpha', 'zeta'])
+        self.assertEqual([var['name'] for var in MoreVariables.get_all_variables()], ['alpha', 'beta', 'zeta'])
+        self.assertIs(SomeVariables.get_all_variables(), SomeVariables.get_all_variables())